@@ -13,6 +13,7 @@ load_dotenv()
 
 OLLAMA_OPENAI_ENDPOINT = os.getenv("OLLAMA_OPENAI_ENDPOINT")
 
+
 @st.cache_resource
 def get_agent(model_name: str) -> ToolCallingAgent:
     model = OpenAIServerModel(
@@ -13,6 +13,7 @@ Rules:
 Workflow hints:
 - For comparisons between months, use compare_months.
 - For trend questions, use get_spending_trend.
+- For spending between two specific dates, use get_expenses_between.
 - For "top expenses" or "biggest purchases", use get_top_expenses.
 - For recurring/subscription questions, use get_recurring_expenses.
 
@@ -2,6 +2,7 @@ from ai.tools.date_tools import current_date, list_available_years
 from ai.tools.expense_tools import (
     get_category_expenses,
     get_expense_categories,
+    get_expenses_between,
     get_monthly_expenses,
     get_recurring_expenses,
     get_top_expenses,
@@ -20,6 +21,7 @@ ALL_TOOLS = [
     get_expense_categories,
     get_monthly_expenses,
     get_category_expenses,
+    get_expenses_between,
     get_top_expenses,
     get_recurring_expenses,
     get_monthly_income,
@@ -3,7 +3,7 @@ from datetime import datetime
 
 from smolagents import tool
 
-from utils.json_utils import read_json
+from utils.ledger_utils import load_summary
 
 
 @tool
@@ -29,17 +29,7 @@ def list_available_years() -> str:
     Returns:
         str: JSON list of years with data.
     """
-    years = set()
-
-    expenses = read_json("expenses.json")
-    for r in expenses.get("records", []):
-        years.add(r["date"][:4])
-
-    incomes = read_json("incomes.json")
-    for r in incomes.get("records", []):
-        years.add(r["date"][:4])
-
-    if not years:
-        return json.dumps({"years": []})
+    years = set(load_summary("expenses.json")["years"])
+    years.update(load_summary("incomes.json")["years"])
 
     return json.dumps({"years": sorted(years)})
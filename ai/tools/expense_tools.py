@@ -1,24 +1,19 @@
 import json
-
-import pandas as pd
+from datetime import datetime
 
 from smolagents import tool
 
 from resources.constants import MONTHS_MAP
 from utils.json_utils import read_json
-
-
-def _load_expenses_df() -> pd.DataFrame:
-    data = read_json("expenses.json")
-    records = data.get("records", [])
-    if not records:
-        return pd.DataFrame(
-            columns=["id", "amount", "category", "date", "notes",
-                      "frequency", "recurring_id"]
-        )
-    df = pd.DataFrame(records)
-    df["date"] = pd.to_datetime(df["date"])
-    return df
+from utils.ledger_utils import (
+    load_cube,
+    load_date_index,
+    load_ledger,
+    load_summary,
+    sum_between,
+)
+from utils.money_utils import to_dollars
+from utils.recurring_utils import occurrence_dates, prefix_range
 
 
 def _resolve_month(month_input: str) -> int:
@@ -63,7 +58,7 @@ def get_monthly_expenses(year: str, month: str) -> str:
     Returns:
         str: JSON expense summary for the month.
     """
-    df = _load_expenses_df()
+    df = load_cube("expenses.json")
     if df.empty:
         return json.dumps({"error": "No expense data found."})
 
@@ -71,23 +66,19 @@ def get_monthly_expenses(year: str, month: str) -> str:
     m = _resolve_month(month)
     month_name = [k for k, v in MONTHS_MAP.items() if v == m][0]
 
-    filtered = df[(df["date"].dt.year == y) & (df["date"].dt.month == m)]
+    filtered = df[(df["year"] == y) & (df["month"] == m)]
     if filtered.empty:
         return json.dumps({"error": f"No expenses found for {month_name} {y}."})
 
-    total = float(filtered["amount"].sum())
-    count = len(filtered)
-    by_cat = (
-        filtered.groupby("category")["amount"]
-        .sum()
-        .sort_values(ascending=False)
-    )
+    total = int(filtered["amount"].sum())
+    count = int(filtered["count"].sum())
+    by_cat = filtered.groupby("category")["amount"].sum().sort_values(ascending=False)
 
     result = {
         "period": f"{month_name} {y}",
-        "total": round(total, 2),
+        "total": to_dollars(total),
         "transaction_count": count,
-        "by_category": {cat: round(float(amt), 2) for cat, amt in by_cat.items()},
+        "by_category": {cat: to_dollars(int(amt)) for cat, amt in by_cat.items()},
     }
     return json.dumps(result)
 
@@ -103,19 +94,24 @@ def get_category_expenses(category: str, year: str = "") -> str:
     Returns:
         str: JSON category expense breakdown.
     """
-    df = _load_expenses_df()
-    if df.empty:
+    cube = load_cube("expenses.json")
+    if cube.empty:
         return json.dumps({"error": "No expense data found."})
 
-    filtered = df[df["category"].str.lower() == category.strip().lower()]
-    if year:
-        filtered = filtered[filtered["date"].dt.year == int(year)]
+    # Only the expenses of the category (and year) are loaded
+    name = next(
+        (c for c in cube["category"].unique() if c.lower() == category.strip().lower()),
+        None,
+    )
+    filtered = load_ledger("expenses.json", year or None, name) if name else None
 
-    if filtered.empty:
+    if filtered is None or filtered.empty:
         scope = f" in {year}" if year else ""
-        return json.dumps({"error": f"No expenses found for category '{category}'{scope}."})
+        return json.dumps(
+            {"error": f"No expenses found for category '{category}'{scope}."}
+        )
 
-    total = float(filtered["amount"].sum())
+    total = int(filtered["amount"].sum())
     count = len(filtered)
 
     filtered = filtered.copy()
@@ -131,16 +127,66 @@ def get_category_expenses(category: str, year: str = "") -> str:
     result = {
         "category": category,
         "year": year or "all",
-        "total": round(total, 2),
+        "total": to_dollars(total),
         "transaction_count": count,
         "by_month": [
-            {"month": row["month_label"], "amount": round(float(row["amount"]), 2)}
+            {"month": row["month_label"], "amount": to_dollars(int(row["amount"]))}
             for _, row in by_month.iterrows()
         ],
     }
     return json.dumps(result)
 
 
+@tool
+def get_expenses_between(start: str, end: str, category: str = "") -> str:
+    """Returns the total and number of expenses between two dates (inclusive),
+    for any date range rather than a whole month or year.
+
+    Args:
+        start: First day of the range as YYYY-MM-DD (e.g. "2025-03-14").
+        end: Last day of the range as YYYY-MM-DD (e.g. "2025-06-02").
+        category: Optional category to filter by. If empty, includes all categories.
+
+    Returns:
+        str: JSON total and transaction count for the range.
+    """
+    try:
+        start_date = datetime.strptime(start.strip(), "%Y-%m-%d").date()
+        end_date = datetime.strptime(end.strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return json.dumps({"error": "Dates must be formatted as YYYY-MM-DD."})
+    if start_date > end_date:
+        return json.dumps({"error": "The start date must not be after the end date."})
+
+    key = None
+    if category:
+        index = load_date_index("expenses.json")
+        key = next(
+            (
+                c
+                for c in index
+                if c is not None and c.lower() == category.strip().lower()
+            ),
+            category,
+        )
+
+    total, count = sum_between("expenses.json", start_date, end_date, key)
+    if count == 0:
+        scope = f" for '{category}'" if category else ""
+        return json.dumps(
+            {"error": f"No expenses found{scope} between {start} and {end}."}
+        )
+
+    result = {
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "category": category or "all",
+        "total": to_dollars(total),
+        "transaction_count": count,
+    }
+    return json.dumps(result)
+
+
 @tool
 def get_top_expenses(year: str, month: str = "", limit: str = "5") -> str:
     """Returns the top N largest individual expenses.
@@ -153,21 +199,22 @@ def get_top_expenses(year: str, month: str = "", limit: str = "5") -> str:
     Returns:
         str: JSON list of top expenses with details.
     """
-    expenses_df = _load_expenses_df()
-    if expenses_df.empty:
+    if not load_summary("expenses.json")["years"]:
         return json.dumps({"error": "No expense data found."})
 
     y = int(year)
     n = int(limit)
-    filtered = expenses_df[expenses_df["date"].dt.year == y]
+    date_prefix = str(y)
 
     period = str(y)
     if month:
         m = _resolve_month(month)
         month_name = [k for k, v in MONTHS_MAP.items() if v == m][0]
-        filtered = filtered[filtered["date"].dt.month == m]
+        date_prefix = f"{y}-{m:02d}"
         period = f"{month_name} {y}"
 
+    filtered = load_ledger("expenses.json", date_prefix)
+
     if filtered.empty:
         return json.dumps({"error": f"No expenses found for {period}."})
 
@@ -176,7 +223,7 @@ def get_top_expenses(year: str, month: str = "", limit: str = "5") -> str:
     expenses = []
     for _, row in top.iterrows():
         entry = {
-            "amount": round(float(row["amount"]), 2),
+            "amount": to_dollars(int(row["amount"])),
             "category": row["category"],
             "date": row["date"].strftime("%Y-%m-%d"),
         }
@@ -203,42 +250,36 @@ def get_recurring_expenses(year: str = "") -> str:
     Returns:
         str: JSON list of recurring expense groups.
     """
-    expenses_df = _load_expenses_df()
-    if expenses_df.empty:
+    if not load_summary("expenses.json")["years"]:
         return json.dumps({"error": "No expense data found."})
 
-    recurring = expenses_df[expenses_df["recurring_id"].notna() & (expenses_df["recurring_id"] != "")]
-    if year:
-        recurring = recurring[recurring["date"].dt.year == int(year)]
+    # Answered from the rules: only their occurrence dates in the year are
+    # generated
+    bounds = prefix_range(year or None) or (None, None)
+    groups = []
+    for rule in read_json("recurring.json"):
+        dates = occurrence_dates(rule, *bounds)
+        if not len(dates):
+            continue
+        note = rule.get("notes")
+        groups.append(
+            {
+                "recurring_id": rule["recurring_id"],
+                "label": note if note else rule["category"],
+                "category": rule["category"],
+                "frequency": rule["frequency"],
+                "occurrences": len(dates),
+                "total": to_dollars(rule["amount"] * len(dates)),
+                "average": to_dollars(rule["amount"]),
+                "first_date": str(dates[0]),
+                "last_date": str(dates[-1]),
+            }
+        )
 
-    if recurring.empty:
+    if not groups:
         scope = f" in {year}" if year else ""
         return json.dumps({"error": f"No recurring expenses found{scope}."})
 
-    groups = []
-    for rid, group in recurring.groupby("recurring_id"):
-        group_sorted = group.sort_values("date")
-        cat = group_sorted.iloc[0]["category"]
-        freq = group_sorted.iloc[0].get("frequency", "Unknown")
-        total = float(group_sorted["amount"].sum())
-        avg = float(group_sorted["amount"].mean())
-        count = len(group_sorted)
-        first = group_sorted["date"].min().strftime("%Y-%m-%d")
-        last = group_sorted["date"].max().strftime("%Y-%m-%d")
-        note = group_sorted.iloc[0].get("notes", "")
-
-        groups.append({
-            "recurring_id": rid,
-            "label": note if note else cat,
-            "category": cat,
-            "frequency": freq,
-            "occurrences": count,
-            "total": round(total, 2),
-            "average": round(avg, 2),
-            "first_date": first,
-            "last_date": last,
-        })
-
     result = {
         "year": year or "all",
         "recurring_expenses": groups,
@@ -1,21 +1,10 @@
 import json
 
-import pandas as pd
-
 from smolagents import tool
 
 from resources.constants import MONTHS_MAP
-from utils.json_utils import read_json
-
-
-def _load_incomes_df() -> pd.DataFrame:
-    data = read_json("incomes.json")
-    records = data.get("records", [])
-    if not records:
-        return pd.DataFrame(columns=["id", "amount", "date", "source"])
-    df = pd.DataFrame(records)
-    df["date"] = pd.to_datetime(df["date"])
-    return df
+from utils.ledger_utils import load_ledger, load_summary
+from utils.money_utils import to_dollars
 
 
 def _resolve_month(month_input: str) -> int:
@@ -49,35 +38,36 @@ def get_monthly_income(year: str, month: str = "") -> str:
     Returns:
         str: JSON income summary.
     """
-    income_df = _load_incomes_df()
-    if income_df.empty:
+    if not load_summary("incomes.json")["years"]:
         return json.dumps({"error": "No income data found."})
 
     y = int(year)
-    filtered = income_df[income_df["date"].dt.year == y]
+    date_prefix = str(y)
 
     period = str(y)
     if month:
         m = _resolve_month(month)
         month_name = [k for k, v in MONTHS_MAP.items() if v == m][0]
-        filtered = filtered[filtered["date"].dt.month == m]
+        date_prefix = f"{y}-{m:02d}"
         period = f"{month_name} {y}"
 
+    filtered = load_ledger("incomes.json", date_prefix)
+
     if filtered.empty:
         return json.dumps({"error": f"No income found for {period}."})
 
-    total = float(filtered["amount"].sum())
+    total = int(filtered["amount"].sum())
     by_source = (
-        filtered.groupby("source")["amount"]
+        filtered.groupby("source", observed=True)["amount"]
         .sum()
         .sort_values(ascending=False)
     )
 
     result = {
         "period": period,
-        "total": round(total, 2),
+        "total": to_dollars(total),
         "by_source": {
-            (source if source else "(no source)"): round(float(amt), 2)
+            (source if source else "(no source)"): to_dollars(int(amt))
             for source, amt in by_source.items()
         },
     }
@@ -94,29 +84,29 @@ def get_income_sources(year: str = "") -> str:
     Returns:
         str: JSON list of income sources and totals.
     """
-    income_df = _load_incomes_df()
-    if income_df.empty:
+    if not load_summary("incomes.json")["years"]:
         return json.dumps({"error": "No income data found."})
 
-    if year:
-        income_df = income_df[income_df["date"].dt.year == int(year)]
+    income_df = load_ledger("incomes.json", year or None)
 
     if income_df.empty:
         return json.dumps({"error": f"No income found for {year}."})
 
     by_source = (
-        income_df.groupby("source")["amount"]
+        income_df.groupby("source", observed=True)["amount"]
         .agg(["sum", "count"])
         .sort_values("sum", ascending=False)
     )
 
     sources = []
     for source, row in by_source.iterrows():
-        sources.append({
-            "source": source if source else "(no source)",
-            "total": round(float(row["sum"]), 2),
-            "count": int(row["count"]),
-        })
+        sources.append(
+            {
+                "source": source if source else "(no source)",
+                "total": to_dollars(int(row["sum"])),
+                "count": int(row["count"]),
+            }
+        )
 
     result = {
         "year": year or "all",
@@ -1,34 +1,10 @@
 import json
 
-import pandas as pd
-
 from smolagents import tool
 
 from resources.constants import MONTHS_MAP
-from utils.json_utils import read_json
-
-
-def _load_expenses_df() -> pd.DataFrame:
-    data = read_json("expenses.json")
-    records = data.get("records", [])
-    if not records:
-        return pd.DataFrame(
-            columns=["id", "amount", "category", "date", "notes",
-                      "frequency", "recurring_id"]
-        )
-    df = pd.DataFrame(records)
-    df["date"] = pd.to_datetime(df["date"])
-    return df
-
-
-def _load_incomes_df() -> pd.DataFrame:
-    data = read_json("incomes.json")
-    records = data.get("records", [])
-    if not records:
-        return pd.DataFrame(columns=["id", "amount", "date", "source"])
-    df = pd.DataFrame(records)
-    df["date"] = pd.to_datetime(df["date"])
-    return df
+from utils.ledger_utils import load_cube
+from utils.money_utils import to_dollars
 
 
 def _resolve_month(month_input: str) -> int:
@@ -62,19 +38,19 @@ def get_financial_summary(year: str, month: str = "") -> str:
     Returns:
         str: JSON financial summary.
     """
-    exp_df = _load_expenses_df()
-    inc_df = _load_incomes_df()
+    exp_df = load_cube("expenses.json")
+    inc_df = load_cube("incomes.json")
 
     y = int(year)
     period = str(y)
 
     if not exp_df.empty:
-        exp_filtered = exp_df[exp_df["date"].dt.year == y]
+        exp_filtered = exp_df[exp_df["year"] == y]
     else:
         exp_filtered = exp_df
 
     if not inc_df.empty:
-        inc_filtered = inc_df[inc_df["date"].dt.year == y]
+        inc_filtered = inc_df[inc_df["year"] == y]
     else:
         inc_filtered = inc_df
 
@@ -83,12 +59,13 @@ def get_financial_summary(year: str, month: str = "") -> str:
         month_name = [k for k, v in MONTHS_MAP.items() if v == m][0]
         period = f"{month_name} {y}"
         if not exp_filtered.empty:
-            exp_filtered = exp_filtered[exp_filtered["date"].dt.month == m]
+            exp_filtered = exp_filtered[exp_filtered["month"] == m]
         if not inc_filtered.empty:
-            inc_filtered = inc_filtered[inc_filtered["date"].dt.month == m]
+            inc_filtered = inc_filtered[inc_filtered["month"] == m]
 
-    total_income = float(inc_filtered["amount"].sum() if not inc_filtered.empty else 0)
-    total_expenses = float(exp_filtered["amount"].sum() if not exp_filtered.empty else 0)
+    # Totals in cents, converted to dollars for the output
+    total_income = int(inc_filtered["amount"].sum() if not inc_filtered.empty else 0)
+    total_expenses = int(exp_filtered["amount"].sum() if not exp_filtered.empty else 0)
     savings = total_income - total_expenses
     savings_rate = (savings / total_income * 100) if total_income > 0 else 0.0
 
@@ -102,15 +79,15 @@ def get_financial_summary(year: str, month: str = "") -> str:
         for cat, amt in by_cat.items():
             pct = (amt / total_expenses * 100) if total_expenses > 0 else 0
             expense_breakdown[cat] = {
-                "amount": round(float(amt), 2),
+                "amount": to_dollars(int(amt)),
                 "percentage": round(float(pct), 1),
             }
 
     result = {
         "period": period,
-        "total_income": round(total_income, 2),
-        "total_expenses": round(total_expenses, 2),
-        "savings": round(savings, 2),
+        "total_income": to_dollars(total_income),
+        "total_expenses": to_dollars(total_expenses),
+        "savings": to_dollars(savings),
         "savings_rate": round(savings_rate, 1),
         "expense_breakdown": expense_breakdown,
     }
@@ -131,8 +108,8 @@ def compare_months(year: str, month_1: str, month_2: str) -> str:
     Returns:
         str: JSON comparison with deltas.
     """
-    expenses_df = _load_expenses_df()
-    incomes_df = _load_incomes_df()
+    expenses_df = load_cube("expenses.json")
+    incomes_df = load_cube("incomes.json")
     y = int(year)
     first_month = _resolve_month(month_1)
     second_month = _resolve_month(month_2)
@@ -141,21 +118,21 @@ def compare_months(year: str, month_1: str, month_2: str) -> str:
 
     def _month_totals(df, month_num, amount_col="amount", group_col=None):
         if df.empty:
-            return 0.0, {}
-        filtered = df[
-            (df["date"].dt.year == y) & (df["date"].dt.month == month_num)
-        ]
-        total = float(filtered[amount_col].sum())
+            return 0, {}
+        filtered = df[(df["year"] == y) & (df["month"] == month_num)]
+        total = int(filtered[amount_col].sum())
         breakdown = {}
         if group_col and not filtered.empty:
-            breakdown = {
-                k: round(float(v), 2)
-                for k, v in filtered.groupby(group_col)[amount_col].sum().items()
-            }
+            grouped = filtered.groupby(group_col)[amount_col].sum()
+            breakdown = {k: int(v) for k, v in grouped.items()}
         return total, breakdown
 
-    expense_1, category_1 = _month_totals(expenses_df, first_month, group_col="category")
-    expense_2, category_2 = _month_totals(expenses_df, second_month, group_col="category")
+    expense_1, category_1 = _month_totals(
+        expenses_df, first_month, group_col="category"
+    )
+    expense_2, category_2 = _month_totals(
+        expenses_df, second_month, group_col="category"
+    )
     income_1, _ = _month_totals(incomes_df, first_month)
     income_2, _ = _month_totals(incomes_df, second_month)
 
@@ -165,12 +142,12 @@ def compare_months(year: str, month_1: str, month_2: str) -> str:
     all_cats = sorted(set(list(category_1.keys()) + list(category_2.keys())))
     category_comparison = {}
     for cat in all_cats:
-        a = category_1.get(cat, 0.0)
-        b = category_2.get(cat, 0.0)
+        a = category_1.get(cat, 0)
+        b = category_2.get(cat, 0)
         category_comparison[cat] = {
-            first_month_name: round(a, 2),
-            second_month_name: round(b, 2),
-            "delta": round(b - a, 2),
+            first_month_name: to_dollars(a),
+            second_month_name: to_dollars(b),
+            "delta": to_dollars(b - a),
         }
 
     result = {
@@ -178,19 +155,19 @@ def compare_months(year: str, month_1: str, month_2: str) -> str:
         "month_1": first_month_name,
         "month_2": second_month_name,
         "income": {
-            first_month_name: round(income_1, 2),
-            second_month_name: round(income_2, 2),
-            "delta": round(income_2 - income_1, 2),
+            first_month_name: to_dollars(income_1),
+            second_month_name: to_dollars(income_2),
+            "delta": to_dollars(income_2 - income_1),
         },
         "expenses": {
-            first_month_name: round(expense_1, 2),
-            second_month_name: round(expense_2, 2),
-            "delta": round(expense_2 - expense_1, 2),
+            first_month_name: to_dollars(expense_1),
+            second_month_name: to_dollars(expense_2),
+            "delta": to_dollars(expense_2 - expense_1),
         },
         "savings": {
-            first_month_name: round(savings_1, 2),
-            second_month_name: round(savings_2, 2),
-            "delta": round(savings_2 - savings_1, 2),
+            first_month_name: to_dollars(savings_1),
+            second_month_name: to_dollars(savings_2),
+            "delta": to_dollars(savings_2 - savings_1),
         },
         "category_breakdown": category_comparison,
     }
@@ -210,12 +187,12 @@ def get_spending_trend(year: str, category: str = "") -> str:
     Returns:
         str: JSON monthly trend with MoM change.
     """
-    expenses_df = _load_expenses_df()
+    expenses_df = load_cube("expenses.json")
     if expenses_df.empty:
         return json.dumps({"error": "No expense data found."})
 
     y = int(year)
-    filtered = expenses_df[expenses_df["date"].dt.year == y]
+    filtered = expenses_df[expenses_df["year"] == y]
 
     if category:
         filtered = filtered[
@@ -226,18 +203,14 @@ def get_spending_trend(year: str, category: str = "") -> str:
         scope = f" for '{category}'" if category else ""
         return json.dumps({"error": f"No expenses found{scope} in {year}."})
 
-    monthly = (
-        filtered.groupby(filtered["date"].dt.month)["amount"]
-        .sum()
-        .sort_index()
-    )
+    monthly = filtered.groupby("month")["amount"].sum().sort_index()
 
     months = []
     prev = None
     for month_num, amount in monthly.items():
         month_name = [k for k, v in MONTHS_MAP.items() if v == month_num][0]
-        amount = round(float(amount), 2)
-        entry = {"month": month_name, "amount": amount}
+        amount = int(amount)
+        entry = {"month": month_name, "amount": to_dollars(amount)}
         if prev is not None and prev > 0:
             entry["mom_change"] = round((amount - prev) / prev * 100, 1)
         prev = amount
@@ -263,12 +236,12 @@ def get_average_monthly_spending(year: str, category: str = "") -> str:
     Returns:
         str: JSON average monthly spending.
     """
-    expenses_df = _load_expenses_df()
+    expenses_df = load_cube("expenses.json")
     if expenses_df.empty:
         return json.dumps({"error": "No expense data found."})
 
     y = int(year)
-    filtered = expenses_df[expenses_df["date"].dt.year == y]
+    filtered = expenses_df[expenses_df["year"] == y]
 
     if category:
         filtered = filtered[
@@ -279,16 +252,13 @@ def get_average_monthly_spending(year: str, category: str = "") -> str:
         scope = f" for '{category}'" if category else ""
         return json.dumps({"error": f"No expenses found{scope} in {year}."})
 
-    monthly = (
-        filtered.groupby(filtered["date"].dt.month)["amount"]
-        .sum()
-    )
+    monthly = filtered.groupby("month")["amount"].sum()
 
     result = {
         "year": y,
         "category": category or "all",
-        "average_monthly_spending": round(float(monthly.mean()), 2),
-        "total_spending": round(float(monthly.sum()), 2),
+        "average_monthly_spending": to_dollars(round(monthly.mean())),
+        "total_spending": to_dollars(int(monthly.sum())),
         "num_months": len(monthly),
     }
 
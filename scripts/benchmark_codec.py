@@ -0,0 +1,121 @@
+"""
+Benchmark: encode/decode time and size of the on-disk JSON formats
+
+Builds random expense ledgers of several sizes and times encoding and
+decoding them with each available codec (see utils/codec_utils.py), for the
+previous indented {"records": [...]} format, the same records without
+whitespace, the compact "fields"/"rows" encoding, and the same rows with the
+repetitive string fields dictionary-encoded, as the year partitions are
+stored now. Decoding includes turning rows back into records; "frame" times
+decoding straight into a DataFrame, as the dashboard reads a year.
+
+Run from the project root:
+    python scripts/benchmark_codec.py [--sizes 10000 100000 1000000] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import codec_utils
+from utils.columnar_utils import NUMERIC_FIELDS
+from utils.storage_utils import (
+    CATEGORICAL_FIELDS,
+    DICTIONARY_FIELDS,
+    RECORD_FIELDS,
+)
+
+CATEGORIES = ["Grocery", "Home", "Health", "Travel", "Food & Dining"]
+
+
+def random_ledger(size):
+    return [
+        {
+            "id": i,
+            "amount": random.randint(100, 20000),
+            "category": random.choice(CATEGORIES),
+            "date": f"{random.randint(2020, 2025)}-{random.randint(1, 12):02d}-"
+            f"{random.randint(1, 28):02d}",
+            "notes": random.choice(["", "", "weekly shop", "refund pending"]),
+            "frequency": None,
+            "recurring_id": None,
+        }
+        for i in range(1, size + 1)
+    ]
+
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def formats(records):
+    fields = RECORD_FIELDS["expenses.json"]
+    yield "json", "pretty records", {"records": records}, True
+    for codec in codec_utils.CODECS:
+        yield codec, "compact records", {"records": records}, False
+        yield codec, "compact rows", codec_utils.encode_records(records, fields), False
+        yield (
+            codec,
+            "dictionary rows",
+            codec_utils.encode_records(
+                records, fields, DICTIONARY_FIELDS["expenses.json"]
+            ),
+            False,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"codecs available: {', '.join(codec_utils.CODECS)}")
+    print(
+        f"{'records':>9} {'codec':<8} {'format':<16} "
+        f"{'encode ms':>10} {'decode ms':>10} {'frame ms':>9} {'MiB':>8}"
+    )
+    for size in args.sizes:
+        records = random_ledger(size)
+        for codec, label, data, pretty in formats(records):
+            encode_time, encoded = best_time(
+                lambda data=data, pretty=pretty, codec=codec: codec_utils.dumps(
+                    data, pretty=pretty, codec=codec
+                ),
+                args.repeat,
+            )
+            decode_time, decoded = best_time(
+                lambda encoded=encoded, codec=codec: codec_utils.decode_records(
+                    codec_utils.loads(encoded, codec=codec)
+                ),
+                args.repeat,
+            )
+            assert decoded == records
+            frame_time, _ = best_time(
+                lambda encoded=encoded, codec=codec: codec_utils.decode_frame(
+                    codec_utils.loads(encoded, codec=codec),
+                    CATEGORICAL_FIELDS,
+                    NUMERIC_FIELDS,
+                ),
+                args.repeat,
+            )
+            print(
+                f"{size:>9} {codec:<8} {label:<16} {encode_time * 1000:>10.1f} "
+                f"{decode_time * 1000:>10.1f} {frame_time * 1000:>9.1f} "
+                f"{len(encoded) / 2**20:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
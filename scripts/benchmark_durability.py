@@ -0,0 +1,125 @@
+"""
+Benchmark: commit throughput under each durability mode
+
+Seeds a temporary data directory with a large expense ledger, then saves
+expenses one commit each (as the expense form does) under every
+FINANCE_DURABILITY mode, first from a single thread and then from several
+at once, which lets the writer group their commits. Prints the records
+saved per second.
+
+The data directory is created under --dir, by default the app's data
+directory, so that the fsyncs hit the filesystem the app writes to; a tmpfs
+/tmp would make every mode look free. The filesystem is printed first.
+
+Run from the project root:
+    python scripts/benchmark_durability.py [--ledger 100000] [--commits 400]
+        [--dir ./data]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import backend_utils, json_utils, storage_utils
+
+MODES = ["none", "batch", "commit"]
+CATEGORIES = ["Grocery", "Home", "Health", "Travel", "Food & Dining"]
+
+
+def random_expense():
+    return {
+        "amount": random.randint(100, 20000),
+        "category": random.choice(CATEGORIES),
+        "date": f"{random.randint(2020, 2025)}-{random.randint(1, 12):02d}-"
+        f"{random.randint(1, 28):02d}",
+        "notes": "",
+        "frequency": None,
+        "recurring_id": None,
+    }
+
+
+def describe_filesystem(path):
+    """Mount point and type of the filesystem holding a path, from /proc/mounts."""
+    path = os.path.realpath(path)
+    try:
+        with open("/proc/mounts") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return f"filesystem of {path} (type unknown)"
+    # The longest mount point containing the path
+    mount, fstype = max(
+        (
+            m
+            for m in mounts
+            if os.path.join(path, "").startswith(os.path.join(m[0], ""))
+        ),
+        key=lambda m: len(m[0]),
+    )
+    return f"{fstype} filesystem mounted on {mount}"
+
+
+def seed(ledger_size):
+    records = [{"id": i, **random_expense()} for i in range(1, ledger_size + 1)]
+    json_utils.write_json(
+        "expenses.json", {"next_id": ledger_size + 1, "records": records}
+    )
+
+
+def run(mode, commits, threads):
+    storage_utils.DURABILITY = mode
+    per_thread = commits // threads
+
+    def save_expenses():
+        for _ in range(per_thread):
+            json_utils.commit_json(
+                [{"file": "expenses.json", "op": "insert", "data": [random_expense()]}]
+            )
+
+    workers = [threading.Thread(target=save_expenses) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    # Count the final fsync of the batch mode in its time
+    storage_utils.flush_unsynced()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ledger", type=int, default=100_000)
+    parser.add_argument("--commits", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument(
+        "--dir",
+        default=storage_utils.DATA_DIR,
+        help="directory on the filesystem to benchmark (default: the data directory)",
+    )
+    args = parser.parse_args()
+
+    os.makedirs(args.dir, exist_ok=True)
+    print(f"Benchmarking the {describe_filesystem(args.dir)}")
+    with tempfile.TemporaryDirectory(dir=args.dir, prefix=".benchmark-") as data_dir:
+        storage_utils.DATA_DIR = data_dir
+        backend_utils.use_backend(args.backend)
+        storage_utils.DURABILITY = "none"
+        json_utils.init_data_files()
+        seed(args.ledger)
+        print(f"{args.backend} backend, {args.ledger} expenses in the ledger")
+        print(f"{'mode':<8} {'threads':>7} {'records/s':>10}")
+        for mode in MODES:
+            for threads in (1, args.threads):
+                rate = run(mode, args.commits, threads)
+                print(f"{mode:<8} {threads:>7} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
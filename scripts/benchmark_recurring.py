@@ -0,0 +1,108 @@
+"""
+Benchmark: generating the occurrences of recurring expenses
+
+Times generating long recurring series the way the recurring form used to,
+stepping a relativedelta per occurrence in Python, against the vectorized
+schedule of utils/recurring_utils.py. The schedule is timed for the whole
+series and for a single year of it (as the dashboard queries a year), first
+for one rule of each frequency and then for many rules at once.
+
+Run from the project root:
+    python scripts/benchmark_recurring.py [--years 10 100 1000] [--rules 100]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import recurring_utils
+
+DELTAS = {
+    "Weekly": relativedelta(weeks=1),
+    "Biweekly": relativedelta(weeks=2),
+    "Monthly": relativedelta(months=1),
+    "Quarterly": relativedelta(months=3),
+    "Yearly": relativedelta(years=1),
+}
+
+
+def random_rule(frequency, years):
+    # Days up to the 28th, which the stepped loop doesn't shift
+    start = date(2000, random.randint(1, 12), random.randint(1, 28))
+    return {
+        "recurring_id": str(random.random()),
+        "amount": random.randint(100, 20000),
+        "category": "Home",
+        "notes": "",
+        "frequency": frequency,
+        "start_date": start.isoformat(),
+        "end_date": (start + relativedelta(years=years)).isoformat(),
+        "skipped": [],
+    }
+
+
+def loop_dates(rule):
+    current = date.fromisoformat(rule["start_date"])
+    end = date.fromisoformat(rule["end_date"])
+    dates = []
+    while current <= end:
+        dates.append(current)
+        current += DELTAS[rule["frequency"]]
+    return dates
+
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def report(label, years, rules, repeat):
+    loop_time, dates = best_time(
+        lambda: [d for rule in rules for d in loop_dates(rule)], repeat
+    )
+    schedule_time, (_, schedule) = best_time(
+        lambda: recurring_utils.schedule(rules), repeat
+    )
+    assert schedule.astype(str).tolist() == [d.isoformat() for d in dates]
+    year_time, _ = best_time(
+        lambda: recurring_utils.materialize(rules, str(2000 + years // 2)), repeat
+    )
+    print(
+        f"{years:>6} {label:<12} {len(dates):>10} {loop_time * 1000:>9.1f} "
+        f"{schedule_time * 1000:>12.2f} {year_time * 1000:>9.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--years", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--rules", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'years':>6} {'rules':<12} {'dates':>10} {'loop ms':>9} "
+        f"{'schedule ms':>12} {'year ms':>9}"
+    )
+    for years in args.years:
+        for frequency in DELTAS:
+            report(frequency, years, [random_rule(frequency, years)], args.repeat)
+        rules = [
+            random_rule(random.choice(list(DELTAS)), years) for _ in range(args.rules)
+        ]
+        report(f"{args.rules} mixed", years, rules, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
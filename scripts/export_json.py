@@ -0,0 +1,35 @@
+"""
+Export the data files as pretty-printed JSON
+
+The app stores its data files compactly. This writes categories.json,
+expenses.json and incomes.json to a directory as indented, human-readable
+JSON, one file each, whichever storage backend is configured.
+
+Run from the project root:
+    python scripts/export_json.py [--out export]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import json_utils
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--out", default="export", help="output directory")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for filename in json_utils.DEFAULTS:
+        path = os.path.join(args.out, filename)
+        with open(path, "wb") as f:
+            f.write(json_utils.export_json(filename))
+        print(f"Exported {filename} to {path}")
+
+
+if __name__ == "__main__":
+    main()
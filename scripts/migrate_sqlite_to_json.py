@@ -2,7 +2,12 @@
 One-off migration script: SQLite -> JSON
 
 Reads data from the existing SQLite database and writes it to JSON files
-in the data/ directory, preserving original IDs.
+in the data/ directory, preserving original IDs. The app splits the expense
+and income files into year partitions on its next start.
+
+Only runs against a data directory the app hasn't partitioned yet: once a
+store has a manifest, the app reads its partitions and would never pick up
+the migrated file, so the script refuses to run instead.
 
 Run from the project root:
     python scripts/migrate_sqlite_to_json.py
@@ -16,6 +21,11 @@ import sys
 DB_PATH = os.path.join("db", "finance_tracker.db")
 DATA_DIR = "data"
 
+# Manifests of the partitioned record stores, written by the app
+MANIFEST_PATHS = [
+    os.path.join(DATA_DIR, store, "manifest.json") for store in ("expenses", "incomes")
+]
+
 
 def write(path, data):
     with open(path, "w") as f:
@@ -27,6 +37,15 @@ def migrate():
         print(f"Database not found at {DB_PATH}. Nothing to migrate.")
         sys.exit(0)
 
+    partitioned = [path for path in MANIFEST_PATHS if os.path.exists(path)]
+    if partitioned:
+        print(
+            f"Found {', '.join(partitioned)}: the app has already partitioned "
+            f"{DATA_DIR}/ and would ignore the migrated files. Move the data "
+            "directory aside to migrate into a fresh one."
+        )
+        sys.exit(1)
+
     os.makedirs(DATA_DIR, exist_ok=True)
 
     conn = sqlite3.connect(DB_PATH)
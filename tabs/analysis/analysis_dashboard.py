@@ -42,6 +42,4 @@ if query := st.chat_input("Ask about your finances..."):
             response = agent.run(task=query, reset=is_first_message)
         st.markdown(response)
 
-    st.session_state.chat_messages.append(
-        {"role": "assistant", "content": response}
-    )
+    st.session_state.chat_messages.append({"role": "assistant", "content": response})
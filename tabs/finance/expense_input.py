@@ -1,19 +1,28 @@
+import uuid
 from datetime import date, datetime
-from dateutil.relativedelta import relativedelta
 from time import sleep
-import plotly.express as px
 
-import uuid
 import pandas as pd
+import plotly.express as px
 import streamlit as st
+
+from resources.constants import CATEGORY_COLORS, MONTHS_MAP
 from utils.expense_utils import (
-    get_expenses_df,
-    save_expense_data,
     delete_expense_data,
+    delete_recurring_expenses,
+    get_category_usage,
+    get_expense_cube,
+    get_expenses_df,
+    get_recurring_expenses,
     manage_categories_data,
+    save_expense_data,
+    save_recurring_expense,
+    skip_recurring_occurrences,
+    update_recurring_expense,
 )
+from utils.money_utils import to_dollars
+from utils.recurring_utils import FREQUENCIES, OCCURRENCE_ID
 from utils.session_state_utils import init_expense_session_state
-from resources.constants import MONTHS_MAP, CATEGORY_COLORS
 
 
 def expense_form():
@@ -91,9 +100,8 @@ def recurring_expense_form():
     - frequency selection (weekly, biweekly, monthly, quarterly, yearly)
     - notes text input
 
-    When the form is submitted, the add_recurring_expense function is called with the
-    form values as arguments. If the form is submitted successfully,
-    a success message is displayed.
+    When the form is submitted, the series is saved as a single rule: its
+    occurrences are generated when expenses are queried, rather than stored.
     """
 
     st.subheader("Add a New Recurring Expense")
@@ -111,32 +119,87 @@ def recurring_expense_form():
             start_date = st.date_input("Start Date")
         with col_2:
             end_date = st.date_input("End Date")
-        frequency = st.selectbox(
-            "Frequency",
-            options=["Weekly", "Biweekly", "Monthly", "Quarterly", "Yearly"],
-        )
+        frequency = st.selectbox("Frequency", options=list(FREQUENCIES))
         notes = st.text_input("Notes")
         submit = st.form_submit_button("Add Recurring Transaction")
 
         if submit:
             if expense is None:
                 st.error("Expense amount is required!")
+            elif end_date < start_date:
+                st.error("End date must not be before the start date!")
             else:
-                recurring_id = str(uuid.uuid4())
-                current_date = start_date
-                frequency_delta = {
-                    "Weekly": relativedelta(weeks=1),
-                    "Biweekly": relativedelta(weeks=2),
-                    "Monthly": relativedelta(months=1),
-                    "Quarterly": relativedelta(months=3),
-                    "Yearly": relativedelta(years=1),
-                }
-
-                while current_date <= end_date:
-                    add_expense(
-                        expense, category, current_date, notes, frequency, recurring_id
-                    )
-                    current_date += frequency_delta[frequency]
+                save_recurring_expense(
+                    expense,
+                    category,
+                    start_date,
+                    end_date,
+                    frequency,
+                    notes,
+                    str(uuid.uuid4()),
+                )
+
+
+def apply_recurring_expense_edits(rules_df: pd.DataFrame):
+    """
+    Saves the changes made in the recurring expenses editor, once per edit.
+
+    Args:
+        rules_df (pd.DataFrame): The rules shown in the editor.
+    """
+
+    edits = st.session_state.edited_recurring_expense
+    for row, changes in edits.get("edited_rows", {}).items():
+        if "end_date" in changes:
+            changes = {**changes, "end_date": str(changes["end_date"])[:10]}
+        update_recurring_expense(rules_df.iloc[int(row)].recurring_id, changes)
+    delete_recurring_expenses(
+        [rules_df.iloc[i].recurring_id for i in edits.get("deleted_rows", [])]
+    )
+
+
+def manage_recurring_expenses():
+    """
+    Renders an editor of the recurring expenses. Changing a series or deleting
+    it updates a single rule, whatever its number of occurrences.
+    """
+
+    rules = get_recurring_expenses()
+    if not rules:
+        return
+
+    st.subheader("Recurring Expenses")
+    rules_df = pd.DataFrame(rules).assign(
+        amount=lambda df: to_dollars(df["amount"]),
+        start_date=lambda df: pd.to_datetime(df["start_date"]),
+        end_date=lambda df: pd.to_datetime(df["end_date"]),
+    )
+    st.data_editor(
+        rules_df,
+        key="edited_recurring_expense",
+        num_rows="delete",
+        column_order=[
+            "category",
+            "amount",
+            "frequency",
+            "start_date",
+            "end_date",
+            "notes",
+        ],
+        column_config={
+            "category": st.column_config.SelectboxColumn(
+                "Category", options=st.session_state.categories
+            ),
+            "amount": st.column_config.NumberColumn("Amount ($)", format="$%.2f"),
+            "frequency": st.column_config.TextColumn("Frequency", disabled=True),
+            "start_date": st.column_config.DateColumn("Start Date", disabled=True),
+            "end_date": st.column_config.DateColumn("End Date"),
+            "notes": st.column_config.TextColumn("Notes"),
+        },
+        hide_index=True,
+        on_change=apply_recurring_expense_edits,
+        args=(rules_df,),
+    )
 
 
 def manage_categories():
@@ -183,17 +246,20 @@ def manage_categories():
                 # Update and Delete button in two columns
                 col_1, col_2 = st.columns([1, 1])
                 with col_1:
-                    if st.button(
-                        "Update", key=f"update_{idx}", width="stretch"
-                    ):
+                    if st.button("Update", key=f"update_{idx}", width="stretch"):
                         if new_category_name != category:
                             # Update category name in expenses
                             for expense in st.session_state.expenses:
-                                if expense["category"] == category:
-                                    expense["category"] = new_category_name
-
-                            # Update category list
-                            st.session_state.categories[idx] = new_category_name
+                                if expense["Category"] == category:
+                                    expense["Category"] = new_category_name
+
+                            # Update category list, merging into an existing one
+                            st.session_state.categories = list(
+                                dict.fromkeys(
+                                    new_category_name if c == category else c
+                                    for c in st.session_state.categories
+                                )
+                            )
                             manage_categories_data(
                                 None, None, [category, new_category_name]
                             )
@@ -201,12 +267,9 @@ def manage_categories():
                             sleep(0.5)
                             st.rerun()
                 with col_2:
-                    if st.button(
-                        "Delete", key=f"delete_{idx}", width="stretch"
-                    ):
+                    if st.button("Delete", key=f"delete_{idx}", width="stretch"):
                         if len(st.session_state.categories) > 1:
-                            df = get_expenses_df()
-                            if not df.empty and (df["category"] == category).any():
+                            if get_category_usage(category):
                                 st.error(f"Category '{category}' has expenses!")
                             else:
                                 st.session_state.categories.remove(category)
@@ -226,11 +289,11 @@ def get_monthly_breakdown():
     st.divider()
     st.subheader("Monthly Breakdown")
 
-    expense_df = get_expenses_df()
-    if not expense_df.empty:
-        expense_df["date"] = pd.to_datetime(expense_df["date"])
-        expense_df["month"] = expense_df["date"].dt.month_name()
-        expense_df["year"] = expense_df["date"].dt.year
+    expense_cube = get_expense_cube()
+    if not expense_cube.empty:
+        expense_cube = expense_cube.assign(amount=to_dollars(expense_cube["amount"]))
+        month_names = {num: name for name, num in MONTHS_MAP.items()}
+        expense_df = expense_cube.assign(month=expense_cube["month"].map(month_names))
 
         rent_df = expense_df[expense_df["category"].str.lower() == "rent"]
         non_rent_df = expense_df[expense_df["category"].str.lower() != "rent"]
@@ -271,12 +334,21 @@ def get_monthly_breakdown():
                 with total:
                     st.metric("Total Non-Rent ($)", breakdown["Total Non-Rent ($)"])
 
-                month_expense_df = get_expenses_df(
-                    f"{year_select}-{datetime.strptime(month_select, '%B').month:02d}"
-                ).sort_values("date").reset_index(drop=True)
+                month_expense_df = (
+                    get_expenses_df(
+                        f"{year_select}-{datetime.strptime(month_select, '%B').month:02d}"
+                    )
+                    .sort_values("date")
+                    .reset_index(drop=True)
+                )
+                month_expense_df["amount"] = to_dollars(month_expense_df["amount"])
 
+                month_cube = expense_cube[
+                    (expense_cube["year"] == year_select)
+                    & (expense_cube["month"] == MONTHS_MAP[month_select])
+                ]
                 category_breakdown = (
-                    month_expense_df.groupby("category")["amount"]
+                    month_cube.groupby("category")["amount"]
                     .sum()
                     .reset_index()
                     .round(2)
@@ -301,13 +373,13 @@ def get_monthly_breakdown():
                         color_discrete_map=CATEGORY_COLORS,
                     )
                     category_bar.update_layout(
-                        legend=dict(
-                            orientation="h",
-                            yanchor="bottom",
-                            y=-0.7,
-                            xanchor="center",
-                            x=0.5,
-                        ),
+                        legend={
+                            "orientation": "h",
+                            "yanchor": "bottom",
+                            "y": -0.7,
+                            "xanchor": "center",
+                            "x": 0.5,
+                        },
                         barmode="stack",
                         height=300,
                     )
@@ -327,7 +399,7 @@ def get_monthly_breakdown():
                             "Amount ($)", format="$%.2f"
                         ),
                         "category": st.column_config.TextColumn("Category"),
-                        "date": st.column_config.TextColumn("Date"),
+                        "date": st.column_config.DateColumn("Date"),
                         "notes": st.column_config.TextColumn("Notes"),
                     },
                     hide_index=True,
@@ -337,13 +409,19 @@ def get_monthly_breakdown():
                     st.session_state.edited_month_expense.get("deleted_rows")
                     is not None
                 ):
-                    rows_to_delete = st.session_state.edited_month_expense.get(
-                        "deleted_rows"
-                    )
-                    ids_to_delete = [
-                        int(month_expense_df.iloc[i].id) for i in rows_to_delete
+                    rows_to_delete = month_expense_df.iloc[
+                        st.session_state.edited_month_expense.get("deleted_rows")
                     ]
-                    delete_expense_data(ids_to_delete)
+                    # Recurring occurrences have no stored record: they are
+                    # skipped in their rule instead
+                    occurrences = rows_to_delete["id"] == OCCURRENCE_ID
+                    delete_expense_data(rows_to_delete.loc[~occurrences, "id"].tolist())
+                    skip_recurring_occurrences(
+                        [
+                            (row.recurring_id, row.date.strftime("%Y-%m-%d"))
+                            for row in rows_to_delete[occurrences].itertuples()
+                        ]
+                    )
                     st.session_state.edited_month_expense["deleted_rows"] = None
                     st.rerun()
 
@@ -363,6 +441,7 @@ def expense_input_page():
         expense_form()
     with recurring_expense:
         recurring_expense_form()
+        manage_recurring_expenses()
     get_monthly_breakdown()
 
 
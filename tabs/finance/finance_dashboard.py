@@ -1,22 +1,86 @@
-import streamlit as st
+import functools
+import os
+import time
+from datetime import date
+
+import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import pandas as pd
+import streamlit as st
 
-from utils.expense_utils import get_expenses_df, get_all_expense_dates
-from utils.income_utils import get_incomes_df
-from resources.constants import MONTHS_MAP, CATEGORY_COLORS
+from resources.constants import CATEGORY_COLORS, MONTHS_MAP
+from utils.expense_utils import (
+    get_expense_cube,
+    get_expense_summary,
+    get_expense_total_between,
+    get_expense_totals_by_period,
+)
+from utils.export_utils import EXPORT_FORMATS, export_csv, export_parquet
+from utils.income_utils import (
+    get_income_cube,
+    get_income_summary,
+    get_income_total_between,
+    get_income_totals_by_period,
+)
+from utils.ledger_utils import GRANULARITIES, get_ledger_version
+from utils.money_utils import to_dollars
+from utils.sankey_utils import build_sankey
+
+# Number of (year, data version) sets of figures kept for all sessions
+FIGURE_CACHE_ENTRIES = int(os.getenv("FINANCE_FIGURE_CACHE_ENTRIES", "16"))
+
+# Share of the total below which the Sankey diagram collapses flows into "Other"
+SANKEY_OTHER_SHARE = float(os.getenv("FINANCE_SANKEY_OTHER_SHARE", "0"))
+
+# Most points per series of the trends chart; longer ranges get wider periods
+MAX_CHART_POINTS = 500
+TREND_HOVER_TEMPLATE = "<b>Date:</b> %{x}<br><b>Amount:</b> $%{y:.2f}<extra></extra>"
+
+# Show the run time of each dashboard section in the sidebar
+DEBUG_TIMINGS = os.getenv("FINANCE_DEBUG_TIMINGS", "0") == "1"
 
 st.title("Finance Dashboard")
 
 
-def finance_figures(income_df: pd.DataFrame, expense_df: pd.DataFrame) -> tuple:
+def monthly_cube_breakdown(cube_df: pd.DataFrame, key: str, label: str) -> pd.DataFrame:
+    """
+    Monthly amounts per category/source from an aggregate cube, shaped like a
+    monthly resample: each category/source spans its first to last month, with
+    0 for the months in between that have no records.
+
+    Args:
+        cube_df (pd.DataFrame): Aggregate cube for a given year
+        key (str): Cube column to break the amounts down by
+        label (str): Name of that column in the result
+
+    Returns:
+        pd.DataFrame: label and "Amount ($)" columns indexed by month name
+    """
+    pivot = cube_df.pivot_table(
+        index="month", columns=key, values="amount", aggfunc="sum"
+    )
+    pivot = pivot.reindex(range(pivot.index.min(), pivot.index.max() + 1))
+    within = pivot.ffill().notna() & pivot.bfill().notna()
+    monthly_df = (
+        pivot.fillna(0)
+        .where(within)
+        .rename_axis(columns=None)
+        .reset_index()
+        .melt(id_vars="month", var_name=label, value_name="Amount ($)")
+        .dropna()
+    )
+    month_names = {num: name for name, num in MONTHS_MAP.items()}
+    monthly_df["Date"] = monthly_df["month"].map(month_names)
+    return monthly_df.set_index("Date")[[label, "Amount ($)"]]
+
+
+def finance_figures(income_cube: pd.DataFrame, expense_cube: pd.DataFrame) -> tuple:
     """
     Finance figures and graphs to visually give a breakdown of your expenses and incomes.
 
     Args:
-        income_df (pd.DataFrame): Income dataframe for a given year
-        expense_df (pd.DataFrame): Expense dataframe for a given year
+        income_cube (pd.DataFrame): Monthly income aggregates by source for a given year
+        expense_cube (pd.DataFrame): Monthly expense aggregates by category for a given year
 
     Returns:
         tuple: figures and dataframes giving us the financial breakdown
@@ -29,25 +93,14 @@ def finance_figures(income_df: pd.DataFrame, expense_df: pd.DataFrame) -> tuple:
         pd.DataFrame(),
     )
 
-    reformatted_expense_df = pd.DataFrame(
-        {
-            "Category": expense_df.category.tolist(),
-            "Amount ($)": expense_df.amount.tolist(),
-            "Date": pd.to_datetime([date for date in expense_df.date.tolist()]),
-        }
-    ).set_index("Date")
-
     # Group by category and sum the amounts
     grouped_category_expense_df = (
-        reformatted_expense_df.groupby("Category")["Amount ($)"]
+        expense_cube.groupby("category")["amount"]
         .sum()
         .reset_index()
+        .rename(columns={"category": "Category", "amount": "Amount ($)"})
         .round(2)
     )
-    total_expense = grouped_category_expense_df["Amount ($)"].sum()
-    grouped_category_expense_df["Percentage"] = (
-        (grouped_category_expense_df["Amount ($)"] / total_expense) * 100
-    ).round(2)
 
     # Sort by amount descending for better visualization
     grouped_category_expense_df = grouped_category_expense_df.sort_values(
@@ -55,152 +108,15 @@ def finance_figures(income_df: pd.DataFrame, expense_df: pd.DataFrame) -> tuple:
     ).reset_index(drop=True)
 
     # Sankey diagram for full financial flow: Income → Expenses/Savings → Categories
-    categories = grouped_category_expense_df["Category"].tolist()
-    amounts = grouped_category_expense_df["Amount ($)"].tolist()
-    percentages = grouped_category_expense_df["Percentage"].tolist()
-
-    # Calculate total income and savings
-    total_income = income_df["amount"].sum() if not income_df.empty else 0
-    total_savings = total_income - total_expense
-
-    # Helper function to convert hex to rgba
-    def hex_to_rgba(hex_color, alpha=0.6):
-        hex_color = hex_color.lstrip('#')
-        r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-        return f"rgba({r}, {g}, {b}, {alpha})"
-
-    # Build nodes and links for the Sankey diagram
-    node_labels = []
-    node_colors = []
-    node_customdata = []
-    sources = []
-    targets = []
-    link_values = []
-    link_colors_rgba = []
-    link_customdata = []
-
-    node_index = 0
-
-    # Add income source nodes if income data exists
-    if not income_df.empty and total_income > 0:
-        # Group income by source
-        grouped_income = income_df.groupby("source")["amount"].sum().reset_index()
-        income_sources = grouped_income["source"].tolist()
-        income_amounts = grouped_income["amount"].tolist()
-
-        # Add income source nodes
-        income_source_indices = []
-        for source, amt in zip(income_sources, income_amounts):
-            pct = (amt / total_income * 100) if total_income > 0 else 0
-            node_labels.append(f"{source}<br>${amt:,.2f}")
-            node_colors.append("#2E7D32")  # Green for income sources
-            node_customdata.append([source, amt, pct, total_income])
-            income_source_indices.append(node_index)
-            node_index += 1
-
-        # Add Total Income node
-        total_income_index = node_index
-        node_labels.append(f"Total Income<br>${total_income:,.2f}")
-        node_colors.append("#1B5E20")  # Dark green for total income
-        node_customdata.append(["Total Income", total_income, 100.0, total_income])
-        node_index += 1
-
-        # Links from income sources to Total Income
-        for idx, amt in zip(income_source_indices, income_amounts):
-            sources.append(idx)
-            targets.append(total_income_index)
-            link_values.append(amt)
-            link_colors_rgba.append(hex_to_rgba("#4CAF50"))
-            pct = (amt / total_income * 100) if total_income > 0 else 0
-            link_customdata.append([income_sources[income_source_indices.index(idx)], amt, pct])
-
-        # Add Expenses node
-        expenses_index = node_index
-        node_labels.append(f"Expenses<br>${total_expense:,.2f}")
-        node_colors.append("#808080")  # Grey for expenses
-        expense_pct = (total_expense / total_income * 100) if total_income > 0 else 100
-        node_customdata.append(["Total Expenses", total_expense, expense_pct, total_income])
-        node_index += 1
-
-        # Link from Total Income to Expenses
-        sources.append(total_income_index)
-        targets.append(expenses_index)
-        link_values.append(total_expense)
-        link_colors_rgba.append(hex_to_rgba("#808080"))
-        link_customdata.append(["Expenses", total_expense, expense_pct])
-
-        # Add Savings node if there are savings
-        if total_savings > 0:
-            savings_index = node_index
-            savings_pct = (total_savings / total_income * 100) if total_income > 0 else 0
-            node_labels.append(f"Savings<br>${total_savings:,.2f} ({savings_pct:.1f}%)")
-            node_colors.append("#1976D2")  # Blue for savings
-            node_customdata.append(["Savings", total_savings, savings_pct, total_income])
-            node_index += 1
-
-            # Link from Total Income to Savings
-            sources.append(total_income_index)
-            targets.append(savings_index)
-            link_values.append(total_savings)
-            link_colors_rgba.append(hex_to_rgba("#1976D2"))
-            link_customdata.append(["Savings", total_savings, savings_pct])
-
-    else:
-        # No income data - just show expenses node
-        expenses_index = node_index
-        node_labels.append(f"Expenses<br>${total_expense:,.2f}")
-        node_colors.append("#808080")
-        node_customdata.append(["Total Expenses", total_expense, 100.0, total_expense])
-        node_index += 1
-
-    # Add expense category nodes and links
-    for cat, amt, pct in zip(categories, amounts, percentages):
-        node_labels.append(f"{cat}<br>${amt:,.2f} ({pct:.1f}%)")
-        node_colors.append(CATEGORY_COLORS.get(cat, "#888888"))
-        node_customdata.append([cat, amt, pct, total_expense])
-
-        # Link from Expenses to category
-        sources.append(expenses_index)
-        targets.append(node_index)
-        link_values.append(amt)
-        link_colors_rgba.append(hex_to_rgba(CATEGORY_COLORS.get(cat, "#888888")))
-        link_customdata.append([cat, amt, pct])
-        node_index += 1
-
-    category_expense_bar = go.Figure(data=[go.Sankey(
-        node=dict(
-            pad=20,
-            thickness=30,
-            line=dict(color="white", width=1),
-            label=node_labels,
-            color=node_colors,
-            customdata=node_customdata,
-            hovertemplate=(
-                "<b>%{customdata[0]}</b><br>"
-                "Amount: $%{customdata[1]:,.2f}<br>"
-                "% of Total: %{customdata[2]:.1f}%"
-                "<extra></extra>"
-            ),
-        ),
-        link=dict(
-            source=sources,
-            target=targets,
-            value=link_values,
-            color=link_colors_rgba,
-            customdata=link_customdata,
-            hovertemplate=(
-                "<b>%{customdata[0]}</b><br>"
-                "Amount: $%{customdata[1]:,.2f}<br>"
-                "% of Total: %{customdata[2]:.1f}%"
-                "<extra></extra>"
-            ),
-        ),
-    )])
-
-    category_expense_bar.update_layout(
-        title="Financial Flow: Income → Expenses → Categories",
-        font=dict(size=12),
-        height=500,
+    income_by_source = (
+        income_cube.groupby("source")["amount"].sum()
+        if not income_cube.empty
+        else pd.Series(dtype=float)
+    )
+    category_expense_bar = build_sankey(
+        income_by_source,
+        grouped_category_expense_df.set_index("Category")["Amount ($)"],
+        SANKEY_OTHER_SHARE,
     )
 
     # Function to calculate the monthly breakdown (i.e. total amount for each category) for total expense or incomes
@@ -221,19 +137,12 @@ def finance_figures(income_df: pd.DataFrame, expense_df: pd.DataFrame) -> tuple:
             x=sum_month_df["Date"],
             y=sum_month_df["Amount ($)"],
             name=name,
-            marker=dict(color=color),
+            marker={"color": color},
             hovertemplate="<b>Date:</b> %{x}<br><b>Amount:</b> $%{y:.2f}<extra></extra>",
         )
         return finance_chart, sum_month_df
 
-    monthly_expense_df = (
-        reformatted_expense_df.groupby("Category")
-        .resample("ME")
-        .sum("Amount ($)")
-        .reset_index()
-        .set_index("Date")
-    )
-    monthly_expense_df.index = monthly_expense_df.index.month_name()
+    monthly_expense_df = monthly_cube_breakdown(expense_cube, "category", "Category")
 
     # Line chart showing expense per category over each month
     finance_chart = px.line(
@@ -252,27 +161,13 @@ def finance_figures(income_df: pd.DataFrame, expense_df: pd.DataFrame) -> tuple:
 
     # Add income to finance chart
     sum_month_income_df = pd.DataFrame(columns=["Date", "Income Amount ($)"])
-    if not income_df.empty:
-        reformatted_income_df = pd.DataFrame(
-            {
-                "Source": income_df.source.tolist(),
-                "Amount ($)": income_df.amount.tolist(),
-                "Date": pd.to_datetime([date for date in income_df.date.tolist()]),
-            }
-        ).set_index("Date")
-        monthly_income_df = (
-            reformatted_income_df.groupby("Source")
-            .resample("ME")
-            .sum("Amount ($)")
-            .reset_index()
-            .set_index("Date")
-        )
-        monthly_income_df.index = monthly_income_df.index.month_name()
+    if not income_cube.empty:
+        monthly_income_df = monthly_cube_breakdown(income_cube, "source", "Source")
         finance_chart, sum_month_income_df = monthly_total_breakdown(
             monthly_income_df, finance_chart, "lightslategrey", "Income"
         )
 
-         # Total monthly income
+        # Total monthly income
         sum_month_income_df = sum_month_income_df.rename(
             columns={"Amount ($)": "Income Amount ($)"}
         )
@@ -281,149 +176,427 @@ def finance_figures(income_df: pd.DataFrame, expense_df: pd.DataFrame) -> tuple:
     sum_month_expense_df = sum_month_expense_df.rename(
         columns={"Amount ($)": "Expense Amount ($)"}
     )
-    
+
     # Total monthly expense and income
     sum_month_finance_df = pd.merge(
         sum_month_expense_df, sum_month_income_df, on="Date", how="outer"
     )
 
-    return category_expense_bar, finance_chart, sum_month_finance_df, expense_df, income_df
+    return category_expense_bar, finance_chart, sum_month_finance_df
 
 
-def dashboard():
-    dates = get_all_expense_dates()
+@st.cache_resource(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def year_figures(year: int, data_version: tuple) -> tuple:
+    """
+    Finance figures and tables of a year, computed once per version of the
+    ledgers and shared by every session viewing it.
 
-    years = sorted(pd.to_datetime(dates["date"]).dt.year.unique(), reverse=True)
-    year_select = st.selectbox("Select Year", years, index=0)
-    if year_select:
-        # Expense and income dataframes
-        expense_df = get_expenses_df(year_select)
-        income_df = get_incomes_df(year_select)
-
-        # Total expenses & incomes
-        total_expense = expense_df.amount.sum()
-        total_income = income_df.amount.sum()
-        total_savings = total_income - total_expense
-        total_expense_no_rent = expense_df[expense_df["category"].str.lower() != "rent"].amount.sum()
-
-        # Breakdown of total expense, income and savings
-        expense, income, savings = st.columns(3)
-        expense.metric(label="Total Expense", value=f"{float(total_expense):.2f}$", border=True)
-        income.metric(label="Total Income", value=f"{float(total_income):.2f}$", border=True)
-        savings.metric(
-            label="Total Savings", value=f"{float(total_savings):.2f}$", border=True
+    Reruns that don't change the data (e.g. picking a category in the monthly
+    averages) reuse them; any write changes data_version, so they are computed
+    again. The least recently used ones are evicted past FIGURE_CACHE_ENTRIES.
+    The figures and DataFrames are shared and must not be modified in place.
+
+    Args:
+        year (int): Year to chart
+        data_version (tuple): Versions of the expense and income ledgers, only
+            used as part of the cache key
+
+    Returns:
+        tuple: Sankey diagram, finance chart, monthly finance table and monthly
+        averages by category
+    """
+
+    # The figures and tables show dollars
+    expense_cube = get_expense_cube(year)
+    income_cube = get_income_cube(year)
+    expense_cube = expense_cube.assign(amount=to_dollars(expense_cube["amount"]))
+    income_cube = income_cube.assign(amount=to_dollars(income_cube["amount"]))
+
+    category_expense_bar, finance_chart, sum_month_finance_df = finance_figures(
+        income_cube, expense_cube
+    )
+    finance_chart.update_layout(
+        xaxis={"categoryorder": "array", "categoryarray": list(MONTHS_MAP.keys())}
+    )
+
+    # Calculate total expense per category and divide by the current month
+    current_month = expense_cube["month"].max()
+    monthly_avg_df = (
+        expense_cube.groupby("category")["amount"]
+        .sum()
+        .div(current_month)
+        .round(2)
+        .reset_index()
+        .rename(columns={"amount": "Monthly Average ($)"})
+        .sort_values("Monthly Average ($)", ascending=False)
+    )
+    return category_expense_bar, finance_chart, sum_month_finance_df, monthly_avg_df
+
+
+def timed_fragment(name: str):
+    """
+    Turn a dashboard section into a fragment, so that its widgets only rerun
+    the section, and record how long each of its runs takes in
+    st.session_state.rerun_timings for the debug panel.
+
+    Args:
+        name (str): Name of the section in the debug panel
+    """
+
+    def decorate(section):
+        @st.fragment
+        @functools.wraps(section)
+        def run(*args, **kwargs):
+            start = time.perf_counter()
+            section(*args, **kwargs)
+            record_timing(name, time.perf_counter() - start)
+
+        return run
+
+    return decorate
+
+
+def record_timing(name: str, seconds: float):
+    """Record the last run time and the run count of a dashboard section."""
+    timings = st.session_state.setdefault("rerun_timings", {})
+    runs = timings.get(name, {}).get("Runs", 0)
+    timings[name] = {"Last run (ms)": round(seconds * 1000, 1), "Runs": runs + 1}
+
+
+@st.fragment(run_every=1)
+def debug_panel():
+    """Run time of the last run of each dashboard section, refreshed every second."""
+    st.dataframe(
+        pd.DataFrame.from_dict(
+            st.session_state.get("rerun_timings", {}), orient="index"
         )
-        
-        # Get finance figures/charts and data
-        category_expense_bar, finance_chart, sum_month_finance_df, expense_data, income_data = (
-            finance_figures(income_df, expense_df)
+    )
+
+
+def ledger_version() -> tuple:
+    """Versions of the expense and income ledgers, keying the cached figures."""
+    return get_ledger_version("expenses.json") + get_ledger_version("incomes.json")
+
+
+@timed_fragment("Headline metrics")
+def headline_metrics(year_select: int):
+    """
+    Total expense, income and savings of the year, and the monthly averages.
+
+    Args:
+        year_select (int): Selected year
+    """
+
+    expense_cube = get_expense_cube(year_select)
+    income_cube = get_income_cube(year_select)
+    _, _, sum_month_finance_df, _ = year_figures(year_select, ledger_version())
+
+    # Total expenses & incomes, in cents
+    total_expense = expense_cube.amount.sum()
+    total_income = income_cube.amount.sum()
+    total_savings = total_income - total_expense
+    total_expense_no_rent = expense_cube[
+        expense_cube["category"].str.lower() != "rent"
+    ].amount.sum()
+
+    # Breakdown of total expense, income and savings
+    expense, income, savings = st.columns(3)
+    expense.metric(
+        label="Total Expense", value=f"{to_dollars(total_expense):.2f}$", border=True
+    )
+    income.metric(
+        label="Total Income", value=f"{to_dollars(total_income):.2f}$", border=True
+    )
+    savings.metric(
+        label="Total Savings", value=f"{to_dollars(total_savings):.2f}$", border=True
+    )
+
+    # Breakdown of average expense with/without rent per month, and percentage saved
+    avg_expense, avg_expense_no_rent, saved = st.columns(3)
+    avg_expense.metric(
+        label="Avg Expense / Month",
+        value=f"{to_dollars(total_expense / len(sum_month_finance_df)).round(2)}$",
+        border=True,
+    )
+    avg_expense_no_rent.metric(
+        label="Avg Expense / Month (No Rent)",
+        value=(
+            f"{to_dollars(total_expense_no_rent / len(sum_month_finance_df)).round(2)}$"
+        ),
+        border=True,
+    )
+    saved.metric(
+        label="% Saved",
+        value=f"{(total_savings / total_income * 100).round(2)}%",
+        border=True,
+    )
+
+
+@timed_fragment("Exports")
+def exports(year_select: int):
+    """
+    Sidebar buttons downloading the expenses and incomes of the selected year,
+    a date range or all years, as CSV or Parquet. The files are only
+    generated when a button is clicked, chunk by chunk (see export_utils).
+
+    Args:
+        year_select (int): Selected year
+    """
+
+    st.sidebar.subheader("Export Data")
+    export_range = st.sidebar.radio(
+        "Export range", ["Selected year", "Date range", "All years"], key="export_range"
+    )
+    start, end = date(year_select, 1, 1), date(year_select, 12, 31)
+    suffix = str(year_select)
+    if export_range == "Date range":
+        date_range = st.sidebar.date_input(
+            "Export dates", value=(start, end), key="export_dates"
         )
-        
-        # Download Expense CSV
-        expense_data['date'] = pd.to_datetime(expense_data['date'])
-        expense_csv = expense_data[expense_data['date'].dt.year == year_select].assign(Type='Expense').rename(
-            columns={
-                'category': 'Category',
-                'amount': 'Amount',
-                'date': 'Date',
-                'notes': 'Notes'
-            }
-        )[['Type', 'Category', 'Amount', 'Date', 'Notes']].to_csv(index=False)
+        # The picker holds a single date until the end of the range is chosen
+        if len(date_range) != 2:
+            return
+        start, end = date_range
+        suffix = f"{start}_{end}"
+    elif export_range == "All years":
+        start = end = None
+        suffix = "all"
+
+    export_format = st.sidebar.selectbox(
+        "Export format", EXPORT_FORMATS, key="export_format"
+    )
+    extension, mime, export = {
+        "CSV": ("csv", "text/csv", export_csv),
+        "Parquet": ("parquet", "application/vnd.apache.parquet", export_parquet),
+    }[export_format]
+    for filename, label in (("expenses.json", "Expense"), ("incomes.json", "Income")):
         st.sidebar.download_button(
-            label="📥 Export Expense Data as CSV",
-            data=expense_csv,
-            file_name=f'expense_data_{year_select}.csv',
-            mime='text/csv',
-            help='Download all expense data as a CSV file'
+            label=f"📥 Export {label} Data as {export_format}",
+            data=functools.partial(export, filename, start, end),
+            file_name=f"{label.lower()}_data_{suffix}.{extension}",
+            mime=mime,
+            help=f"Download the {label.lower()} data as a {export_format} file",
+            on_click="ignore",
         )
 
-        # Download Income CSV
-        income_data['date'] = pd.to_datetime(income_data['date'])
-        income_csv = income_data[income_data['date'].dt.year == year_select].assign(Type='Income').rename(columns={'source': 'Source', 'amount': 'Amount', 'date': 'Date'})[['Type', 'Source', 'Amount', 'Date']].to_csv(index=False)
-        st.sidebar.download_button(
-            label="📥 Export Income Data as CSV",
-            data=income_csv,
-            file_name=f'income_data_{year_select}.csv',
-            mime='text/csv',
-            help='Download all income data as a CSV file'
+
+@timed_fragment("Charts")
+def charts(year_select: int):
+    """
+    Sankey diagram of the financial flow and monthly breakdown chart.
+
+    Args:
+        year_select (int): Selected year
+    """
+
+    category_expense_bar, finance_chart, _, _ = year_figures(
+        year_select, ledger_version()
+    )
+    st.plotly_chart(category_expense_bar)
+    st.plotly_chart(finance_chart)
+
+
+@timed_fragment("Category averages")
+def category_averages(year_select: int):
+    """
+    Monthly average expense per category, filtered by a category picker.
+
+    Args:
+        year_select (int): Selected year
+    """
+
+    _, _, _, monthly_avg_df = year_figures(year_select, ledger_version())
+
+    st.subheader("Monthly Averages by Category")
+
+    selected_category = st.selectbox(
+        "Select a category to see monthly average:",
+        ["All Categories"] + monthly_avg_df["category"].tolist(),
+    )
+
+    if selected_category != "All Categories":
+        monthly_avg_df = monthly_avg_df[monthly_avg_df["category"] == selected_category]
+    st.dataframe(
+        monthly_avg_df,
+        column_config={
+            "category": "Category",
+            "Monthly Average ($)": st.column_config.NumberColumn(
+                "Monthly Average ($)", format="$%.2f"
+            ),
+        },
+        hide_index=True,
+    )
+
+
+@timed_fragment("Monthly breakdown")
+def monthly_breakdown(year_select: int):
+    """
+    Table of the total expense and income of each month.
+
+    Args:
+        year_select (int): Selected year
+    """
+
+    _, _, sum_month_finance_df, _ = year_figures(year_select, ledger_version())
+
+    st.subheader("Monthly Finance Breakdown")
+    st.dataframe(
+        sum_month_finance_df,
+        hide_index=True,
+        column_config={
+            "Expense Amount ($)": st.column_config.NumberColumn(
+                "Expense Amount ($)", format="$%.2f"
+            ),
+            "Income Amount ($)": st.column_config.NumberColumn(
+                "Income Amount ($)", format="$%.2f"
+            ),
+        },
+    )
+
+
+@timed_fragment("Date range totals")
+def date_range_totals(first_date, last_date):
+    """
+    Totals of expenses and incomes over a custom date range picked by the user.
+
+    Args:
+        first_date (date): Earliest selectable date
+        last_date (date): Latest selectable date
+    """
+
+    st.subheader("Date Range Totals")
+    date_range = st.date_input(
+        "Select Date Range",
+        value=(first_date, last_date),
+        min_value=first_date,
+        max_value=last_date,
+    )
+    # The picker holds a single date until the end of the range is chosen
+    if len(date_range) != 2:
+        return
+
+    start, end = date_range
+    range_expense, num_expenses = get_expense_total_between(start, end)
+    range_income, _ = get_income_total_between(start, end)
+
+    expense, income, savings = st.columns(3)
+    expense.metric(
+        label=f"Expense ({num_expenses} transactions)",
+        value=f"{to_dollars(range_expense):.2f}$",
+        border=True,
+    )
+    income.metric(label="Income", value=f"{to_dollars(range_income):.2f}$", border=True)
+    savings.metric(
+        label="Savings",
+        value=f"{to_dollars(range_income - range_expense):.2f}$",
+        border=True,
+    )
+
+
+@timed_fragment("Trends")
+def trends(first_date, last_date):
+    """
+    Expense and income per day, week or month over any range of dates,
+    across years.
+
+    The totals are aggregated per period from the date indexes before
+    charting, at most MAX_CHART_POINTS periods per series, so the chart stays
+    the same size however many records the range holds.
+
+    Args:
+        first_date (date): Earliest selectable date
+        last_date (date): Latest selectable date
+    """
+
+    st.subheader("Trends")
+    date_range = st.date_input(
+        "Select Trend Range",
+        value=(first_date, last_date),
+        min_value=first_date,
+        max_value=last_date,
+        key="trend_range",
+    )
+    # The picker holds a single date until the end of the range is chosen
+    if len(date_range) != 2:
+        return
+
+    granularity_col, category_col = st.columns(2)
+    granularity = granularity_col.radio(
+        "Granularity", list(GRANULARITIES), index=2, horizontal=True
+    )
+    category = category_col.selectbox(
+        "Expense category",
+        ["All Categories"] + sorted(get_expense_cube()["category"].unique().tolist()),
+        key="trend_category",
+    )
+    category = None if category == "All Categories" else category
+
+    start, end = date_range
+    expense_periods, expense_totals = get_expense_totals_by_period(
+        start, end, granularity, category, MAX_CHART_POINTS
+    )
+    income_periods, income_totals = get_income_totals_by_period(
+        start, end, granularity, MAX_CHART_POINTS
+    )
+
+    trend_chart = go.Figure()
+    trend_chart.add_scatter(
+        x=expense_periods.astype(str),
+        y=to_dollars(expense_totals),
+        name=category or "Expense",
+        line={"color": "grey"},
+        hovertemplate=TREND_HOVER_TEMPLATE,
+    )
+    if category is None:
+        trend_chart.add_scatter(
+            x=income_periods.astype(str),
+            y=to_dollars(income_totals),
+            name="Income",
+            line={"color": "lightslategrey"},
+            hovertemplate=TREND_HOVER_TEMPLATE,
+        )
+    trend_chart.update_layout(yaxis_title="Amount ($)", hovermode="x unified")
+    st.plotly_chart(trend_chart)
+
+
+def dashboard():
+    """
+    Finance dashboard of the selected year.
+
+    Picking a year reruns the whole page; each section below is a fragment,
+    so its own widgets (e.g. the category picker) only rerun that section.
+    """
+
+    start = time.perf_counter()
+    summary = get_expense_summary()
+
+    years = sorted((int(year) for year in summary["years"]), reverse=True)
+    year_select = st.selectbox("Select Year", years, index=0)
+    if year_select:
+        headline_metrics(year_select)
+        exports(year_select)
+        charts(year_select)
+        category_averages(year_select)
+        monthly_breakdown(year_select)
+
+        date_range_totals(
+            date.fromisoformat(summary["min_date"]),
+            date.fromisoformat(summary["max_date"]),
         )
 
-        if (
-            category_expense_bar is not None
-            and finance_chart is not None
-        ):
-            
-            # Breakdown of average expense with/without rent per month, and percentage saved
-            avg_expense, avg_expense_no_rent, saved = st.columns(3)
-            avg_expense.metric(
-                label="Avg Expense / Month",
-                value=f"{(total_expense / len(sum_month_finance_df)).round(2)}$",
-                border=True,
-                )
-            avg_expense_no_rent.metric(
-                label="Avg Expense / Month (No Rent)",
-                value=f"{(total_expense_no_rent / len(sum_month_finance_df)).round(2)}$",
-                border=True,
-            )
-            saved.metric(
-                label="% Saved",
-                value=f"{(total_savings / total_income * 100).round(2)}%",
-                border=True,
-            )
-
-            finance_chart.update_layout(
-                xaxis=dict(categoryorder="array", categoryarray=list(MONTHS_MAP.keys()))
-            )
-            st.plotly_chart(category_expense_bar)
-            st.plotly_chart(finance_chart)
-            
-            st.subheader("Monthly Averages by Category")
-            
-            # Calculate total expense per category and divide by the current month
-            expense_df["date"] = pd.to_datetime(expense_df["date"])
-            current_month = expense_df["date"].dt.month.max()
-            monthly_avg_df = (
-                expense_df.groupby("category")["amount"]
-                .sum()
-                .div(current_month)
-                .round(2)
-                .reset_index()
-                .rename(columns={"amount": "Monthly Average ($)"})
-                .sort_values("Monthly Average ($)", ascending=False)
-            )
-            
-            selected_category = st.selectbox(
-                "Select a category to see monthly average:",
-                ["All Categories"] + monthly_avg_df["category"].tolist()
-            )
-            
-            if selected_category != "All Categories":
-                monthly_avg_df = monthly_avg_df[monthly_avg_df["category"] == selected_category]
-            st.dataframe(
-                monthly_avg_df,
-                column_config={
-                    "category": "Category",
-                    "Monthly Average ($)": st.column_config.NumberColumn(
-                        "Monthly Average ($)",
-                        format="$%.2f"
-                    )
-                },
-                hide_index=True,
-            )
-            
-            st.subheader("Monthly Finance Breakdown")
-            st.dataframe(
-                sum_month_finance_df,
-                hide_index=True,
-                column_config={
-                    "Expense Amount ($)": st.column_config.NumberColumn(
-                        "Expense Amount ($)", format="$%.2f"
-                    ),
-                    "Income Amount ($)": st.column_config.NumberColumn(
-                        "Income Amount ($)", format="$%.2f"
-                    ),
-                },
-            )
+        # Incomes may start before or end after the expenses
+        dates = [
+            d
+            for s in (summary, get_income_summary())
+            for d in (s["min_date"], s["max_date"])
+            if d
+        ]
+        trends(date.fromisoformat(min(dates)), date.fromisoformat(max(dates)))
+
+    record_timing("Full page", time.perf_counter() - start)
+    if DEBUG_TIMINGS:
+        with st.sidebar.expander("Rerun Timings"):
+            debug_panel()
 
 
 dashboard()
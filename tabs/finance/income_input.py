@@ -1,9 +1,9 @@
-import pandas as pd
 import streamlit as st
 
 from datetime import date, datetime
 
 from utils.income_utils import get_incomes_df, save_income_data, delete_income_data
+from utils.money_utils import to_dollars
 from utils.session_state_utils import init_income_session_state
 from resources.constants import MONTHS_MAP
 
@@ -66,9 +66,10 @@ def get_monthly_breakdown():
 
     income_df = get_incomes_df()
     if not income_df.empty:
-        income_df["date"] = pd.to_datetime(income_df["date"])
-        income_df["month"] = income_df["date"].dt.month_name()
-        income_df["year"] = income_df["date"].dt.year
+        income_df = income_df.assign(
+            month=income_df["date"].dt.month_name(),
+            amount=to_dollars(income_df["amount"]),
+        )
 
         # Group by year and month and calculate summaries
         monthly_breakdown = (
@@ -103,9 +104,14 @@ def get_monthly_breakdown():
                 with avg:
                     st.metric("Average ($)", breakdown["Average ($)"])
 
-                month_income_df = get_incomes_df(
-                    f"{year_select}-{datetime.strptime(month_select, '%B').month:02d}"
-                ).sort_values("date").reset_index(drop=True)
+                month_income_df = (
+                    get_incomes_df(
+                        f"{year_select}-{datetime.strptime(month_select, '%B').month:02d}"
+                    )
+                    .sort_values("date")
+                    .reset_index(drop=True)
+                )
+                month_income_df["amount"] = to_dollars(month_income_df["amount"])
                 st.data_editor(
                     month_income_df,
                     key="edited_month_income",
@@ -115,7 +121,7 @@ def get_monthly_breakdown():
                         "amount": st.column_config.NumberColumn(
                             "Amount ($)", format="$%.2f"
                         ),
-                        "date": st.column_config.TextColumn("Date"),
+                        "date": st.column_config.DateColumn("Date"),
                         "source": st.column_config.TextColumn("Source"),
                     },
                     hide_index=True,
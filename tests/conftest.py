@@ -0,0 +1,52 @@
+import pytest
+
+from utils import (
+    backend_utils,
+    json_utils,
+    jsonstore_utils,
+    ledger_utils,
+    storage_utils,
+)
+
+
+def clear_caches() -> None:
+    """Drop every in-process view of the data files, as a restart would."""
+    json_utils._initialized = False
+    json_utils.clear_json_cache()
+    for cache in (
+        ledger_utils._ledger_cache,
+        ledger_utils._cube_cache,
+        ledger_utils._summary_cache,
+        ledger_utils._date_index_cache,
+    ):
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Run each test against an empty data directory and empty caches."""
+    configured = storage_utils.STORAGE_BACKEND
+    monkeypatch.setattr(storage_utils, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(storage_utils, "DURABILITY", "none")
+    # No background compaction of a few deletes, unless a test asks for it
+    monkeypatch.setattr(jsonstore_utils, "TOMBSTONE_COMPACT_RATIO", float("inf"))
+    monkeypatch.setattr(jsonstore_utils, "_compacting", set())
+    backend_utils.use_backend("json")
+    clear_caches()
+    yield tmp_path
+    backend_utils.use_backend(configured)
+    clear_caches()
+
+
+@pytest.fixture
+def restart():
+    """Get a function dropping the in-process caches, as a restart would."""
+    return clear_caches
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request, data_dir):
+    """Run a test once per storage backend, with initialized data files."""
+    backend_utils.use_backend(request.param)
+    json_utils.init_data_files()
+    return request.param
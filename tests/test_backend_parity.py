@@ -0,0 +1,133 @@
+import pytest
+
+from utils import backend_utils, json_utils, storage_utils
+from utils.writer_utils import commit_json
+
+EXPENSES = [
+    {
+        "id": i,
+        "amount": amount,
+        "category": category,
+        "date": date,
+        "notes": notes,
+        "frequency": None,
+        "recurring_id": None,
+    }
+    for i, (amount, category, date, notes) in enumerate(
+        [
+            (1250, "Grocery", "2024-01-31", None),
+            (150000, "Rent", "2024-02-15", "Feb"),
+            (999, "Health", "2024-02-20", ""),
+            (4500, "Grocery", "2025-03-01", "weekly shop"),
+            (2000, "Home", "2025-12-31", None),
+        ],
+        start=1,
+    )
+]
+
+
+def by_id(record: dict) -> int:
+    return record["id"]
+
+
+def run_scenario() -> dict:
+    """Apply the same writes, then gather every kind of read."""
+    commit_json(
+        [
+            {"file": "categories.json", "op": "extend", "data": ["Rent", "Travel"]},
+            {"file": "expenses.json", "op": "insert", "data": EXPENSES},
+        ]
+    )
+    json_utils.append_json(
+        "incomes.json",
+        "insert",
+        [{"id": 1, "amount": 500000, "date": "2024-02-01", "source": "Job"}],
+    )
+    moved = {**EXPENSES[0], "category": "Travel", "date": "2025-01-05"}
+    commit_json(
+        [
+            {"file": "expenses.json", "op": "update", "data": [moved]},
+            {"file": "expenses.json", "op": "delete", "data": [3]},
+        ]
+    )
+
+    data = json_utils.read_json("expenses.json")
+    frame = json_utils.query_frame("expenses.json", "2025")
+    # Each backend returns records in its own order
+    return {
+        "next_id": data["next_id"],
+        "records": sorted(data["records"], key=by_id),
+        "incomes": json_utils.read_json("incomes.json"),
+        "categories": json_utils.read_json("categories.json"),
+        "filtered": sorted(
+            json_utils.query_json("expenses.json", "2025", "Grocery"), key=by_id
+        ),
+        "frame": frame.sort_values("id").to_dict("list"),
+        "month": sorted(json_utils.query_json("expenses.json", "2025-01"), key=by_id),
+        "cube": json_utils.query_cube("expenses.json").to_dict("list"),
+        "summary": json_utils.query_summary("expenses.json"),
+        "key_ids": json_utils.query_key_ids("expenses.json", "Travel"),
+        "count": json_utils.count_key("expenses.json", "Grocery"),
+        "no_source": json_utils.count_key("incomes.json", ""),
+    }
+
+
+def test_backends_agree(data_dir, monkeypatch):
+    results = {}
+    for name in backend_utils.BACKENDS:
+        # A fresh data directory and process state per backend
+        (data_dir / name).mkdir()
+        monkeypatch.setattr(storage_utils, "DATA_DIR", str(data_dir / name))
+        monkeypatch.setattr(json_utils, "_initialized", False)
+        backend_utils.use_backend(name)
+        json_utils.init_data_files()
+        results[name] = run_scenario()
+
+    assert results["json"] == results["sqlite"]
+    assert results["json"]["key_ids"] == [1]
+    assert results["json"]["next_id"] == 6
+    assert [r["id"] for r in results["json"]["filtered"]] == [4]
+    assert [r["id"] for r in results["json"]["month"]] == [1]
+
+
+def test_inserted_records_get_every_field(backend):
+    json_utils.append_json(
+        "incomes.json", "insert", [{"id": 1, "amount": 1000, "date": "2024-05-01"}]
+    )
+    json_utils.clear_json_cache()
+
+    assert json_utils.read_json("incomes.json")["records"] == [
+        {"id": 1, "amount": 1000, "date": "2024-05-01", "source": None}
+    ]
+
+
+def test_sqlite_is_seeded_from_json_files(data_dir):
+    json_utils.init_data_files()
+    json_utils.append_json("expenses.json", "insert", EXPENSES[:2])
+
+    backend_utils.use_backend("sqlite")
+    json_utils._initialized = False
+    json_utils.init_data_files()
+
+    assert json_utils.read_json("expenses.json")["records"] == EXPENSES[:2]
+    assert json_utils.read_json("categories.json") == storage_utils.DEFAULT_CATEGORIES
+
+
+def test_update_replaces_whole_record(backend):
+    json_utils.append_json("expenses.json", "insert", EXPENSES[:1])
+    record = {**EXPENSES[0], "notes": "changed"}
+
+    commit_json([{"file": "expenses.json", "op": "update", "data": [record]}])
+    with pytest.raises(ValueError, match="lacks"):
+        commit_json(
+            [
+                {
+                    "file": "expenses.json",
+                    "op": "update",
+                    "data": [{"id": 1, "amount": 1.0}],
+                }
+            ]
+        )
+    json_utils.clear_json_cache()
+
+    assert json_utils.query_json("expenses.json") == [record]
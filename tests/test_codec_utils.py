@@ -0,0 +1,142 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import (
+    codec_utils,
+    json_utils,
+    jsonstore_utils,
+    partition_utils,
+    storage_utils,
+    stream_utils,
+)
+from utils.writer_utils import commit_json
+
+RECORDS = [
+    {"id": 1, "amount": 12.5, "category": "Café", "date": "2024-03-02", "notes": None},
+    {"id": 2, "amount": 3.0, "category": "Home", "date": "2024-03-15", "notes": ""},
+]
+FIELDS = ["id", "amount", "category", "date", "notes"]
+
+
+@pytest.mark.parametrize("codec", codec_utils.CODECS)
+def test_codecs_round_trip_compactly(codec):
+    data = {"next_id": 3, "records": RECORDS}
+
+    encoded = codec_utils.dumps(data, codec=codec)
+
+    assert b" " not in encoded.replace(b"Caf\xc3\xa9", b"")
+    assert codec_utils.loads(encoded, codec=codec) == data
+    assert json.loads(codec_utils.dumps(data, pretty=True, codec=codec)) == data
+
+
+@pytest.mark.parametrize("codec", codec_utils.CODECS)
+def test_invalid_json_raises_decode_error(codec):
+    with pytest.raises(json.JSONDecodeError):
+        codec_utils.loads(b'{"records": [', codec=codec)
+
+
+def test_records_are_stored_as_rows():
+    encoded = codec_utils.encode_records(RECORDS, FIELDS)
+
+    assert encoded == {
+        "fields": FIELDS,
+        "dictionaries": {},
+        "rows": [
+            [1, 12.5, "Café", "2024-03-02", None],
+            [2, 3.0, "Home", "2024-03-15", ""],
+        ],
+    }
+    assert codec_utils.decode_records(encoded) == RECORDS
+    assert codec_utils.decode_records({"records": RECORDS}) == RECORDS
+
+
+def test_repeated_strings_are_dictionary_encoded():
+    records = RECORDS + [{**RECORDS[0], "id": 3}]
+
+    encoded = codec_utils.encode_records(records, FIELDS, ["category", "notes"])
+
+    assert encoded["dictionaries"] == {"category": ["Café", "Home"], "notes": [""]}
+    assert [row[2:] for row in encoded["rows"]] == [
+        [0, "2024-03-02", -1],
+        [1, "2024-03-15", 0],
+        [0, "2024-03-02", -1],
+    ]
+    assert codec_utils.decode_records(encoded) == records
+
+
+@pytest.mark.parametrize("dictionary_fields", [(), ["category", "notes"]])
+def test_rows_are_streamed(tmp_path, dictionary_fields):
+    path = tmp_path / "rows.json"
+    encoded = codec_utils.encode_records(RECORDS, FIELDS, dictionary_fields)
+    path.write_bytes(codec_utils.dumps(encoded))
+
+    records = stream_utils.iter_records(str(path), chunk_size=5)
+
+    assert list(records) == RECORDS
+
+
+def test_frames_are_decoded_with_categoricals():
+    encoded = codec_utils.encode_records(RECORDS, FIELDS, ["category", "notes"])
+
+    df = codec_utils.decode_frame(encoded, ["category"], {"id": np.int64})
+
+    assert df["id"].dtype == np.int64
+    assert isinstance(df["category"].dtype, pd.CategoricalDtype)
+    assert df["category"].tolist() == ["Café", "Home"]
+    assert df["notes"].tolist() == [None, ""]
+
+
+def test_year_frames_keep_the_union_of_their_categories(data_dir):
+    json_utils.init_data_files()
+    expenses = [
+        {"amount": 100, "category": "Home", "date": "2024-01-02"},
+        {"amount": 200, "category": "Travel", "date": "2025-01-02"},
+    ]
+    commit_json([{"file": "expenses.json", "op": "insert", "data": expenses}])
+    jsonstore_utils.compact_store("expenses.json")
+
+    with open(storage_utils.get_partition_path("expenses.json", "2025")) as f:
+        assert json.load(f)["dictionaries"]["category"] == ["Travel"]
+    json_utils.clear_json_cache()
+    df = json_utils.query_frame("expenses.json")
+
+    assert isinstance(df["category"].dtype, pd.CategoricalDtype)
+    assert list(df["category"].cat.categories) == ["Home", "Travel"]
+    assert df["category"].tolist() == ["Home", "Travel"]
+
+
+def test_record_partitions_of_earlier_versions_are_read(data_dir, restart):
+    json_utils.init_data_files()
+    expense = {
+        "id": 1,
+        "amount": 12.5,
+        "category": "Grocery",
+        "date": "2024-03-02",
+        "notes": None,
+        "frequency": None,
+        "recurring_id": None,
+    }
+    path = storage_utils.get_partition_path("expenses.json", "2024")
+    with open(path, "w") as f:
+        json.dump({"records": [expense]}, f, indent=2)
+    with open(storage_utils.get_manifest_path("expenses.json"), "w") as f:
+        json.dump({"next_id": 2, "years": ["2024"]}, f)
+    restart()
+
+    assert json_utils.read_json("expenses.json")["records"] == [expense]
+    assert json_utils.query_json("expenses.json", "2024-03") == [expense]
+    assert partition_utils.read_partition_frame("expenses.json", "2024")[
+        "id"
+    ].tolist() == [1]
+
+
+def test_export_is_pretty_printed(data_dir):
+    json_utils.init_data_files()
+
+    exported = json_utils.export_json("categories.json")
+
+    assert exported.startswith(b'[\n  "')
+    assert json.loads(exported) == storage_utils.DEFAULT_CATEGORIES
@@ -0,0 +1,103 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import (
+    columnar_utils,
+    json_utils,
+    ledger_utils,
+    partition_utils,
+    storage_utils,
+)
+
+EXPENSES = [
+    {
+        "id": i,
+        "amount": amount,
+        "category": category,
+        "date": date,
+        "notes": notes,
+        "frequency": None,
+        "recurring_id": None,
+    }
+    for i, (amount, category, date, notes) in enumerate(
+        [
+            (1250, "Grocery", "2024-01-31", None),
+            (150000, "Rent", "2024-02-15", "Feb"),
+            (999, "Grocery", "2024-02-20", ""),
+        ],
+        start=1,
+    )
+]
+FIELDS = storage_utils.RECORD_FIELDS["expenses.json"]
+
+
+def test_columns_round_trip(data_dir):
+    path = str(data_dir / "columns")
+
+    columnar_utils.write_columns(path, EXPENSES, FIELDS)
+    df = columnar_utils.read_columns(path, FIELDS)
+
+    assert df["id"].tolist() == [1, 2, 3]
+    assert df["amount"].tolist() == [1250, 150000, 999]
+    assert df["category"].tolist() == ["Grocery", "Rent", "Grocery"]
+    assert df["notes"].tolist() == [None, "Feb", ""]
+    assert df["date"].tolist() == list(
+        pd.to_datetime(["2024-01-31", "2024-02-15", "2024-02-20"])
+    )
+
+
+def test_missing_snapshot_reads_as_none(data_dir):
+    assert columnar_utils.read_columns(str(data_dir / "columns"), FIELDS) is None
+
+
+@pytest.mark.parametrize("snapshots", [False, True])
+def test_query_frame_overlays_the_journal(monkeypatch, restart, snapshots):
+    monkeypatch.setattr(partition_utils, "COLUMNAR_SNAPSHOTS", snapshots)
+    json_utils.init_data_files()
+    json_utils.write_json("expenses.json", {"next_id": 4, "records": EXPENSES})
+    json_utils.append_json("expenses.json", "delete", [2])
+    moved = {**EXPENSES[0], "amount": 2000, "date": "2024-02-01"}
+    json_utils.append_json("expenses.json", "update", [moved])
+    restart()
+
+    df = json_utils.query_frame("expenses.json", "2024-02").sort_values("id")
+
+    assert df["id"].tolist() == [1, 3]
+    assert df["amount"].tolist() == [2000, 999]
+    assert df["date"].dtype == "datetime64[s]"
+    columns_dir = os.path.join(storage_utils.get_store_dir("expenses.json"), "columns")
+    assert os.path.isdir(columns_dir) == snapshots
+
+
+def is_mapped(values: np.ndarray) -> bool:
+    """Whether an array is a view of a memory-mapped file."""
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = values.base
+    return False
+
+
+def test_numeric_columns_are_views_of_the_mapped_files(data_dir):
+    path = str(data_dir / "columns")
+    columnar_utils.write_columns(path, EXPENSES, FIELDS)
+
+    df = columnar_utils.read_columns(path, FIELDS, storage_utils.CATEGORICAL_FIELDS)
+
+    assert is_mapped(df["id"].to_numpy())
+    assert is_mapped(df["amount"].to_numpy())
+
+
+def test_ledger_of_a_snapshot_year_is_not_copied(monkeypatch, restart):
+    monkeypatch.setattr(partition_utils, "COLUMNAR_SNAPSHOTS", True)
+    json_utils.init_data_files()
+    json_utils.write_json("expenses.json", {"next_id": 4, "records": EXPENSES})
+    restart()
+
+    ledger = ledger_utils.load_ledger("expenses.json", 2024)
+
+    assert is_mapped(ledger["id"].to_numpy())
+    assert is_mapped(ledger["amount"].to_numpy())
@@ -0,0 +1,139 @@
+import json
+import os
+
+from utils import cube_utils, json_utils, jsonstore_utils, storage_utils
+from utils.journal_utils import append_journal
+
+EXPENSES = [
+    {
+        "id": i,
+        "amount": amount,
+        "category": category,
+        "date": date,
+        "notes": None,
+        "frequency": None,
+        "recurring_id": None,
+    }
+    for i, (amount, category, date) in enumerate(
+        [
+            (1000, "Home", "2024-01-01"),
+            (250, "Grocery", "2024-01-07"),
+            (4000, "Home", "2024-01-29"),
+            (125, "Grocery", "2025-04-30"),
+        ],
+        start=1,
+    )
+]
+
+
+def rebuilt_cube(filename: str) -> list[dict]:
+    """The cube built from scratch off the current records."""
+    records = json_utils.read_json(filename)["records"]
+    key = cube_utils.CUBE_KEYS[filename]
+    cube = cube_utils.build_cube(records, key)
+    return cube_utils.cube_frame(cube["cells"], key).to_dict("records")
+
+
+def test_cube_follows_writes(backend):
+    json_utils.append_json("expenses.json", "insert", EXPENSES)
+    json_utils.append_json(
+        "expenses.json",
+        "update",
+        [{**EXPENSES[0], "amount": 500, "category": "Grocery", "date": "2025-04-01"}],
+    )
+    json_utils.append_json("expenses.json", "delete", [2])
+
+    cube = json_utils.query_cube("expenses.json")
+
+    assert cube.to_dict("records") == [
+        {"year": 2024, "month": 1, "category": "Home", "amount": 4000, "count": 1},
+        {"year": 2025, "month": 4, "category": "Grocery", "amount": 625, "count": 2},
+    ]
+    assert cube.to_dict("records") == rebuilt_cube("expenses.json")
+    assert json_utils.query_cube("expenses.json", "2024")["amount"].tolist() == [4000]
+
+
+def test_income_cube_is_keyed_by_source(backend):
+    json_utils.append_json(
+        "incomes.json",
+        "insert",
+        [
+            {"id": 1, "amount": 10000, "date": "2024-03-01", "source": "Job"},
+            {"id": 2, "amount": 700, "date": "2024-03-15", "source": None},
+        ],
+    )
+
+    cube = json_utils.query_cube("incomes.json")
+
+    assert cube[["source", "amount", "count"]].to_dict("list") == {
+        "source": ["", "Job"],
+        "amount": [700, 10000],
+        "count": [1, 1],
+    }
+
+
+def test_cube_is_restamped_by_compaction(restart):
+    json_utils.init_data_files()
+    json_utils.append_json("expenses.json", "insert", EXPENSES)
+    json_utils.query_cube("expenses.json")
+
+    jsonstore_utils.compact_store("expenses.json")
+    restart()
+
+    # Restamped for the compacted state, so it is read back rather than rebuilt
+    assert jsonstore_utils._load_cube("expenses.json") is not None
+    assert json_utils.query_cube("expenses.json").to_dict("records") == rebuilt_cube(
+        "expenses.json"
+    )
+
+
+def test_stale_cube_is_rebuilt(restart):
+    json_utils.init_data_files()
+    json_utils.append_json("expenses.json", "insert", EXPENSES)
+    json_utils.query_cube("expenses.json")
+
+    # Another process appends without updating this process's cube
+    append_journal("expenses.json", [{"op": "delete", "data": [3]}])
+    restart()
+
+    assert jsonstore_utils._load_cube("expenses.json") is None
+    cube = json_utils.query_cube("expenses.json")
+    assert cube.to_dict("records") == rebuilt_cube("expenses.json")
+    assert 4000 not in cube["amount"].tolist()
+    assert os.path.exists(storage_utils.get_cube_path("expenses.json"))
+
+
+def test_summary_follows_writes(backend):
+    json_utils.append_json("expenses.json", "insert", EXPENSES)
+    json_utils.append_json("expenses.json", "delete", [1, 4])
+
+    assert json_utils.query_summary("expenses.json") == {
+        "years": ["2024"],
+        "min_date": "2024-01-07",
+        "max_date": "2024-01-29",
+        "by_year": {"2024": {"count": 2, "total": 4250}},
+    }
+
+
+def test_summary_of_empty_store(backend):
+    assert json_utils.query_summary("incomes.json") == {
+        "years": [],
+        "min_date": None,
+        "max_date": None,
+        "by_year": {},
+    }
+
+
+def test_cube_without_day_counts_is_rebuilt(restart):
+    json_utils.init_data_files()
+    json_utils.append_json("expenses.json", "insert", EXPENSES)
+    json_utils.query_cube("expenses.json")
+    path = storage_utils.get_cube_path("expenses.json")
+    with open(path) as f:
+        stored = json.load(f)
+    del stored["days"]
+    with open(path, "w") as f:
+        json.dump(stored, f)
+    restart()
+
+    assert json_utils.query_summary("expenses.json")["min_date"] == "2024-01-01"
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from utils import expense_utils, json_utils, storage_utils
+
+
+@pytest.fixture(autouse=True)
+def init(data_dir):
+    json_utils.init_data_files()
+
+
+def expense(category: str, day: str) -> dict:
+    return {
+        "Amount": 9.99,
+        "Category": category,
+        "Date": day,
+        "Notes": "gym",
+        "Frequency": "Monthly",
+        "Recurring ID": "rid-1",
+    }
+
+
+def test_batch_is_saved_in_one_write():
+    expense_utils.save_expense_batch([expense("Grocery", "2024-01-01")])
+    occurrences = [expense("Gym", f"2024-0{m}-15") for m in (1, 2, 3)]
+
+    expense_utils.save_expense_batch(occurrences)
+
+    with open(storage_utils.get_journal_path("expenses.json")) as f:
+        entries = [json.loads(line) for line in f]
+    assert [len(e["data"]) for e in entries] == [1, 3]
+    records = json_utils.read_json("expenses.json")["records"]
+    assert [(r["id"], r["date"]) for r in records[1:]] == [
+        (2, "2024-01-15"),
+        (3, "2024-02-15"),
+        (4, "2024-03-15"),
+    ]
+    categories = json_utils.read_json("categories.json")
+    assert categories == storage_utils.DEFAULT_CATEGORIES + ["Gym"]
+
+
+def test_empty_batch_writes_nothing():
+    expense_utils.save_expense_batch([])
+
+    assert json_utils.read_json("expenses.json")["records"] == []
+
+
+def test_category_rename_rewrites_only_its_records():
+    expense_utils.save_expense_batch(
+        [expense("Grocery", "2024-01-01"), expense("Home", "2024-01-02")]
+    )
+    json_utils.commit_json(
+        [
+            {
+                "file": "recurring.json",
+                "op": "insert",
+                "data": [
+                    {
+                        "recurring_id": "rid-2",
+                        "amount": 500,
+                        "category": "Grocery",
+                        "notes": None,
+                        "frequency": "Weekly",
+                        "start_date": "2024-01-01",
+                        "end_date": "2024-01-29",
+                        "skipped": [],
+                    }
+                ],
+            }
+        ]
+    )
+    assert expense_utils.get_category_usage("Grocery") == 2
+
+    expense_utils.manage_categories_data(None, None, ["Grocery", "Home"])
+
+    assert expense_utils.get_category_usage("Grocery") == 0
+    assert json_utils.query_key_ids("expenses.json", "Home") == [1, 2]
+    assert json_utils.read_json("recurring.json")[0]["category"] == "Home"
+    assert json_utils.read_json("categories.json").count("Home") == 1
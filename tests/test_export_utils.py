@@ -0,0 +1,63 @@
+import io
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from utils import export_utils, json_utils
+from utils.writer_utils import commit_json
+
+EXPENSES = [
+    {"id": 1, "amount": 1250, "category": "Grocery", "date": "2023-12-31"},
+    {"id": 2, "amount": 4000, "category": "Home", "date": "2024-01-15", "notes": "a,b"},
+    {"id": 3, "amount": 99, "category": "Grocery", "date": "2024-02-01"},
+]
+
+
+@pytest.fixture(autouse=True)
+def expenses(backend):
+    json_utils.append_json("expenses.json", "insert", EXPENSES)
+
+
+def test_csv_is_written_chunk_by_chunk(monkeypatch):
+    monkeypatch.setattr(export_utils, "CHUNK_ROWS", 1)
+    chunks = list(export_utils.iter_export_frames("expenses.json"))
+
+    df = pd.read_csv(export_utils.export_csv("expenses.json"))
+
+    assert [len(chunk) for chunk in chunks] == [1, 1, 1]
+    assert list(df.columns) == ["Type", "Category", "Amount", "Date", "Notes"]
+    assert sorted(df["Amount"]) == [0.99, 12.5, 40.0]
+    assert df.loc[df["Amount"] == 40.0, "Notes"].tolist() == ["a,b"]
+
+
+def test_export_range_includes_recurring_occurrences():
+    rule = {
+        "recurring_id": "rid-1",
+        "amount": 500,
+        "category": "Gym",
+        "notes": None,
+        "frequency": "Monthly",
+        "start_date": "2024-01-10",
+        "end_date": "2024-12-10",
+        "skipped": [],
+    }
+    commit_json([{"file": "recurring.json", "op": "insert", "data": [rule]}])
+
+    csv = export_utils.export_csv("expenses.json", date(2024, 1, 1), date(2024, 1, 31))
+    df = pd.read_csv(csv)
+
+    assert sorted(zip(df["Category"], df["Date"])) == [
+        ("Gym", "2024-01-10"),
+        ("Home", "2024-01-15"),
+    ]
+
+
+def test_parquet_round_trips():
+    pytest.importorskip("pyarrow")
+
+    parquet = export_utils.export_parquet("expenses.json", start=date(2024, 1, 1))
+    df = pd.read_parquet(io.BytesIO(parquet.read()))
+
+    assert df["Type"].unique().tolist() == ["Expense"]
+    assert sorted(df["Amount"]) == [0.99, 40.0]
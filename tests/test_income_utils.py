@@ -0,0 +1,19 @@
+from utils import income_utils, json_utils
+
+
+def test_batch_gets_contiguous_ids(data_dir):
+    json_utils.init_data_files()
+    incomes = [
+        {"Amount": 100.0, "Date": f"2024-0{m}-01", "Source": "Job"} for m in (1, 2)
+    ]
+
+    income_utils.save_income_batch(incomes[:1])
+    income_utils.save_income_batch(incomes)
+
+    data = json_utils.read_json("incomes.json")
+    assert data["next_id"] == 4
+    assert [(r["id"], r["date"]) for r in data["records"]] == [
+        (1, "2024-01-01"),
+        (2, "2024-01-01"),
+        (3, "2024-02-01"),
+    ]
@@ -0,0 +1,288 @@
+import json
+import os
+import threading
+
+import pytest
+
+from utils import (
+    cache_utils,
+    journal_utils,
+    json_utils,
+    jsonstore_utils,
+    partition_utils,
+    storage_utils,
+    stream_utils,
+)
+
+EXPENSE = {
+    "amount": 1250,
+    "category": "Grocery",
+    "date": "2024-03-02",
+    "notes": None,
+    "frequency": None,
+    "recurring_id": None,
+}
+
+
+@pytest.fixture(autouse=True)
+def init(data_dir):
+    json_utils.init_data_files()
+
+
+def insert(*ids: int) -> None:
+    records = [{"id": i, **EXPENSE} for i in ids]
+    json_utils.append_json("expenses.json", "insert", records)
+
+
+def test_mutations_are_appended_to_the_journal():
+    manifest = storage_utils.get_manifest_path("expenses.json")
+    before = os.stat(manifest).st_mtime_ns
+
+    insert(1, 2, 3)
+    json_utils.append_json("expenses.json", "delete", [2])
+    json_utils.append_json(
+        "expenses.json", "update", [{"id": 3, **EXPENSE, "amount": 9900}]
+    )
+
+    assert os.stat(manifest).st_mtime_ns == before
+    with open(storage_utils.get_journal_path("expenses.json")) as f:
+        assert [json.loads(line)["op"] for line in f] == ["insert", "delete", "update"]
+    data = json_utils.read_json("expenses.json")
+    assert data["next_id"] == 4
+    assert [(r["id"], r["amount"]) for r in data["records"]] == [(1, 1250), (3, 9900)]
+    assert data["records"][1]["category"] == "Grocery"
+
+
+def test_torn_journal_line_is_ignored(restart):
+    insert(1)
+    # A crash in the middle of an append
+    with open(storage_utils.get_journal_path("expenses.json"), "a") as f:
+        f.write('{"op":"insert","data":[{"id":2,"amou')
+
+    assert [r["id"] for r in json_utils.read_json("expenses.json")["records"]] == [1]
+
+    # The next append starts after the last complete line, not on the torn one
+    insert(3)
+    restart()
+
+    assert [r["id"] for r in json_utils.read_json("expenses.json")["records"]] == [1, 3]
+    with open(storage_utils.get_journal_path("expenses.json"), "rb") as f:
+        assert f.read().count(b"\n") == 2
+
+
+def test_journal_of_only_a_torn_line_is_emptied():
+    path = storage_utils.get_journal_path("expenses.json")
+    with open(path, "wb") as f:
+        f.write(b'{"op":"insert","data":[' + b" " * 100_000)
+
+    assert journal_utils.truncate_torn_tail("expenses.json")
+    assert os.path.getsize(path) == 0
+    assert not journal_utils.truncate_torn_tail("expenses.json")
+
+
+def test_compaction_folds_the_journal_into_the_partitions():
+    insert(1, 2, 3)
+    json_utils.append_json("expenses.json", "delete", [1])
+
+    jsonstore_utils.compact_store("expenses.json")
+
+    assert not os.path.exists(storage_utils.get_journal_path("expenses.json"))
+    with open(storage_utils.get_manifest_path("expenses.json")) as f:
+        assert json.load(f) == {"next_id": 4, "years": ["2024"], "amounts": "cents"}
+    with open(storage_utils.get_partition_path("expenses.json", "2024")) as f:
+        partition = json.load(f)
+    assert partition["fields"] == storage_utils.RECORD_FIELDS["expenses.json"]
+    assert [row[0] for row in partition["rows"]] == [2, 3]
+    data = json_utils.read_json("expenses.json")
+    assert data["next_id"] == 4
+    assert [r["id"] for r in data["records"]] == [2, 3]
+
+
+def test_year_query_streams_one_partition(monkeypatch, restart):
+    insert(1)
+    json_utils.append_json(
+        "expenses.json", "insert", [{"id": 2, **EXPENSE, "date": "2025-01-05"}]
+    )
+    jsonstore_utils.compact_store("expenses.json")
+    restart()
+    streamed = []
+    iter_records = stream_utils.iter_records
+
+    def spy(path, predicate=None):
+        streamed.append(path)
+        return iter_records(path, predicate)
+
+    monkeypatch.setattr(stream_utils, "iter_records", spy)
+
+    assert [r["id"] for r in json_utils.query_json("expenses.json", "2025")] == [2]
+    assert streamed == [storage_utils.get_partition_path("expenses.json", "2025")]
+    # Streamed, not parsed whole
+    assert partition_utils._partition_cache == {}
+
+
+def test_filters_are_pushed_down_to_the_scan(backend):
+    insert(1, 2)
+    json_utils.append_json(
+        "expenses.json",
+        "insert",
+        [{"id": 3, **EXPENSE, "category": "Home", "date": "2024-04-01"}],
+    )
+    if backend == "json":
+        jsonstore_utils.compact_store("expenses.json")
+    json_utils.append_json("expenses.json", "delete", [1])
+
+    def ids(**filters):
+        return sorted(
+            r["id"] for r in json_utils.query_json("expenses.json", **filters)
+        )
+
+    assert ids(category="Grocery") == [2]
+    assert ids(date_prefix="2024-04") == [3]
+    assert ids(ids=[1, 3]) == [3]
+    assert ids(date_prefix="2024-03", ids=[2, 3]) == [2]
+    frame = json_utils.query_frame("expenses.json", "2024", "Home")
+    assert frame["id"].tolist() == [3]
+
+
+def test_update_moves_a_record_between_year_views():
+    insert(1)
+    assert [r["id"] for r in json_utils.query_json("expenses.json", "2024")] == [1]
+    assert json_utils.query_json("expenses.json", "2025") == []
+
+    moved = {"id": 1, **EXPENSE, "date": "2025-01-05"}
+    json_utils.append_json("expenses.json", "update", [moved])
+
+    assert json_utils.query_json("expenses.json", "2024") == []
+    assert json_utils.query_json("expenses.json", "2025") == [moved]
+
+
+def test_replaying_a_compacted_journal_changes_nothing():
+    insert(1, 2)
+    journal = storage_utils.get_journal_path("expenses.json")
+    with open(journal) as f:
+        entries = f.read()
+
+    # A crash after the snapshot was replaced, before the journal was removed
+    jsonstore_utils.compact_store("expenses.json")
+    with open(journal, "w") as f:
+        f.write(entries)
+
+    assert [r["id"] for r in json_utils.read_json("expenses.json")["records"]] == [1, 2]
+
+
+def test_large_journal_is_compacted(monkeypatch):
+    monkeypatch.setattr(jsonstore_utils, "JOURNAL_COMPACT_BYTES", 0)
+    compacted = threading.Event()
+    monkeypatch.setattr(
+        jsonstore_utils, "compact_store", lambda filename: compacted.set()
+    )
+
+    insert(1)
+
+    assert compacted.wait(5)
+
+
+def test_reads_are_served_from_the_cache():
+    insert(1)
+    json_utils.clear_json_cache()
+
+    first = json_utils.read_json("expenses.json")
+
+    assert json_utils.read_json("expenses.json") is first
+    assert cache_utils.get_cache_stats() == {"hits": 1, "misses": 1}
+
+
+def test_appends_move_the_cached_state_along():
+    insert(1)
+    first = json_utils.read_json("expenses.json")
+
+    insert(2)
+    json_utils.append_json("expenses.json", "delete", [1])
+
+    data = json_utils.read_json("expenses.json")
+    assert [r["id"] for r in data["records"]] == [2]
+    assert [r["id"] for r in first["records"]] == [1]
+    # Never read back from disk
+    assert cache_utils.get_cache_stats()["misses"] == 0
+
+
+def test_writes_by_someone_else_are_seen(restart):
+    json_utils.read_json("categories.json")
+    # Another process rewrites the file
+    storage_utils.write_file(
+        storage_utils.get_json_path("categories.json"), ["Books", "Travel"]
+    )
+
+    assert json_utils.read_json("categories.json") == ["Books", "Travel"]
+
+
+def test_tombstones_trigger_compaction(monkeypatch):
+    monkeypatch.setattr(jsonstore_utils, "TOMBSTONE_COMPACT_RATIO", 0.2)
+    compacted = threading.Event()
+    monkeypatch.setattr(
+        jsonstore_utils, "compact_store", lambda filename: compacted.set()
+    )
+    insert(*range(1, 11))
+
+    # One tombstone out of ten records stays under TOMBSTONE_COMPACT_RATIO
+    json_utils.append_json("expenses.json", "delete", [1])
+    assert jsonstore_utils._tombstone_count("expenses.json") == 1
+    assert not compacted.is_set()
+
+    json_utils.append_json("expenses.json", "delete", [2])
+    assert jsonstore_utils._tombstone_count("expenses.json") == 2
+    assert compacted.wait(5)
+
+
+def test_deletes_move_the_id_index_along():
+    insert(1, 2, 3)
+    first = json_utils.read_json("expenses.json")
+
+    json_utils.append_json("expenses.json", "delete", [2])
+
+    version, index = cache_utils._id_index[("expenses.json", None)]
+    assert version == jsonstore_utils.get_store_version("expenses.json")
+    assert sorted(index) == [1, 3]
+    assert [r["id"] for r in json_utils.read_json("expenses.json")["records"]] == [1, 3]
+    # Previously returned views are left untouched
+    assert [r["id"] for r in first["records"]] == [1, 2, 3]
+
+
+def test_compaction_caches_records_grouped_by_year():
+    json_utils.append_json(
+        "expenses.json", "insert", [{"id": 1, **EXPENSE, "date": "2025-01-05"}]
+    )
+    insert(2)
+
+    jsonstore_utils.compact_store("expenses.json")
+    cached = [r["id"] for r in json_utils.read_json("expenses.json")["records"]]
+    json_utils.clear_json_cache()
+
+    assert cached == [2, 1]
+    assert [r["id"] for r in json_utils.read_json("expenses.json")["records"]] == cached
+
+
+def test_partition_frames_are_reused_while_unchanged():
+    insert(1, 2)
+    jsonstore_utils.compact_store("expenses.json")
+
+    frame = partition_utils.read_partition_frame("expenses.json", "2024")
+    json_utils.append_json("expenses.json", "delete", [1])
+
+    assert partition_utils.read_partition_frame("expenses.json", "2024") is frame
+    assert json_utils.query_frame("expenses.json", "2024")["id"].tolist() == [2]
+
+
+def test_writes_move_the_key_index_along():
+    insert(1, 2)
+    assert json_utils.query_key_ids("expenses.json", "Grocery") == [1, 2]
+
+    json_utils.append_json(
+        "expenses.json", "update", [{"id": 2, **EXPENSE, "category": "Home"}]
+    )
+    jsonstore_utils.compact_store("expenses.json")
+
+    version = jsonstore_utils.get_store_version("expenses.json")
+    keys = cache_utils.get_key_index("expenses.json", version)
+    assert keys == {"Grocery": {1}, "Home": {2}}
+    assert json_utils.count_key("expenses.json", "Home") == 1
@@ -0,0 +1,237 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import json_utils, ledger_utils, storage_utils
+from utils.writer_utils import commit_json
+
+
+@pytest.fixture
+def expenses(backend):
+    records = [
+        {"id": i, "amount": amount, "category": category, "date": day}
+        for i, (amount, category, day) in enumerate(
+            [
+                (1000, "Home", "2024-01-01"),
+                (250, "Grocery", "2024-01-07"),
+                (4000, "Home", "2024-02-29"),
+                (125, "Grocery", "2025-04-30"),
+            ],
+            start=1,
+        )
+    ]
+    json_utils.append_json("expenses.json", "insert", records)
+
+
+def test_ledger_is_typed(expenses):
+    df = ledger_utils.load_ledger("expenses.json")
+
+    assert df.sort_values("id")["amount"].tolist() == [1000, 250, 4000, 125]
+    assert isinstance(df["category"].dtype, pd.CategoricalDtype)
+    assert df["date"].dtype == "datetime64[s]"
+    assert sorted(zip(df["year"], df["month"])) == [
+        (2024, 1),
+        (2024, 1),
+        (2024, 2),
+        (2025, 4),
+    ]
+
+
+def test_ledger_is_shared_per_data_version(expenses):
+    first = ledger_utils.load_ledger("expenses.json", 2024)
+
+    assert ledger_utils.load_ledger("expenses.json", "2024") is first
+    assert sorted(first["id"]) == [1, 2, 3]
+
+    json_utils.append_json("expenses.json", "delete", [1])
+
+    second = ledger_utils.load_ledger("expenses.json", 2024)
+    assert second is not first
+    assert sorted(second["id"]) == [2, 3]
+    assert sorted(first["id"]) == [1, 2, 3]
+
+
+def test_cube_is_shared_per_data_version(expenses):
+    first = ledger_utils.load_cube("expenses.json", 2024)
+
+    assert ledger_utils.load_cube("expenses.json", "2024") is first
+    assert first[["month", "category", "amount"]].to_dict("list") == {
+        "month": [1, 1, 2],
+        "category": ["Grocery", "Home", "Home"],
+        "amount": [250, 1000, 4000],
+    }
+
+    json_utils.append_json("expenses.json", "delete", [1])
+
+    second = ledger_utils.load_cube("expenses.json", 2024)
+    assert second is not first
+    assert second["category"].tolist() == ["Grocery", "Home"]
+
+
+def test_summary_is_shared_per_data_version(expenses):
+    first = ledger_utils.load_summary("expenses.json")
+
+    assert ledger_utils.load_summary("expenses.json") is first
+    assert first["years"] == ["2024", "2025"]
+
+    json_utils.append_json("expenses.json", "delete", [4])
+
+    assert ledger_utils.load_summary("expenses.json")["years"] == ["2024"]
+
+
+@pytest.mark.parametrize(
+    ("start", "end", "key", "expected"),
+    [
+        (date(2024, 1, 1), date(2024, 1, 1), None, (1000, 1)),
+        (date(2024, 1, 2), date(2024, 2, 29), None, (4250, 2)),
+        (date(2023, 1, 1), date(2030, 1, 1), None, (5375, 4)),
+        (date(2024, 1, 1), date(2025, 12, 31), "Grocery", (375, 2)),
+        (date(2024, 3, 1), date(2025, 4, 29), None, (0, 0)),
+        (date(2025, 1, 1), date(2024, 1, 1), None, (0, 0)),
+        (date(2024, 1, 1), date(2025, 12, 31), "Travel", (0, 0)),
+    ],
+)
+def test_sum_between(expenses, start, end, key, expected):
+    assert ledger_utils.sum_between("expenses.json", start, end, key) == expected
+
+
+def test_date_index_follows_writes(expenses):
+    whole_range = (date(2024, 1, 1), date(2025, 12, 31))
+    index = ledger_utils.load_date_index("expenses.json")
+
+    assert ledger_utils.load_date_index("expenses.json") is index
+
+    json_utils.append_json("expenses.json", "delete", [3])
+
+    assert ledger_utils.load_date_index("expenses.json") is not index
+    assert ledger_utils.sum_between("expenses.json", *whole_range) == (1375, 3)
+    assert ledger_utils.sum_between("expenses.json", *whole_range, "Home") == (
+        1000,
+        1,
+    )
+
+
+def test_ledger_version_covers_the_recurring_rules(expenses):
+    version = ledger_utils.get_ledger_version("expenses.json")
+    incomes = ledger_utils.get_ledger_version("incomes.json")
+
+    commit_json([{"file": "recurring.json", "op": "write", "data": []}])
+
+    assert ledger_utils.get_ledger_version("expenses.json") != version
+    assert ledger_utils.get_ledger_version("incomes.json") == incomes
+
+
+@pytest.fixture
+def trends(backend):
+    records = [
+        {"amount": amount, "category": category, "date": day}
+        for amount, category, day in [
+            (1000, "Home", "2024-01-01"),
+            (250, "Grocery", "2024-01-07"),
+            (500, "Grocery", "2024-01-08"),
+            (4000, "Home", "2024-02-29"),
+            (125, "Grocery", "2024-04-30"),
+        ]
+    ]
+    rule = {
+        "recurring_id": "rid-1",
+        "amount": 10000,
+        "category": "Rent",
+        "notes": None,
+        "frequency": "Monthly",
+        "start_date": "2024-01-31",
+        "end_date": "2024-03-31",
+        "skipped": ["2024-03-31"],
+    }
+    commit_json(
+        [
+            {"file": "expenses.json", "op": "insert", "data": records},
+            {"file": "recurring.json", "op": "insert", "data": [rule]},
+        ]
+    )
+
+
+def test_monthly_buckets(trends):
+    starts, totals = ledger_utils.bucket_sums(
+        "expenses.json", date(2024, 1, 15), date(2024, 5, 31)
+    )
+
+    assert [str(d) for d in starts] == [
+        "2024-01-01",
+        "2024-02-01",
+        "2024-03-01",
+        "2024-04-01",
+        "2024-05-01",
+    ]
+    # Recurring occurrences count, skipped ones don't
+    assert totals.tolist() == [10000, 14000, 0, 125, 0]
+
+
+def test_weekly_buckets_start_on_monday(trends):
+    starts, totals = ledger_utils.bucket_sums(
+        "expenses.json", date(2024, 1, 3), date(2024, 1, 14), "Weekly", "Grocery"
+    )
+
+    assert [str(d) for d in starts] == ["2024-01-01", "2024-01-08"]
+    assert [d.astype(object).weekday() for d in starts] == [0, 0]
+    assert totals.tolist() == [250, 500]
+
+
+def test_buckets_are_widened_to_max_points(trends):
+    starts, totals = ledger_utils.bucket_sums(
+        "expenses.json", date(2024, 1, 1), date(2024, 1, 10), "Daily", max_points=4
+    )
+
+    # Ten days in four buckets of three days
+    assert [str(d) for d in starts] == [
+        "2024-01-01",
+        "2024-01-04",
+        "2024-01-07",
+        "2024-01-10",
+    ]
+    assert totals.tolist() == [1000, 0, 750, 0]
+    assert (
+        totals.sum()
+        == ledger_utils.sum_between(
+            "expenses.json", date(2024, 1, 1), date(2024, 1, 10)
+        )[0]
+    )
+
+
+def test_buckets_follow_writes(trends):
+    first = ledger_utils.bucket_sums(
+        "expenses.json", date(2024, 1, 1), date(2024, 12, 31)
+    )[1]
+    record = json_utils.query_json("expenses.json", ids=[4])[0]
+
+    commit_json(
+        [
+            {
+                "file": "expenses.json",
+                "op": "update",
+                "data": [{**record, "date": "2024-12-01"}],
+            }
+        ]
+    )
+
+    moved = first.copy()
+    moved[1] -= 4000
+    moved[11] += 4000
+    second = ledger_utils.bucket_sums(
+        "expenses.json", date(2024, 1, 1), date(2024, 12, 31)
+    )[1]
+    assert np.array_equal(second, moved)
+
+
+def test_ledger_reuses_the_columns_of_the_frame():
+    frame = storage_utils.typed_frame(
+        "incomes.json",
+        [{"id": 1, "amount": 500, "date": "2024-01-01", "source": "Job"}],
+    )
+
+    ledger = ledger_utils._type_ledger(frame)
+
+    for column in ("id", "amount", "date"):
+        assert np.shares_memory(ledger[column].to_numpy(), frame[column].to_numpy())
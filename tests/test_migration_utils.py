@@ -0,0 +1,113 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+from utils import backend_utils, json_utils, sqlite_utils, storage_utils
+
+EXPENSES = [
+    {
+        "id": i,
+        "amount": 10.0 * i,
+        "category": "Home",
+        "date": date,
+        "notes": None,
+        "frequency": None,
+        "recurring_id": None,
+    }
+    for i, date in enumerate(["2023-12-31", "2024-01-01", "2024-06-30"], start=1)
+]
+
+
+def test_single_file_store_is_split_into_partitions(data_dir):
+    legacy = data_dir / "expenses.json"
+    legacy.write_text(json.dumps({"next_id": 4, "records": EXPENSES[:2]}))
+    (data_dir / "expenses.journal").write_text(
+        json.dumps({"op": "insert", "data": EXPENSES[2:]}) + "\n"
+    )
+
+    json_utils.init_data_files()
+
+    assert not legacy.exists()
+    assert (data_dir / "expenses.json.bak").exists()
+    assert not (data_dir / "expenses.journal").exists()
+    with open(storage_utils.get_manifest_path("expenses.json")) as f:
+        assert json.load(f) == {
+            "next_id": 4,
+            "years": ["2023", "2024"],
+            "amounts": "cents",
+        }
+    assert json_utils.read_json("expenses.json") == {
+        "next_id": 4,
+        "records": [{**r, "amount": 1000 * r["id"]} for r in EXPENSES],
+    }
+    assert [r["id"] for r in json_utils.query_json("expenses.json", "2024")] == [2, 3]
+
+
+def test_partitioned_store_is_left_alone(data_dir):
+    json_utils.init_data_files()
+    manifest = storage_utils.get_manifest_path("expenses.json")
+    before = os.stat(manifest).st_mtime_ns
+
+    json_utils.init_data_files()
+
+    assert os.stat(manifest).st_mtime_ns == before
+
+
+def write_dollar_store(data_dir) -> None:
+    """A partitioned store written before amounts were cents."""
+    store = data_dir / "expenses"
+    store.mkdir()
+    (store / "manifest.json").write_text(
+        json.dumps({"next_id": 4, "years": ["2023", "2024"]})
+    )
+    for year in ("2023", "2024"):
+        records = [r for r in EXPENSES if r["date"].startswith(year)]
+        (store / f"{year}.json").write_text(json.dumps({"records": records}))
+    (store / "journal.jsonl").write_text(
+        json.dumps({"op": "update", "data": [{**EXPENSES[0], "amount": 0.1 + 0.2}]})
+        + "\n"
+    )
+
+
+def test_dollar_amounts_are_converted_to_cents_once(data_dir, restart):
+    write_dollar_store(data_dir)
+
+    json_utils.init_data_files()
+    restart()
+    json_utils.init_data_files()
+
+    assert [r["amount"] for r in json_utils.read_json("expenses.json")["records"]] == [
+        30,
+        2000,
+        3000,
+    ]
+    with open(storage_utils.get_manifest_path("expenses.json")) as f:
+        assert json.load(f)["amounts"] == "cents"
+    assert json_utils.query_summary("expenses.json")["by_year"]["2024"]["total"] == 5000
+    assert json.loads(json_utils.export_json("expenses.json"))["records"][0][
+        "amount"
+    ] == pytest.approx(0.3)
+
+
+def test_sqlite_dollar_tables_are_rebuilt_with_cents(data_dir):
+    conn = sqlite3.connect(data_dir / sqlite_utils.DB_FILENAME)
+    schema = sqlite_utils.SCHEMA.replace("amount INTEGER", "amount REAL")
+    conn.executescript(schema)
+    conn.execute(
+        "INSERT INTO expenses (id, amount, category, date) "
+        "VALUES (1, 12.34, 'Home', '2024-01-05'), (2, 0.3, 'Home', '2024-02-01')"
+    )
+    conn.commit()
+    conn.close()
+    backend_utils.use_backend("sqlite")
+
+    json_utils.init_data_files()
+
+    assert [r["amount"] for r in json_utils.query_json("expenses.json")] == [1234, 30]
+    assert json_utils.query_cube("expenses.json")["amount"].tolist() == [1234, 30]
+    amount_type = sqlite_utils.get_connection().execute(
+        "SELECT type FROM pragma_table_info('expenses') WHERE name = 'amount'"
+    )
+    assert amount_type.fetchone()[0] == "INTEGER"
@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+from utils import money_utils
+
+
+def test_dollars_are_rounded_to_the_nearest_cent():
+    assert money_utils.to_cents(12.34) == 1234
+    assert money_utils.to_cents(0.1 + 0.2) == 30
+    assert money_utils.to_cents("19.999") == 2000
+    assert money_utils.to_cents(0) == 0
+
+
+def test_cents_are_shown_as_dollars():
+    assert money_utils.to_dollars(1234) == 12.34
+    assert money_utils.to_dollars(np.int64(5)) == 0.05
+    assert money_utils.to_dollars(pd.Series([100, 250])).tolist() == [1.0, 2.5]
+
+
+def test_cent_totals_are_exact():
+    amounts = [money_utils.to_cents(0.1)] * 10
+
+    assert sum(amounts) == money_utils.to_cents(1.0)
@@ -0,0 +1,177 @@
+import json
+
+import numpy as np
+
+from utils import json_utils, ledger_utils, recurring_utils, storage_utils
+from utils.writer_utils import commit_json
+
+
+def rule(frequency: str, start_date: str, end_date: str, **fields) -> dict:
+    return {
+        "recurring_id": "rid-1",
+        "amount": 1000,
+        "category": "Rent",
+        "notes": None,
+        "frequency": frequency,
+        "start_date": start_date,
+        "end_date": end_date,
+        "skipped": [],
+        **fields,
+    }
+
+
+RENT = rule("Monthly", "2024-01-31", "2024-05-31")
+GYM = rule("Weekly", "2024-01-01", "2024-01-29", recurring_id="rid-2", amount=500)
+
+
+def dates(values: np.ndarray) -> list[str]:
+    return [str(d) for d in values]
+
+
+def test_monthly_days_are_clamped_to_short_months():
+    monthly = rule("Monthly", "2024-01-31", "2024-05-31")
+
+    assert dates(recurring_utils.occurrence_dates(monthly)) == [
+        "2024-01-31",
+        "2024-02-29",
+        "2024-03-31",
+        "2024-04-30",
+        "2024-05-31",
+    ]
+
+
+def test_yearly_leap_day_is_clamped():
+    yearly = rule("Yearly", "2024-02-29", "2026-12-31")
+
+    assert dates(recurring_utils.occurrence_dates(yearly)) == [
+        "2024-02-29",
+        "2025-02-28",
+        "2026-02-28",
+    ]
+
+
+def test_range_and_skipped_dates():
+    weekly = rule("Weekly", "2024-01-01", "2024-12-31", skipped=["2024-01-15"])
+    start, end = recurring_utils.prefix_range("2024-01")
+
+    assert dates(recurring_utils.occurrence_dates(weekly, start, end)) == [
+        "2024-01-01",
+        "2024-01-08",
+        "2024-01-22",
+        "2024-01-29",
+    ]
+
+
+def test_clamped_day_just_inside_the_range():
+    # March 31 falls on April 30, which a range starting in April must keep
+    quarterly = rule("Quarterly", "2024-01-31", "2024-12-31")
+    start, end = recurring_utils.prefix_range("2024-04")
+
+    assert dates(recurring_utils.occurrence_dates(quarterly, start, end)) == [
+        "2024-04-30"
+    ]
+
+
+def test_schedule_matches_one_rule_at_a_time():
+    rules = [
+        rule("Monthly", "2023-08-31", "2025-03-01"),
+        rule("Biweekly", "2024-02-02", "2024-11-22", skipped=["2024-03-01"]),
+        rule("Quarterly", "2023-11-30", "2025-11-30"),
+    ]
+    start, end = np.datetime64("2024-02-01"), np.datetime64("2024-09-30")
+
+    index, scheduled = recurring_utils.schedule(rules, start, end)
+
+    for i, r in enumerate(rules):
+        expected = recurring_utils.occurrence_dates(r, start, end)
+        assert dates(scheduled[index == i]) == dates(expected)
+
+
+def test_fold_series_records_missing_occurrences_as_skipped():
+    records = [
+        {
+            "id": i,
+            "amount": 999,
+            "category": "Personal",
+            "date": date,
+            "notes": "gym",
+            "frequency": "Monthly",
+            "recurring_id": "rid-1",
+        }
+        for i, date in enumerate(["2025-01-31", "2025-02-28", "2025-04-30"], 1)
+    ]
+
+    rules, folded = recurring_utils.fold_series(records)
+
+    assert folded == {1, 2, 3}
+    assert rules[0]["skipped"] == ["2025-03-31"]
+    assert rules[0]["end_date"] == "2025-04-30"
+
+
+def test_rule_ops_are_resolved_against_the_registry(backend):
+    commit_json([{"file": "recurring.json", "op": "insert", "data": [RENT]}])
+    commit_json(
+        [
+            {
+                "file": "recurring.json",
+                "op": "update",
+                "data": [{"recurring_id": "rid-1", "amount": 1200}],
+            },
+            {"file": "recurring.json", "op": "insert", "data": [GYM]},
+        ]
+    )
+    assert [r["amount"] for r in json_utils.read_json("recurring.json")] == [1200, 500]
+
+    commit_json([{"file": "recurring.json", "op": "delete", "data": ["rid-1"]}])
+    json_utils.clear_json_cache()
+
+    assert json_utils.read_json("recurring.json") == [GYM]
+
+
+def test_ledger_includes_generated_occurrences(backend):
+    json_utils.append_json(
+        "expenses.json",
+        "insert",
+        [{"id": 1, "amount": 300, "category": "Grocery", "date": "2024-02-10"}],
+    )
+    commit_json([{"file": "recurring.json", "op": "insert", "data": [RENT]}])
+
+    ledger = ledger_utils.load_ledger("expenses.json", "2024-02")
+    cube = ledger_utils.load_cube("expenses.json", 2024)
+    summary = ledger_utils.load_summary("expenses.json")
+
+    assert sorted(ledger["amount"].tolist()) == [300, 1000]
+    assert ledger.loc[ledger["amount"] == 1000, "id"].tolist() == [
+        recurring_utils.OCCURRENCE_ID
+    ]
+    assert cube.groupby("category", observed=True)["count"].sum().to_dict() == {
+        "Grocery": 1,
+        "Rent": 5,
+    }
+    assert summary["by_year"]["2024"] == {"count": 6, "total": 5300}
+
+
+def test_expanded_series_are_folded_on_start(data_dir, restart):
+    json_utils.init_data_files()
+    expenses = [
+        {
+            "id": i,
+            "amount": 1000,
+            "category": "Rent",
+            "date": date,
+            "notes": None,
+            "frequency": "Monthly",
+            "recurring_id": "rid-1",
+        }
+        for i, date in enumerate(["2024-01-31", "2024-02-29", "2024-03-31"], 1)
+    ]
+    json_utils.write_json("expenses.json", {"next_id": 4, "records": expenses})
+    storage_utils.remove_durably(storage_utils.get_json_path("recurring.json"))
+    restart()
+
+    json_utils.init_data_files()
+
+    assert json_utils.read_json("expenses.json")["records"] == []
+    with open(storage_utils.get_json_path("recurring.json")) as f:
+        (rule,) = json.load(f)
+    assert (rule["start_date"], rule["end_date"]) == ("2024-01-31", "2024-03-31")
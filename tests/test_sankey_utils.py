@@ -0,0 +1,52 @@
+import pandas as pd
+
+from utils import sankey_utils
+
+
+def test_nodes_and_links_of_each_tier():
+    income = pd.Series({"Job": 5000.0, "Side": 1000.0})
+    expenses = pd.Series({"Home": 3000.0, "Grocery": 1000.0})
+
+    sankey = sankey_utils.build_sankey(income, expenses).data[0]
+
+    assert [label.split("<br>")[0] for label in sankey.node.label] == [
+        "Job",
+        "Side",
+        "Total Income",
+        "Expenses",
+        "Savings",
+        "Home",
+        "Grocery",
+    ]
+    assert list(sankey.link.source) == [2, 2, 2, 2, 3, 3]
+    assert list(sankey.link.target) == [0, 1, 3, 4, 5, 6]
+    assert list(sankey.link.value) == [5000, 1000, 4000, 2000, 3000, 1000]
+
+
+def test_without_income_the_diagram_starts_at_the_expenses():
+    expenses = pd.Series({"Home": 3000.0, "Grocery": 1000.0})
+
+    sankey = sankey_utils.build_sankey(pd.Series(dtype=float), expenses).data[0]
+
+    assert list(sankey.link.source) == [0, 0]
+    assert list(sankey.link.target) == [1, 2]
+    assert sankey.node.label[1] == "Home<br>$3,000.00 (75.0%)"
+
+
+def test_small_flows_are_collapsed_into_other():
+    amounts = pd.Series({"Home": 1000.0, "Gym": 10.0, "Books": 5.0, "Rent": 900.0})
+
+    collapsed = sankey_utils.collapse_small(amounts, 0.02)
+
+    assert collapsed.to_dict() == {"Home": 1000.0, "Rent": 900.0, "Other": 15.0}
+    # A single small flow is kept as is
+    kept = sankey_utils.collapse_small(amounts.drop("Books"), 0.02)
+    assert list(kept.index) == ["Home", "Gym", "Rent"]
+
+
+def test_added_categories_get_a_stable_color():
+    color = sankey_utils.category_color("Pets")
+
+    assert color in sankey_utils.PALETTE
+    assert sankey_utils.category_color("Pets") == color
+    assert sankey_utils.category_color(sankey_utils.OTHER) == sankey_utils.OTHER_COLOR
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from utils import backend_utils, json_utils, sqlite_utils, storage_utils
+from utils.writer_utils import commit_json
+
+EXPENSE = {"amount": 1250, "category": "Grocery", "date": "2024-03-02"}
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    """Record the file descriptors passed to os.fsync."""
+    calls = []
+    fsync = os.fsync
+
+    def record(fd):
+        calls.append(fd)
+        fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", record)
+    return calls
+
+
+def save_expense() -> None:
+    commit_json([{"file": "expenses.json", "op": "insert", "data": [EXPENSE]}])
+
+
+@pytest.mark.parametrize(("mode", "synced"), [("none", False), ("commit", True)])
+def test_commit_syncs_as_configured(data_dir, monkeypatch, fsyncs, mode, synced):
+    json_utils.init_data_files()
+    monkeypatch.setattr(storage_utils, "DURABILITY", mode)
+
+    save_expense()
+
+    assert bool(fsyncs) == synced
+
+
+def test_batch_mode_syncs_later(data_dir, monkeypatch, fsyncs):
+    json_utils.init_data_files()
+    monkeypatch.setattr(storage_utils, "DURABILITY", "batch")
+    monkeypatch.setattr(storage_utils, "FSYNC_INTERVAL", 60)
+
+    save_expense()
+
+    assert not fsyncs
+    journal = storage_utils.get_journal_path("expenses.json")
+    assert {journal, os.path.dirname(journal)} <= storage_utils._unsynced
+
+    storage_utils.flush_unsynced()
+
+    # The journal and its directory
+    assert len(fsyncs) == 2
+    assert not storage_utils._unsynced
+
+
+def test_removal_flushes_pending_syncs(data_dir, monkeypatch, fsyncs):
+    monkeypatch.setattr(storage_utils, "DURABILITY", "batch")
+    monkeypatch.setattr(storage_utils, "FSYNC_INTERVAL", 60)
+    path = storage_utils.get_json_path("categories.json")
+    storage_utils.write_file(path, ["Rent"])
+    superseded = storage_utils.get_redo_log_path()
+    storage_utils.write_file(superseded, {"ops": []})
+    fsyncs.clear()
+
+    storage_utils.remove_durably(superseded)
+
+    assert not os.path.exists(superseded)
+    assert not storage_utils._unsynced
+    # Both files and their directory, then the directory again for the removal
+    assert len(fsyncs) == 4
+
+
+@pytest.mark.parametrize(("mode", "pragma"), [("none", 0), ("batch", 1), ("commit", 2)])
+def test_sqlite_synchronous_follows_durability(data_dir, monkeypatch, mode, pragma):
+    backend_utils.use_backend("sqlite")
+    monkeypatch.setattr(storage_utils, "DURABILITY", mode)
+
+    # On this thread's connection, rather than the writer's
+    sqlite_utils.commit_batch(
+        [{"file": "expenses.json", "op": "insert", "data": [{"id": 1, **EXPENSE}]}]
+    )
+
+    conn = sqlite_utils.get_connection()
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == pragma
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from utils import stream_utils
+
+RECORDS = [
+    {"id": 1, "amount": 12.5, "category": "Grocery", "date": "2024-03-02"},
+    {"id": 2, "amount": 3.0, "category": 'Food "&" Dining', "date": "2024-03-15"},
+    {"id": 3, "amount": 99.0, "category": "Grocery", "date": "2025-01-05"},
+]
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "records.json"
+    with open(path, "w") as f:
+        json.dump({"next_id": 4, "records": RECORDS, "extra": {"a": [1, 2]}}, f)
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, stream_utils.CHUNK_SIZE])
+def test_records_are_decoded_across_chunks(path, chunk_size):
+    assert list(stream_utils.iter_records(path, chunk_size=chunk_size)) == RECORDS
+
+
+def test_predicate_selects_records(path):
+    predicate = stream_utils.record_filter("2024", "Grocery")
+
+    assert list(stream_utils.iter_records(path, predicate)) == RECORDS[:1]
+
+
+def test_record_filter_combines_filters():
+    by_month = stream_utils.record_filter(date_prefix="2024-03")
+    by_ids = stream_utils.record_filter(ids=[2, 3])
+
+    assert [r["id"] for r in RECORDS if by_month(r)] == [1, 2]
+    assert [r["id"] for r in RECORDS if by_ids(r)] == [2, 3]
+    assert stream_utils.record_filter(ids=[])(RECORDS[0]) is False
+
+
+def test_empty_object_yields_nothing(tmp_path):
+    path = tmp_path / "empty.json"
+    path.write_text("{}")
+
+    assert list(stream_utils.iter_records(str(path))) == []
+
+
+def test_truncated_file_raises(tmp_path):
+    path = tmp_path / "torn.json"
+    path.write_text('{"records": [{"id": 1}, {"id"')
+
+    with pytest.raises(json.JSONDecodeError):
+        list(stream_utils.iter_records(str(path), chunk_size=4))
@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from utils import json_utils, storage_utils, writer_utils
+from utils.writer_utils import commit_json
+
+EXPENSE = {
+    "amount": 1250,
+    "category": "Grocery",
+    "date": "2024-03-02",
+    "notes": None,
+    "frequency": None,
+    "recurring_id": None,
+}
+
+
+def txn(ops: list[dict]) -> dict:
+    return {"ops": ops, "done": threading.Event(), "result": None, "error": None}
+
+
+def test_concurrent_inserts_get_distinct_ids(backend):
+    threads = [
+        threading.Thread(
+            target=commit_json,
+            args=([{"file": "expenses.json", "op": "insert", "data": [EXPENSE]}],),
+        )
+        for _ in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    data = json_utils.read_json("expenses.json")
+    assert sorted(r["id"] for r in data["records"]) == list(range(1, 21))
+    assert data["next_id"] == 21
+
+
+def test_lone_commit_does_not_wait_for_a_group(backend, monkeypatch):
+    monkeypatch.setattr(writer_utils, "GROUP_COMMIT_WINDOW", 10)
+    started = time.monotonic()
+
+    commit_json([{"file": "expenses.json", "op": "insert", "data": [EXPENSE]}])
+
+    assert time.monotonic() - started < 5
+    assert writer_utils._in_flight == 0
+
+
+def test_commit_returns_the_committed_ops(backend):
+    committed = commit_json(
+        [
+            {"file": "expenses.json", "op": "insert", "data": [EXPENSE, EXPENSE]},
+            {"file": "categories.json", "op": "extend", "data": ["Rent", "Home"]},
+        ]
+    )
+
+    assert [r["id"] for r in committed[0]["data"]] == [1, 2]
+    assert committed[1]["op"] == "write"
+    assert committed[1]["data"][-1] == "Rent"
+    assert json_utils.read_json("categories.json") == committed[1]["data"]
+    # Nothing new to extend: left out
+    assert (
+        commit_json([{"file": "categories.json", "op": "extend", "data": ["Rent"]}])
+        == []
+    )
+
+
+def test_invalid_transaction_fails_alone(backend):
+    good = txn([{"file": "expenses.json", "op": "insert", "data": [EXPENSE]}])
+    bad = txn([{"file": "categories.json", "op": "insert", "data": ["Rent"]}])
+
+    writer_utils._commit_group([bad, good])
+
+    assert isinstance(bad["error"], ValueError)
+    assert good["error"] is None
+    assert [r["id"] for r in json_utils.read_json("expenses.json")["records"]] == [1]
+
+
+def test_interrupted_commit_is_replayed(data_dir, restart):
+    json_utils.init_data_files()
+    # A crash after the redo log was written, before it was applied
+    ops = [
+        {"file": "expenses.json", "op": "insert", "data": [{"id": 1, **EXPENSE}]},
+        {"file": "categories.json", "op": "write", "data": ["Rent"]},
+    ]
+    with open(storage_utils.get_redo_log_path(), "w") as f:
+        json.dump({"ops": ops}, f)
+    restart()
+
+    json_utils.init_data_files()
+
+    assert not os.path.exists(storage_utils.get_redo_log_path())
+    assert json_utils.read_json("categories.json") == ["Rent"]
+    assert json_utils.query_cube("expenses.json")["count"].tolist() == [1]
+
+
+def test_multi_file_commit_survives_a_failure_midway(data_dir, monkeypatch, restart):
+    json_utils.init_data_files()
+    original = storage_utils.write_file
+
+    def fail_on_categories(path, data):
+        if path == storage_utils.get_json_path("categories.json"):
+            raise OSError("disk full")
+        original(path, data)
+
+    monkeypatch.setattr("utils.jsonstore_utils.write_file", fail_on_categories)
+    with pytest.raises(OSError):
+        commit_json(
+            [
+                {"file": "expenses.json", "op": "insert", "data": [EXPENSE]},
+                {"file": "categories.json", "op": "write", "data": ["Rent"]},
+            ]
+        )
+    monkeypatch.setattr("utils.jsonstore_utils.write_file", original)
+    restart()
+
+    # Completed by the next commit
+    commit_json([{"file": "categories.json", "op": "extend", "data": ["Home"]}])
+
+    assert json_utils.read_json("categories.json") == ["Rent", "Home"]
+    assert len(json_utils.read_json("expenses.json")["records"]) == 1
+
+
+def test_rename_moves_the_records_of_the_whole_group(backend):
+    commit_json([{"file": "expenses.json", "op": "insert", "data": [EXPENSE, EXPENSE]}])
+    moved = {**EXPENSE, "id": 2, "category": "Home"}
+    # Committed together with the rename, ahead of it
+    earlier = txn(
+        [
+            {"file": "expenses.json", "op": "insert", "data": [EXPENSE]},
+            {"file": "expenses.json", "op": "update", "data": [moved]},
+        ]
+    )
+    rename = txn(
+        [{"file": "categories.json", "op": "rename", "data": ["Grocery", "Food"]}]
+    )
+
+    writer_utils._commit_group([earlier, rename])
+
+    assert rename["error"] is None
+    records = json_utils.read_json("expenses.json")["records"]
+    assert sorted((r["id"], r["category"]) for r in records) == [
+        (1, "Food"),
+        (2, "Home"),
+        (3, "Food"),
+    ]
+    categories = json_utils.read_json("categories.json")
+    assert "Grocery" not in categories and categories.count("Food") == 1
+    assert json_utils.query_key_ids("expenses.json", "Grocery") == []
+
+
+def test_rename_of_a_file_without_references_fails(backend):
+    with pytest.raises(ValueError, match="no values"):
+        commit_json([{"file": "recurring.json", "op": "rename", "data": ["a", "b"]}])
+
+
+def test_skips_committed_together_are_all_kept(backend):
+    rule = {
+        "recurring_id": "rid-1",
+        "amount": 500,
+        "category": "Grocery",
+        "notes": None,
+        "frequency": "Weekly",
+        "start_date": "2024-01-01",
+        "end_date": "2024-01-29",
+        "skipped": ["2024-01-08"],
+    }
+    commit_json([{"file": "recurring.json", "op": "insert", "data": [rule]}])
+    skips = [
+        txn(
+            [
+                {
+                    "file": "recurring.json",
+                    "op": "skip",
+                    "data": [{"recurring_id": recurring_id, "skipped": [day]}],
+                }
+            ]
+        )
+        for recurring_id, day in [
+            ("rid-1", "2024-01-22"),
+            ("rid-1", "2024-01-15"),
+            ("deleted", "2024-01-15"),
+        ]
+    ]
+
+    writer_utils._commit_group(skips)
+
+    assert all(t["error"] is None for t in skips)
+    assert json_utils.read_json("recurring.json") == [
+        {**rule, "skipped": ["2024-01-08", "2024-01-15", "2024-01-22"]}
+    ]
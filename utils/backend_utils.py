@@ -0,0 +1,62 @@
+from types import ModuleType
+
+from utils import cache_utils, jsonstore_utils, sqlite_utils, storage_utils
+
+# Storage backends by name. Each module implements the same functions:
+# get_store_version, read_store, get_next_id, recover_store, commit_batch,
+# query_store, query_frame, query_cube, query_summary, query_key_ids,
+# count_key and init_ops.
+BACKENDS = {"json": jsonstore_utils, "sqlite": sqlite_utils}
+
+_backend: ModuleType = jsonstore_utils
+
+
+def use_backend(name: str) -> None:
+    """
+    Store every data file with the named backend from now on, dropping the
+    views cached from the previous one.
+
+    Raises:
+        ValueError: If there is no such backend.
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name}")
+    storage_utils.STORAGE_BACKEND = name
+    _backend = BACKENDS[name]
+    cache_utils.clear_cache()
+
+
+def get_backend() -> ModuleType:
+    """Get the module of the configured storage backend."""
+    return _backend
+
+
+def get_data_version(filename: str) -> tuple:
+    """
+    Get a stamp identifying the on-disk state of a data file.
+
+    The stamp changes whenever the file or, for record stores, the manifest or
+    journal changes (partitions are only rewritten together with the
+    manifest). It is cheap to compute (one or two stat calls, or a
+    single lookup of the table's write counter for the SQLite backend).
+    """
+    return _backend.get_store_version(filename)
+
+
+def cached_read(filename: str, year: str | None = None) -> dict | list:
+    """Read a data file (or one year of a record store) through the cache."""
+    return cache_utils.cached_read(
+        filename,
+        year,
+        get_data_version(filename),
+        lambda: _backend.read_store(filename, year),
+    )
+
+
+def get_next_id(filename: str) -> int:
+    """Get the id the next record inserted into a record store will get."""
+    return _backend.get_next_id(filename)
+
+
+use_backend(storage_utils.STORAGE_BACKEND)
@@ -0,0 +1,174 @@
+import threading
+from collections.abc import Callable
+
+from utils.journal_utils import apply_journal_entry
+
+# Guards every read-modify of the caches below. Cached views and indexes are
+# never mutated once stored: they are replaced by new ones, so readers can
+# keep using what they got without holding the lock.
+_cache_lock = threading.Lock()
+
+# Process-wide cache of parsed data: (filename, year or None) -> (version, data)
+_json_cache: dict[tuple[str, str | None], tuple[tuple, dict | list]] = {}
+_cache_stats = {"hits": 0, "misses": 0}
+
+# Id -> record indexes of the cached views, rebuilt from the previous ones as
+# the views move from one version to the next:
+# (filename, year or None) -> (version, index)
+_id_index: dict[tuple[str, str | None], tuple[tuple, dict]] = {}
+
+# Ids of the records of the JSON record stores per value of their cube key
+# (category or source), moved along by every write like the cubes:
+# filename -> (version, {value: set of ids})
+_key_index: dict[str, tuple[tuple, dict[str, set]]] = {}
+
+
+def get_cache_stats() -> dict:
+    """Get the hit/miss counters of the read_json cache."""
+    with _cache_lock:
+        return dict(_cache_stats)
+
+
+def clear_cache() -> None:
+    """Drop every cached view and index and reset the hit/miss counters."""
+    with _cache_lock:
+        _json_cache.clear()
+        _id_index.clear()
+        _key_index.clear()
+        _cache_stats.update(hits=0, misses=0)
+
+
+def cached_read(
+    filename: str, year: str | None, version: tuple, read: Callable[[], dict | list]
+) -> dict | list:
+    """
+    Read a data file (or one year of a record store) through the cache.
+
+    Args:
+        filename (str): Data file.
+        year (str | None): Year of a record store, or None for all of it.
+        version (tuple): Current data version of the file.
+        read (Callable[[], dict | list]): Reads the data on a cache miss.
+
+    Returns:
+        dict | list: The data, shared with other readers.
+    """
+    with _cache_lock:
+        cached = _json_cache.get((filename, year))
+        if cached is not None and cached[0] == version:
+            _cache_stats["hits"] += 1
+            return cached[1]
+        _cache_stats["misses"] += 1
+
+    # Read without the lock: concurrent misses each read, the last one stays
+    data = read()
+    with _cache_lock:
+        _json_cache[(filename, year)] = (version, data)
+    return data
+
+
+def get_cached(filename: str, year: str | None, version: tuple) -> dict | list | None:
+    """Get a cached view if it is at version, without counting a hit or miss."""
+    with _cache_lock:
+        cached = _json_cache.get((filename, year))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    return None
+
+
+def put_cached(
+    filename: str, year: str | None, version: tuple, data: dict | list
+) -> None:
+    """Cache a view of a data file at version."""
+    with _cache_lock:
+        _json_cache[(filename, year)] = (version, data)
+
+
+def drop_cached(filename: str) -> None:
+    """Drop every cached view of a data file."""
+    with _cache_lock:
+        for key in [key for key in _json_cache if key[0] == filename]:
+            del _json_cache[key]
+        for key in [key for key in _id_index if key[0] == filename]:
+            del _id_index[key]
+        _key_index.pop(filename, None)
+
+
+def record_index(
+    filename: str, year: str | None, version: tuple, records: list[dict]
+) -> dict:
+    """
+    Get the id -> record index of a cached view of a record store.
+
+    The index is built on first use and then carried along by
+    refresh_cached, so it is only valid for the given version.
+    """
+    with _cache_lock:
+        cached = _id_index.get((filename, year))
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    index = {record["id"]: record for record in records}
+    with _cache_lock:
+        _id_index[(filename, year)] = (version, index)
+    return index
+
+
+def refresh_cached(
+    filename: str, version: tuple, new_version: tuple | None, entries: list[dict]
+) -> None:
+    """
+    Move the cached views of a record store from version to new_version by
+    applying journal entries to them in memory. With no new_version (someone
+    else wrote to the store meanwhile) they are dropped instead.
+
+    The entries are applied to a copy of the id index of each view, so
+    deletes and updates don't rebuild an id map of the whole view from its
+    records every time, and readers of the previous index are unaffected.
+    """
+    with _cache_lock:
+        full = _json_cache.get((filename, None))
+        next_id = full[1]["next_id"] if full is not None and full[0] == version else 0
+        for key in [key for key in _json_cache if key[0] == filename]:
+            cached_version, cached = _json_cache.pop(key)
+            indexed = _id_index.pop(key, None)
+            if new_version is None or cached_version != version:
+                continue
+            year = key[1]
+            records = cached["records"] if year is None else cached
+            if indexed is not None and indexed[0] == version:
+                index = dict(indexed[1])
+            else:
+                index = {record["id"]: record for record in records}
+            view_next_id = cached["next_id"] if year is None else next_id
+            for entry in entries:
+                view_next_id = apply_journal_entry(index, view_next_id, entry, year)
+            records = list(index.values())
+            _id_index[key] = (new_version, index)
+            if year is None:
+                refreshed = {"next_id": view_next_id, "records": records}
+            else:
+                refreshed = records
+            _json_cache[key] = (new_version, refreshed)
+
+
+def pop_key_index(filename: str, version: tuple) -> dict[str, set] | None:
+    """
+    Remove the key index of a record store, returning it if it was at
+    version, for the caller to move along and put back.
+    """
+    with _cache_lock:
+        cached = _key_index.pop(filename, None)
+    return cached[1] if cached is not None and cached[0] == version else None
+
+
+def get_key_index(filename: str, version: tuple) -> dict[str, set] | None:
+    """Get the key index of a record store if it is at version."""
+    with _cache_lock:
+        cached = _key_index.get(filename)
+    return cached[1] if cached is not None and cached[0] == version else None
+
+
+def put_key_index(filename: str, version: tuple, keys: dict[str, set]) -> None:
+    """Store the key index of a record store at version."""
+    with _cache_lock:
+        _key_index[filename] = (version, keys)
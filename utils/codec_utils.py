@@ -0,0 +1,228 @@
+import contextlib
+import gc
+import json
+import os
+from collections.abc import Collection
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+# Codecs that can be used here, fastest first: orjson and msgspec when
+# installed, the standard library's json always
+CODECS = [
+    name
+    for name, module in (("orjson", orjson), ("msgspec", msgspec), ("json", json))
+    if module is not None
+]
+
+# Codec of the data files: the fastest available unless FINANCE_JSON_CODEC
+# names another one
+CODEC = os.getenv("FINANCE_JSON_CODEC", CODECS[0])
+if CODEC not in CODECS:
+    CODEC = "json"
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """
+    Pause the cyclic garbage collector. Decoding creates many containers at
+    once (every row is a list), which would otherwise trigger collections
+    that traverse them all, though they can't form cycles.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def dumps(data: object, pretty: bool = False, codec: str | None = None) -> bytes:
+    """
+    Encode data as UTF-8 JSON.
+
+    Args:
+        data (object): Data to encode.
+        pretty (bool): Indent by two spaces, for files meant to be read by
+            people. Defaults to False (no whitespace at all).
+        codec (str | None): One of CODECS. Defaults to CODEC.
+
+    Returns:
+        bytes: The encoded JSON.
+    """
+    codec = codec or CODEC
+    if codec == "orjson":
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if codec == "msgspec":
+        encoded = msgspec.json.encode(data)
+        return msgspec.json.format(encoded, indent=2) if pretty else encoded
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode()
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def loads(data: bytes | str, codec: str | None = None) -> object:
+    """
+    Decode JSON.
+
+    Args:
+        data (bytes | str): JSON text, bytes are UTF-8.
+        codec (str | None): One of CODECS. Defaults to CODEC.
+
+    Returns:
+        object: The decoded data.
+
+    Raises:
+        json.JSONDecodeError: If data is not valid JSON, whatever the codec.
+    """
+    codec = codec or CODEC
+    with _gc_paused():
+        if codec == "orjson":
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError
+            return orjson.loads(data)
+        if codec == "msgspec":
+            try:
+                return msgspec.json.decode(data)
+            except msgspec.DecodeError as e:
+                raise json.JSONDecodeError(str(e), "", 0) from e
+        return json.loads(data)
+
+
+def load(path: str) -> object:
+    """Read and decode a JSON file."""
+    with open(path, "rb") as f:
+        return loads(f.read())
+
+
+def encode_records(
+    records: list[dict], fields: list[str], dictionary_fields: Collection[str] = ()
+) -> dict:
+    """
+    Encode records compactly: their field names once, then one array of
+    values per record, instead of repeating the names in every record.
+
+    String fields that repeat the same few values (categories, notes of a
+    recurring series, ...) can be dictionary-encoded: each distinct value is
+    stored once in a dictionary, and the rows hold its index there.
+
+    Args:
+        records (list[dict]): Records to encode; missing fields become null.
+        fields (list[str]): Fields to keep, in column order.
+        dictionary_fields (Collection[str]): Fields to dictionary-encode,
+            with -1 standing for null. Defaults to none.
+
+    Returns:
+        dict: "fields", "dictionaries" (field -> list of distinct values, in
+        order of first use) and "rows".
+    """
+    dictionaries: dict[str, dict] = {f: {} for f in fields if f in dictionary_fields}
+    coded = [(i, dictionaries[f]) for i, f in enumerate(fields) if f in dictionaries]
+    rows = []
+    for record in records:
+        row = [record.get(field) for field in fields]
+        for i, dictionary in coded:
+            value = row[i]
+            row[i] = (
+                -1 if value is None else dictionary.setdefault(value, len(dictionary))
+            )
+        rows.append(row)
+    return {
+        "fields": fields,
+        "dictionaries": {field: list(d) for field, d in dictionaries.items()},
+        "rows": rows,
+    }
+
+
+def dictionary_lookups(data: dict) -> list[tuple[int, list]]:
+    """
+    Get the (column, lookup) pairs decoding the dictionary-encoded fields of
+    encoded records: lookup[code] is the value, and lookup[-1] None.
+    """
+    fields = data["fields"]
+    return [
+        (fields.index(field), dictionary + [None])
+        for field, dictionary in data.get("dictionaries", {}).items()
+    ]
+
+
+def decode_records(data: dict) -> list[dict]:
+    """
+    Decode records stored by encode_records, or as a plain "records" list.
+
+    Returns:
+        list[dict]: The records. Dictionary-encoded values are shared between
+        the records holding them rather than copied.
+    """
+    if "records" in data:
+        return data["records"]
+    fields = data["fields"]
+    lookups = dictionary_lookups(data)
+    with _gc_paused():
+        if not lookups:
+            return [dict(zip(fields, row)) for row in data["rows"]]
+        records = []
+        for row in data["rows"]:
+            for i, lookup in lookups:
+                row[i] = lookup[row[i]]
+            records.append(dict(zip(fields, row)))
+        return records
+
+
+def decode_frame(
+    data: dict,
+    categorical: Collection[str] = (),
+    dtypes: dict[str, type] | None = None,
+) -> pd.DataFrame:
+    """
+    Decode records stored by encode_records straight into a DataFrame,
+    without making a dict of each record.
+
+    The rows are turned into a single object array and converted column by
+    column, which is much faster than letting pandas infer the type of each
+    column from the rows.
+
+    Args:
+        data (dict): Encoded records, or a plain "records" list.
+        categorical (Collection[str]): Dictionary-encoded fields to keep as
+            Categoricals over their codes rather than decode to strings.
+            Defaults to none.
+        dtypes (dict[str, type] | None): Known types of other fields (e.g.
+            {"id": np.int64}), converted directly. The remaining fields have
+            their type inferred. Defaults to None.
+
+    Returns:
+        pd.DataFrame: One column per field.
+    """
+    if "records" in data:
+        return pd.DataFrame(data["records"])
+    fields = data["fields"]
+    dictionaries = data.get("dictionaries", {})
+    dtypes = dtypes or {}
+    rows = np.array(data["rows"], dtype=object).reshape(-1, len(fields))
+    columns = {}
+    for i, field in enumerate(fields):
+        values = rows[:, i]
+        if field in dictionaries:
+            codes = values.astype(np.int64)
+            if field in categorical:
+                columns[field] = pd.Categorical.from_codes(codes, dictionaries[field])
+            else:
+                lookup = np.array(dictionaries[field] + [None], dtype=object)
+                columns[field] = lookup[codes]
+        elif field in dtypes:
+            columns[field] = values.astype(dtypes[field])
+        else:
+            columns[field] = pd.Series(values, copy=False).infer_objects()
+    return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,127 @@
+import json
+import os
+import shutil
+import tempfile
+from collections.abc import Collection
+
+import numpy as np
+import pandas as pd
+
+# Fixed-width columns stored as plain arrays; every other field except "date"
+# is a string column stored as int32 codes into a dictionary
+NUMERIC_FIELDS = {"id": np.int64, "amount": np.int64}
+
+# Written last, so a snapshot directory holding it is complete
+DICTIONARIES_FILE = "dictionaries.json"
+
+
+def _encode_strings(values: list) -> tuple[np.ndarray, list]:
+    """
+    Dictionary-encode a list of strings.
+
+    Returns:
+        tuple[np.ndarray, list]: int32 codes (-1 for None) and the dictionary.
+    """
+    dictionary: dict[str, int] = {}
+    codes = np.fromiter(
+        (
+            -1 if v is None else dictionary.setdefault(v, len(dictionary))
+            for v in values
+        ),
+        dtype=np.int32,
+        count=len(values),
+    )
+    return codes, list(dictionary)
+
+
+def _decode_strings(codes: np.ndarray, dictionary: list) -> np.ndarray:
+    """Turn int32 codes back into an object array of strings (None for -1)."""
+    lookup = np.array(dictionary + [None], dtype=object)
+    return lookup[codes]
+
+
+def write_columns(path: str, records: list[dict], fields: list[str]) -> None:
+    """
+    Write records as a columnar snapshot directory.
+
+    Each field is saved as a .npy array: ids and amounts (cents) as int64,
+    dates as int32 days since the epoch, and strings as int32 dictionary codes.
+    The snapshot is assembled in a temporary directory and renamed into place,
+    so readers never see a partial one.
+
+    Args:
+        path (str): Snapshot directory to create. If it already exists, it is
+            assumed to hold the same snapshot and is left untouched.
+        records (list[dict]): Records to store.
+        fields (list[str]): Fields of the records, in column order.
+    """
+    parent = os.path.dirname(path)
+    tmp_path = tempfile.mkdtemp(dir=parent, suffix=".tmp")
+    try:
+        dictionaries = {}
+        for field in fields:
+            values = [r.get(field) for r in records]
+            if field in NUMERIC_FIELDS:
+                array = np.array(values, dtype=NUMERIC_FIELDS[field])
+            elif field == "date":
+                array = (
+                    np.array(values, dtype="datetime64[D]")
+                    .astype(np.int64)
+                    .astype(np.int32)
+                )
+            else:
+                array, dictionaries[field] = _encode_strings(values)
+            np.save(os.path.join(tmp_path, f"{field}.npy"), array)
+
+        with open(os.path.join(tmp_path, DICTIONARIES_FILE), "w") as f:
+            json.dump(dictionaries, f)
+        os.rename(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        # Another writer built the same snapshot first
+        if not os.path.exists(os.path.join(path, DICTIONARIES_FILE)):
+            raise
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+
+def read_columns(
+    path: str, fields: list[str], categorical: Collection[str] = ()
+) -> pd.DataFrame | None:
+    """
+    Read a columnar snapshot directory as a DataFrame.
+
+    Numeric columns are memory-mapped and wrapped without copying. Dates are
+    widened once from int32 days to datetime64, and strings are decoded from
+    their dictionary codes, or wrapped as Categoricals over them.
+
+    Args:
+        path (str): Snapshot directory written by write_columns.
+        fields (list[str]): Fields to load, in column order.
+        categorical (Collection[str]): String fields to load as Categoricals.
+            Defaults to none.
+
+    Returns:
+        pd.DataFrame | None: The records, or None if there is no complete
+        snapshot at path.
+    """
+    dictionaries_path = os.path.join(path, DICTIONARIES_FILE)
+    if not os.path.exists(dictionaries_path):
+        return None
+    with open(dictionaries_path) as f:
+        dictionaries = json.load(f)
+
+    columns = {}
+    for field in fields:
+        array = np.load(os.path.join(path, f"{field}.npy"), mmap_mode="r")
+        if field in NUMERIC_FIELDS:
+            columns[field] = array
+        elif field == "date":
+            columns[field] = array.astype("datetime64[D]").astype("datetime64[s]")
+        elif field in categorical:
+            columns[field] = pd.Categorical.from_codes(array, dictionaries[field])
+        else:
+            columns[field] = _decode_strings(array, dictionaries[field])
+    # One block per column, so the numeric ones stay views of the mapped files
+    return pd.DataFrame(columns, copy=False)
@@ -0,0 +1,136 @@
+import os
+import tempfile
+
+import pandas as pd
+
+from utils import codec_utils
+
+# Record store -> the field aggregates are broken down by, besides year/month
+CUBE_KEYS = {"expenses.json": "category", "incomes.json": "source"}
+
+
+def _cell(record: dict, key: str) -> tuple[int, int, str]:
+    """Cube coordinates of a record: (year, month, key value)."""
+    return (int(record["date"][:4]), int(record["date"][5:7]), record.get(key) or "")
+
+
+def build_cube(records: list[dict], key: str) -> dict:
+    """
+    Aggregate records into a year x month x key cube.
+
+    Args:
+        records (list[dict]): Records of a record store.
+        key (str): Field to break the aggregates down by.
+
+    Returns:
+        dict: "cells", mapping (year, month, key value) to [amount sum in
+        cents, count], and "days", mapping each date with records to its
+        record count.
+    """
+    cube = {"cells": {}, "days": {}}
+    apply_to_cube(cube, [], records, key)
+    return cube
+
+
+def apply_to_cube(cube: dict, removed: list[dict], added: list[dict], key: str) -> None:
+    """
+    Update a cube in place for removed and added records.
+
+    Costs O(number of records changed), independent of the ledger size.
+    """
+    cells, days = cube["cells"], cube["days"]
+    for record in removed:
+        cell = cells.get(_cell(record, key))
+        if cell is not None:
+            cell[0] -= record["amount"]
+            cell[1] -= 1
+            if cell[1] <= 0:
+                del cells[_cell(record, key)]
+        if record["date"] in days:
+            days[record["date"]] -= 1
+            if days[record["date"]] <= 0:
+                del days[record["date"]]
+    for record in added:
+        cell = cells.setdefault(_cell(record, key), [0, 0])
+        cell[0] += record["amount"]
+        cell[1] += 1
+        days[record["date"]] = days.get(record["date"], 0) + 1
+
+
+def summarize_cube(cube: dict) -> dict:
+    """
+    Summarize a cube per year.
+
+    Returns:
+        dict: "years" (sorted year strings), "min_date"/"max_date" (ISO dates,
+        None without records) and "by_year", mapping each year to its record
+        "count" and amount "total" in cents.
+    """
+    by_year: dict[str, dict] = {}
+    for (year, _, _), (amount, count) in cube["cells"].items():
+        totals = by_year.setdefault(str(year), {"count": 0, "total": 0})
+        totals["count"] += count
+        totals["total"] += amount
+    return {
+        "years": sorted(by_year),
+        "min_date": min(cube["days"], default=None),
+        "max_date": max(cube["days"], default=None),
+        "by_year": dict(sorted(by_year.items())),
+    }
+
+
+def read_cube(path: str) -> tuple[str, dict] | None:
+    """
+    Read a persisted cube.
+
+    Returns:
+        tuple[str, dict] | None: The serialized data version the cube was
+        built for and the cube, or None if there is no cube at path.
+    """
+    if not os.path.exists(path):
+        return None
+    data = codec_utils.load(path)
+    if "days" not in data:
+        # Written by a version without day counts; rebuild it
+        return None
+    cells = {(y, m, k): [amount, count] for y, m, k, amount, count in data["cells"]}
+    return data["data_version"], {"cells": cells, "days": data["days"]}
+
+
+def write_cube(path: str, data_version: str, cube: dict) -> None:
+    """Atomically persist a cube along with the data version it reflects."""
+    data = {
+        "data_version": data_version,
+        "cells": [
+            [*coords, amount, count]
+            for coords, (amount, count) in cube["cells"].items()
+        ],
+        "days": cube["days"],
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(codec_utils.dumps(data))
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def cube_frame(cells: dict[tuple, list] | list, key: str) -> pd.DataFrame:
+    """
+    Turn cube cells into a DataFrame sorted by year, month and key.
+
+    Args:
+        cells (dict[tuple, list] | list): Cells as returned by build_cube, or
+            rows of (year, month, key value, amount, count).
+        key (str): Name of the key column.
+
+    Returns:
+        pd.DataFrame: Columns year, month, <key>, amount (cents) and count.
+    """
+    if isinstance(cells, dict):
+        cells = [[*coords, amount, count] for coords, (amount, count) in cells.items()]
+    df = pd.DataFrame(cells, columns=["year", "month", key, "amount", "count"])
+    df = df.astype({"year": "int32", "month": "int32", "amount": "int64"})
+    return df.sort_values(["year", "month", key], ignore_index=True)
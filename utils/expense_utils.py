@@ -1,47 +1,123 @@
+from datetime import date
+
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-from utils.json_utils import read_json, write_json
+from utils.json_utils import (
+    append_json,
+    commit_json,
+    count_key,
+    read_json,
+    write_json,
+)
+from utils.ledger_utils import (
+    bucket_sums,
+    load_cube,
+    load_ledger,
+    load_summary,
+    sum_between,
+)
+from utils.money_utils import to_cents
 
 
 def get_expenses_df(year: None | str = None) -> pd.DataFrame:
     """
     Gets a DataFrame of expenses from the JSON data store.
 
+    The DataFrame is the shared typed ledger (see load_ledger) and must not be
+    modified in place. Only the expenses matching the filter are loaded.
+
     Args:
-        year (None | str, optional): Filter expenses by year. Defaults to None.
+        year (None | str, optional): Filter expenses by year, or by month as
+            "YYYY-MM". Defaults to None.
 
     Returns:
         pd.DataFrame: DataFrame containing expenses.
     """
 
-    data = read_json("expenses.json")
-    df = pd.DataFrame(data["records"])
+    return load_ledger("expenses.json", year)
 
-    if df.empty:
-        return pd.DataFrame(columns=["id", "amount", "category", "date", "notes"])
 
-    if year:
-        df = df[df["date"].str.startswith(str(year))]
+def get_expense_cube(year: None | str = None) -> pd.DataFrame:
+    """
+    Gets the monthly expense totals and counts per category.
+
+    Served from the incrementally maintained aggregate cube, without scanning
+    the expenses. The DataFrame is shared and must not be modified in place.
+
+    Args:
+        year (None | str, optional): Filter by year. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Columns year, month, category, amount (cents) and count.
+    """
 
-    return df[["id", "amount", "category", "date", "notes"]]
+    return load_cube("expenses.json", year)
 
 
-def get_all_expense_dates() -> pd.DataFrame:
+def get_expense_total_between(
+    start: date, end: date, category: None | str = None
+) -> tuple[int, int]:
     """
-    Gets a DataFrame of all expense dates.
+    Gets the total and number of expenses between two dates (inclusive).
+
+    Answered from the prefix-sum date index in O(log n).
+
+    Args:
+        start (date): First day of the range.
+        end (date): Last day of the range.
+        category (None | str, optional): Only count this category. Defaults to None.
 
     Returns:
-        pd.DataFrame: DataFrame with a single 'date' column.
+        tuple[int, int]: Total amount in cents and number of expenses.
     """
 
-    data = read_json("expenses.json")
-    df = pd.DataFrame(data["records"])
+    return sum_between("expenses.json", start, end, category)
+
 
-    if df.empty:
-        return pd.DataFrame(columns=["date"])
+def get_expense_totals_by_period(
+    start: date,
+    end: date,
+    granularity: str,
+    category: None | str = None,
+    max_points: None | int = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gets the total expense per day, week or month between two dates
+    (inclusive), for any number of years.
 
-    return df[["date"]]
+    Aggregated from the prefix-sum date index (see bucket_sums).
+
+    Args:
+        start (date): First day of the range.
+        end (date): Last day of the range.
+        granularity (str): "Daily", "Weekly" or "Monthly".
+        category (None | str, optional): Only count this category. Defaults to None.
+        max_points (None | int, optional): Maximum number of periods, widened
+            as needed. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: First day of each period and its total
+        in cents.
+    """
+
+    return bucket_sums("expenses.json", start, end, granularity, category, max_points)
+
+
+def get_expense_summary() -> dict:
+    """
+    Gets the years, first/last dates and per-year totals of the expenses.
+
+    Read from the store summary, without loading any expense.
+
+    Returns:
+        dict: "years" (sorted year strings), "min_date"/"max_date" (ISO dates,
+        None without expenses) and "by_year" (per-year "count" and "total" in
+        cents).
+    """
+
+    return load_summary("expenses.json")
 
 
 def save_expense_data():
@@ -49,32 +125,194 @@ def save_expense_data():
     Save expenses data to the JSON data store.
     """
 
+    save_expense_batch([st.session_state.expenses[-1]])
+
+
+def save_expense_batch(new_expenses: list[dict]):
+    """
+    Save several expenses to the JSON data store in a single commit.
+
+    Categories that don't exist yet are added in the same commit, so either
+    both the expenses and their new categories are saved or neither is. The
+    dollar amounts are stored as integer cents.
+
+    Args:
+        new_expenses (list[dict]): Expenses in the session state format, with
+            'Amount', 'Category', 'Date', 'Notes', 'Frequency' and 'Recurring ID'.
+    """
+
+    if not new_expenses:
+        return
+
     try:
-        data = read_json("expenses.json")
-        categories = read_json("categories.json")
+        # Ids are allocated by the writer, as a contiguous range from next_id
+        records = [
+            {
+                "amount": to_cents(expense["Amount"]),
+                "category": expense["Category"],
+                "date": expense["Date"],
+                "notes": expense["Notes"],
+                "frequency": expense["Frequency"],
+                "recurring_id": expense["Recurring ID"],
+            }
+            for expense in new_expenses
+        ]
+        commit_json(
+            [
+                {
+                    "file": "categories.json",
+                    "op": "extend",
+                    "data": [r["category"] for r in records],
+                },
+                {"file": "expenses.json", "op": "insert", "data": records},
+            ]
+        )
+    except Exception as e:
+        st.error(f"Failed to saving expense input data: {e}")
 
-        new_expense = st.session_state.expenses[-1]
 
-        # Add category if it doesn't exist
-        if new_expense["Category"] not in categories:
-            categories.append(new_expense["Category"])
-            write_json("categories.json", categories)
+def get_recurring_expenses() -> list[dict]:
+    """
+    Gets the recurring expense rules.
+
+    Their occurrences aren't stored: the expense DataFrames, cubes and totals
+    generate them for the queried range. The list is shared and must not be
+    modified in place.
+
+    Returns:
+        list[dict]: Rules with 'recurring_id', 'amount' (cents), 'category',
+        'notes', 'frequency', 'start_date', 'end_date' and the 'skipped'
+        occurrence dates.
+    """
 
-        # Add expense record
-        record = {
-            "id": data["next_id"],
-            "amount": new_expense["Amount"],
-            "category": new_expense["Category"],
-            "date": new_expense["Date"],
-            "notes": new_expense["Notes"],
-            "frequency": new_expense["Frequency"],
-            "recurring_id": new_expense["Recurring ID"],
+    return read_json("recurring.json")
+
+
+def save_recurring_expense(
+    amount: float,
+    category: str,
+    start: date,
+    end: date,
+    frequency: str,
+    notes: str,
+    recurring_id: str,
+):
+    """
+    Save a recurring expense as a single rule, whatever its number of
+    occurrences. A new category is added in the same commit.
+
+    Args:
+        amount (float): The amount of each occurrence, in dollars.
+        category (str): The category of the expenses.
+        start (date): The date of the first occurrence.
+        end (date): The last date an occurrence may fall on.
+        frequency (str): One of recurring_utils.FREQUENCIES.
+        notes (str): Additional notes for the expenses.
+        recurring_id (str): The id of the series.
+    """
+
+    try:
+        rule = {
+            "recurring_id": recurring_id,
+            "amount": to_cents(amount),
+            "category": category,
+            "notes": notes,
+            "frequency": frequency,
+            "start_date": start.strftime("%Y-%m-%d"),
+            "end_date": end.strftime("%Y-%m-%d"),
+            "skipped": [],
         }
-        data["records"].append(record)
-        data["next_id"] += 1
-        write_json("expenses.json", data)
+        commit_json(
+            [
+                {"file": "categories.json", "op": "extend", "data": [category]},
+                {"file": "recurring.json", "op": "insert", "data": [rule]},
+            ]
+        )
     except Exception as e:
-        st.error(f"Failed to saving expense input data: {e}")
+        st.error(f"Failed to saving recurring expense input data: {e}")
+
+
+def update_recurring_expense(recurring_id: str, changes: dict):
+    """
+    Update every occurrence of a recurring expense by changing its rule.
+
+    Args:
+        recurring_id (str): The id of the series.
+        changes (dict): New values of rule fields; 'amount' is in dollars.
+    """
+
+    if "amount" in changes:
+        changes = {**changes, "amount": to_cents(changes["amount"])}
+    try:
+        ops = [
+            {
+                "file": "recurring.json",
+                "op": "update",
+                "data": [{**changes, "recurring_id": recurring_id}],
+            }
+        ]
+        if "category" in changes:
+            ops.insert(
+                0,
+                {
+                    "file": "categories.json",
+                    "op": "extend",
+                    "data": [changes["category"]],
+                },
+            )
+        commit_json(ops)
+    except Exception as e:
+        st.error(f"Failed to update recurring expense: {e}")
+
+
+def delete_recurring_expenses(recurring_ids: list[str]):
+    """
+    Delete recurring expenses, with all their occurrences.
+
+    Args:
+        recurring_ids (list[str]): The ids of the series.
+    """
+
+    if not recurring_ids:
+        return
+
+    try:
+        commit_json([{"file": "recurring.json", "op": "delete", "data": recurring_ids}])
+        st.success("Recurring expense(s) deleted successfully!")
+    except Exception as e:
+        st.error(f"Failed to delete recurring expense data: {e}")
+
+
+def skip_recurring_occurrences(occurrences: list[tuple[str, str]]):
+    """
+    Delete single occurrences of recurring expenses, by recording their dates
+    as skipped in the rules.
+
+    Args:
+        occurrences (list[tuple[str, str]]): (recurring id, "YYYY-MM-DD" date)
+            of each occurrence.
+    """
+
+    if not occurrences:
+        return
+
+    try:
+        # Merged into the stored dates by the writer, under the store lock
+        commit_json(
+            [
+                {
+                    "file": "recurring.json",
+                    "op": "skip",
+                    "data": [
+                        {"recurring_id": recurring_id, "skipped": [occurrence_date]}
+                        for recurring_id, occurrence_date in occurrences
+                    ],
+                }
+            ]
+        )
+        st.success("Expense(s) deleted successfully!")
+    except Exception as e:
+        st.error(f"Failed to delete expense data: {e}")
 
 
 def delete_expense_data(expense_ids: list):
@@ -89,15 +327,30 @@ def delete_expense_data(expense_ids: list):
         return
 
     try:
-        data = read_json("expenses.json")
-        ids_set = set(expense_ids)
-        data["records"] = [r for r in data["records"] if r["id"] not in ids_set]
-        write_json("expenses.json", data)
+        append_json("expenses.json", "delete", [int(i) for i in expense_ids])
         st.success("Expense(s) deleted successfully!")
     except Exception as e:
         st.error(f"Failed to delete expense data: {e}")
 
 
+def get_category_usage(category: str) -> int:
+    """
+    Count the expenses and recurring expenses in a category, off the category
+    index rather than by scanning the expenses.
+
+    Args:
+        category (str): The category.
+
+    Returns:
+        int: Number of expenses and recurring expense rules in the category.
+    """
+
+    rules = get_recurring_expenses()
+    return count_key("expenses.json", category) + sum(
+        rule["category"] == category for rule in rules
+    )
+
+
 def manage_categories_data(
     new_category: str | None, delete_category: str | None, update_category: list | None
 ):
@@ -111,16 +364,22 @@ def manage_categories_data(
     """
 
     try:
-        categories = read_json("categories.json")
         if new_category:
-            categories.append(new_category)
-        elif delete_category:
-            categories = [c for c in categories if c != delete_category]
-        elif update_category:
+            commit_json(
+                [{"file": "categories.json", "op": "extend", "data": [new_category]}]
+            )
+            return
+
+        if delete_category:
             categories = [
-                update_category[1] if c == update_category[0] else c
-                for c in categories
+                c for c in read_json("categories.json") if c != delete_category
             ]
-        write_json("categories.json", categories)
+            write_json("categories.json", categories)
+        elif update_category:
+            # Only the expenses and rules in the category are rewritten, all
+            # in the same commit as the category list
+            commit_json(
+                [{"file": "categories.json", "op": "rename", "data": update_category}]
+            )
     except Exception as e:
         st.error(f"Failed to saving category input data: {e}")
@@ -0,0 +1,149 @@
+import tempfile
+from collections.abc import Iterator
+from datetime import date
+from typing import BinaryIO
+
+import pandas as pd
+
+from utils.ledger_utils import load_ledger, load_summary
+from utils.money_utils import to_dollars
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+# Export formats that can be written here; Parquet needs pyarrow
+EXPORT_FORMATS = ["CSV"] + (["Parquet"] if pq is not None else [])
+
+# Record store -> (Type column value, store field -> exported column)
+EXPORT_COLUMNS = {
+    "expenses.json": (
+        "Expense",
+        {"category": "Category", "amount": "Amount", "date": "Date", "notes": "Notes"},
+    ),
+    "incomes.json": (
+        "Income",
+        {"source": "Source", "amount": "Amount", "date": "Date"},
+    ),
+}
+
+# Rows converted and written at a time
+CHUNK_ROWS = 100_000
+
+# Exports are kept in memory up to this size, then spilled to a temporary file
+SPOOL_SIZE = 16 * 2**20
+
+
+def iter_export_frames(
+    filename: str, start: date | None = None, end: date | None = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Read the records of a record store to export, a year at a time, with
+    amounts in dollars.
+
+    Only the years the summary lists within the range are loaded, each
+    through load_ledger, so recurring expenses are included and a single year
+    is held at a time. Each year is loaded whole; it is only split into
+    chunks of CHUNK_ROWS so that the converted rows, and the CSV text or
+    Parquet row group built from them, stay bounded.
+
+    Args:
+        filename (str): One of EXPORT_COLUMNS.
+        start (date | None, optional): First date. Defaults to None.
+        end (date | None, optional): Last date. Defaults to None.
+
+    Yields:
+        pd.DataFrame: Chunks with a "Type" column and the exported columns.
+    """
+    record_type, columns = EXPORT_COLUMNS[filename]
+    for year in load_summary(filename)["years"]:
+        if (start and int(year) < start.year) or (end and int(year) > end.year):
+            continue
+        df = load_ledger(filename, year)
+        if start:
+            df = df[df["date"] >= pd.Timestamp(start)]
+        if end:
+            df = df[df["date"] <= pd.Timestamp(end)]
+        for offset in range(0, len(df), CHUNK_ROWS):
+            chunk = df.iloc[offset : offset + CHUNK_ROWS]
+            yield (
+                chunk[list(columns)]
+                .rename(columns=columns)
+                .assign(
+                    Type=record_type,
+                    Amount=lambda c: to_dollars(c["Amount"]),
+                    Date=lambda c: c["Date"].dt.date,
+                )
+            )[["Type", *columns.values()]]
+
+
+def export_csv(
+    filename: str, start: date | None = None, end: date | None = None
+) -> BinaryIO:
+    """
+    Export the records of a record store as CSV, written chunk by chunk.
+
+    Args:
+        filename (str): One of EXPORT_COLUMNS.
+        start (date | None, optional): First date. Defaults to None.
+        end (date | None, optional): Last date. Defaults to None.
+
+    Returns:
+        BinaryIO: The UTF-8 CSV, positioned at its start; the caller closes it.
+    """
+    _, columns = EXPORT_COLUMNS[filename]
+    # Handed over to the caller, which closes it (or drops it, which closes it
+    # and deletes any spilled file); closed here only if the export fails
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)  # noqa: SIM115
+    try:
+        out.write((",".join(["Type", *columns.values()]) + "\n").encode())
+        for chunk in iter_export_frames(filename, start, end):
+            out.write(chunk.to_csv(index=False, header=False).encode())
+    except Exception:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+def export_parquet(
+    filename: str, start: date | None = None, end: date | None = None
+) -> BinaryIO:
+    """
+    Export the records of a record store as Parquet, one row group per chunk.
+
+    Args:
+        filename (str): One of EXPORT_COLUMNS.
+        start (date | None, optional): First date. Defaults to None.
+        end (date | None, optional): Last date. Defaults to None.
+
+    Returns:
+        BinaryIO: The Parquet file, positioned at its start; the caller closes
+            it.
+    """
+    _, columns = EXPORT_COLUMNS[filename]
+    types = {"Amount": pa.float64(), "Date": pa.date32()}
+    schema = pa.schema(
+        [(name, types.get(name, pa.string())) for name in ["Type", *columns.values()]]
+    )
+    # Handed over to the caller like in export_csv
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)  # noqa: SIM115
+    try:
+        with pq.ParquetWriter(out, schema) as writer:
+            for chunk in iter_export_frames(filename, start, end):
+                # Plain strings rather than categoricals, whose dictionary (and
+                # so schema) differs from chunk to chunk
+                chunk = chunk.astype(
+                    {name: object for name in schema.names if name not in types}
+                )
+                writer.write_table(
+                    pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                )
+    except Exception:
+        out.close()
+        raise
+    out.seek(0)
+    return out
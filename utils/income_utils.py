@@ -1,28 +1,105 @@
+import numpy as np
 import pandas as pd
 import streamlit as st
 
-from datetime import datetime
+from datetime import date, datetime
 
-from utils.json_utils import read_json, write_json
+from utils.json_utils import append_json, commit_json
+from utils.ledger_utils import (
+    bucket_sums,
+    load_cube,
+    load_ledger,
+    load_summary,
+    sum_between,
+)
+from utils.money_utils import to_cents
 
 
 def get_incomes_df(year: None | str = None) -> pd.DataFrame:
     """
     Gets a DataFrame of incomes from the JSON data store.
 
-    Returns a DataFrame containing incomes filtered by date prefix.
+    Returns a DataFrame containing incomes filtered by date prefix (a year,
+    or a month as "YYYY-MM"); only the matching incomes are loaded. The
+    DataFrame is the shared typed ledger (see load_ledger) and must not be
+    modified in place.
     """
 
-    data = read_json("incomes.json")
-    df = pd.DataFrame(data["records"])
+    return load_ledger("incomes.json", year)
 
-    if df.empty:
-        return pd.DataFrame(columns=["id", "amount", "date", "source"])
 
-    if year:
-        df = df[df["date"].str.startswith(str(year))]
-        
-    return df[["id", "amount", "date", "source"]]
+def get_income_cube(year: None | str = None) -> pd.DataFrame:
+    """
+    Gets the monthly income totals and counts per source.
+
+    Served from the incrementally maintained aggregate cube, without scanning
+    the incomes. The DataFrame is shared and must not be modified in place.
+
+    Args:
+        year (None | str, optional): Filter by year. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Columns year, month, source ("" when unset), amount
+        (cents) and count.
+    """
+
+    return load_cube("incomes.json", year)
+
+
+def get_income_total_between(start: date, end: date) -> tuple[int, int]:
+    """
+    Gets the total and number of incomes between two dates (inclusive).
+
+    Answered from the prefix-sum date index in O(log n).
+
+    Args:
+        start (date): First day of the range.
+        end (date): Last day of the range.
+
+    Returns:
+        tuple[int, int]: Total amount in cents and number of incomes.
+    """
+
+    return sum_between("incomes.json", start, end)
+
+
+def get_income_summary() -> dict:
+    """
+    Gets the years, first/last dates and per-year totals of the incomes.
+
+    Read from the store summary, without loading any income.
+
+    Returns:
+        dict: "years" (sorted year strings), "min_date"/"max_date" (ISO dates,
+        None without incomes) and "by_year" (per-year "count" and "total" in
+        cents).
+    """
+
+    return load_summary("incomes.json")
+
+
+def get_income_totals_by_period(
+    start: date, end: date, granularity: str, max_points: None | int = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gets the total income per day, week or month between two dates
+    (inclusive), for any number of years.
+
+    Aggregated from the prefix-sum date index (see bucket_sums).
+
+    Args:
+        start (date): First day of the range.
+        end (date): Last day of the range.
+        granularity (str): "Daily", "Weekly" or "Monthly".
+        max_points (None | int, optional): Maximum number of periods, widened
+            as needed. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: First day of each period and its total
+        in cents.
+    """
+
+    return bucket_sums("incomes.json", start, end, granularity, None, max_points)
 
 
 def save_income_data():
@@ -30,19 +107,30 @@ def save_income_data():
     Save income data to the JSON data store.
     """
 
+    save_income_batch([st.session_state.incomes[-1]])
+
+
+def save_income_batch(new_incomes: list[dict]):
+    """
+    Save several incomes to the JSON data store in a single commit.
+
+    Ids are allocated by the writer as a contiguous range from the store's
+    next_id, and the dollar amounts are stored as integer cents.
+    """
+
+    if not new_incomes:
+        return
+
     try:
-        data = read_json("incomes.json")
-        new_income = st.session_state.incomes[-1]
-
-        record = {
-            "id": data["next_id"],
-            "amount": new_income["Amount"],
-            "date": new_income["Date"],
-            "source": new_income["Source"],
-        }
-        data["records"].append(record)
-        data["next_id"] += 1
-        write_json("incomes.json", data)
+        records = [
+            {
+                "amount": to_cents(income["Amount"]),
+                "date": income["Date"],
+                "source": income["Source"],
+            }
+            for income in new_incomes
+        ]
+        commit_json([{"file": "incomes.json", "op": "insert", "data": records}])
     except Exception as e:
         st.error(f"Failed to saving income input data: {e}")
 
@@ -56,10 +144,7 @@ def delete_income_data(income_ids: list):
         return
 
     try:
-        data = read_json("incomes.json")
-        ids_set = set(income_ids)
-        data["records"] = [r for r in data["records"] if r["id"] not in ids_set]
-        write_json("incomes.json", data)
+        append_json("incomes.json", "delete", [int(i) for i in income_ids])
         st.success("Income(s) deleted successfully!")
     except Exception as e:
         st.error(f"Failed to delete income data: {e}")
@@ -0,0 +1,150 @@
+import os
+
+from utils import codec_utils, storage_utils
+from utils.storage_utils import get_journal_path
+
+
+def apply_journal_entry(
+    records: dict, next_id: int, entry: dict, year: str | None = None
+) -> int:
+    """
+    Apply a single journal entry to an id-keyed mapping of records.
+
+    Every operation is idempotent, so replaying a journal over partitions that
+    already contain some of its entries is harmless.
+
+    Args:
+        records (dict): Records keyed by id, mutated in place.
+        next_id (int): Current next id of the store.
+        entry (dict): Journal entry with an "op" and its "data".
+        year (str | None): Only keep records dated in this year, for replaying
+            onto a single partition. Defaults to None.
+
+    Returns:
+        int: The next id after applying the entry.
+    """
+    op, payload = entry["op"], entry["data"]
+    if op in ("insert", "update"):
+        for record in payload:
+            if year is None or record["date"].startswith(year):
+                records[record["id"]] = record
+            else:
+                # An update may move a record out of this year's partition
+                records.pop(record["id"], None)
+            next_id = max(next_id, record["id"] + 1)
+    elif op == "delete":
+        for record_id in payload:
+            records.pop(record_id, None)
+    else:
+        raise ValueError(f"Unknown journal operation: {op}")
+    return next_id
+
+
+def apply_journal(data: dict, entries: list[dict], year: str | None = None) -> dict:
+    """
+    Apply journal entries to a record store, returning the new state.
+
+    The input is left untouched so that previously returned states stay valid.
+    """
+    inserted = [
+        r for entry in entries if entry["op"] == "insert" for r in entry["data"]
+    ]
+    ids = {r["id"] for r in inserted}
+    if (
+        len(ids) == len(inserted) == sum(len(entry["data"]) for entry in entries)
+        and min(ids, default=data["next_id"]) >= data["next_id"]
+    ):
+        # Records with fresh, distinct ids can't replace existing ones (a
+        # replayed redo log may insert the same record twice): append them
+        # instead of rebuilding the id map of the whole store
+        next_id = max([data["next_id"]] + [r["id"] + 1 for r in inserted])
+        added = [r for r in inserted if year is None or r["date"].startswith(year)]
+        return {"next_id": next_id, "records": data["records"] + added}
+
+    records = {r["id"]: r for r in data["records"]}
+    next_id = data["next_id"]
+    for entry in entries:
+        next_id = apply_journal_entry(records, next_id, entry, year)
+    return {"next_id": next_id, "records": list(records.values())}
+
+
+def touched_ids(entries: list[dict]) -> set[int]:
+    """Get the ids of the records inserted, updated or deleted by entries."""
+    return {r["id"] if isinstance(r, dict) else r for e in entries for r in e["data"]}
+
+
+def read_journal(filename: str) -> list[dict]:
+    """
+    Read the entries of a record store's journal.
+
+    A torn final line (e.g. from a crash mid-append) is ignored; the next
+    commit cuts it off (see truncate_torn_tail).
+    """
+    journal_path = get_journal_path(filename)
+    if not os.path.exists(journal_path):
+        return []
+
+    entries = []
+    with open(journal_path, "rb") as f:
+        for line in f:
+            try:
+                entries.append(codec_utils.loads(line))
+            except ValueError:
+                break
+    return entries
+
+
+def truncate_torn_tail(filename: str) -> bool:
+    """
+    Cut a torn final line (e.g. from a crash mid-append) off the journal of a
+    record store, back to its last newline-terminated entry, so that the next
+    append doesn't land on the end of it. Must be called with the store lock
+    held.
+
+    Returns:
+        bool: Whether the journal was truncated.
+    """
+    journal_path = get_journal_path(filename)
+    if not os.path.exists(journal_path):
+        return False
+
+    with open(journal_path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return False
+        f.seek(end - 1)
+        if f.read(1) == b"\n":
+            return False
+        # Search backwards, a block at a time, for the last complete line
+        while end > 0:
+            start = max(end - 65536, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        f.truncate(end)
+    storage_utils.make_durable(journal_path)
+    return True
+
+
+def append_journal(filename: str, entries: list[dict]) -> int:
+    """
+    Append entries to the journal of a record store in a single write, raising
+    on failure, and get it to disk as storage_utils.DURABILITY says.
+
+    Returns:
+        int: Number of bytes appended.
+    """
+    lines = b"".join(codec_utils.dumps(entry) + b"\n" for entry in entries)
+    durability = storage_utils.DURABILITY
+    with open(get_journal_path(filename), "ab") as f:
+        f.write(lines)
+        if durability == "commit":
+            f.flush()
+            os.fsync(f.fileno())
+    storage_utils.make_durable(
+        get_journal_path(filename), synced=durability == "commit"
+    )
+    return len(lines)
@@ -1,88 +1,283 @@
+import copy
 import json
-import os
-import tempfile
+import threading
 
+import pandas as pd
 import streamlit as st
 
+from utils import (
+    cache_utils,
+    codec_utils,
+    cube_utils,
+    jsonstore_utils,
+    migration_utils,
+    money_utils,
+)
+from utils.backend_utils import cached_read, get_backend
+from utils.storage_utils import (
+    DEFAULT_CATEGORIES,
+    DEFAULTS,
+    JOURNALED_FILES,
+    RULE_KEYS,
+    typed_frame,
+)
+from utils.writer_utils import commit_json
 
-DATA_DIR = "./data"
+# Whether init_data_files already ran in this process
+_initialized = False
+_init_lock = threading.Lock()
 
-DEFAULT_CATEGORIES = [
-    "Personal",
-    "Home",
-    "Health",
-    "Grocery",
-    "Food & Dining",
-    "Entertainment",
-    "Transportation",
-    "Travel",
-    "Miscellaneous",
-]
 
-DEFAULTS = {
-    "categories.json": DEFAULT_CATEGORIES,
-    "expenses.json": {"next_id": 1, "records": []},
-    "incomes.json": {"next_id": 1, "records": []},
-}
-
-
-def get_data_dir() -> str:
-    """Get the data directory path, creating it if it doesn't exist."""
-    try:
-        os.makedirs(DATA_DIR, exist_ok=True)
-    except Exception as e:
-        st.error(f"Failed to create data directory: {e}")
-    return DATA_DIR
-
-
-def get_json_path(filename: str) -> str:
-    """Get the full path to a JSON data file."""
-    return os.path.join(get_data_dir(), filename)
+def clear_json_cache() -> None:
+    """Drop every cached data file and reset the hit/miss counters."""
+    cache_utils.clear_cache()
+    jsonstore_utils.clear_store_cache()
 
 
 def read_json(filename: str) -> dict | list:
     """
     Read and parse a JSON data file.
 
-    Returns sensible defaults if the file doesn't exist.
+    For record stores the year partitions are read and the journal replayed
+    on top of them. Returns sensible defaults if the file doesn't exist.
+
+    Parsed data is cached per process and served from memory while the file's
+    data version is unchanged, so the returned object is shared and must not
+    be mutated in place.
     """
-    path = get_json_path(filename)
-    if not os.path.exists(path):
-        return DEFAULTS.get(filename, {})
     try:
-        with open(path) as f:
-            return json.load(f)
+        return cached_read(filename)
     except (json.JSONDecodeError, OSError) as e:
         st.error(f"Failed to read {filename}: {e}")
-        return DEFAULTS.get(filename, {})
+        return copy.deepcopy(DEFAULTS.get(filename, {}))
+
+
+def export_json(filename: str) -> bytes:
+    """
+    Export a data file as pretty-printed JSON.
+
+    Data files are stored compactly; this is their human-readable form, with
+    a record store as a single {"next_id", "records"} object and the amounts
+    of records and rules in dollars.
+
+    Args:
+        filename (str): Data file to export (e.g. "expenses.json").
+
+    Returns:
+        bytes: The UTF-8 JSON, indented by two spaces.
+    """
+    data = read_json(filename)
+    if filename in JOURNALED_FILES:
+        records = [
+            {**r, "amount": money_utils.to_dollars(r["amount"])}
+            for r in data["records"]
+        ]
+        data = {"next_id": data["next_id"], "records": records}
+    elif filename in RULE_KEYS:
+        data = [{**r, "amount": money_utils.to_dollars(r["amount"])} for r in data]
+    return codec_utils.dumps(data, pretty=True)
 
 
 def write_json(filename: str, data: dict | list) -> None:
     """
     Atomically write data to a JSON file.
 
-    Writes to a temp file first, then uses os.replace for atomic swap.
+    For record stores this rewrites the partitions whose records changed and
+    discards the journal, since the written data is the complete new state.
     """
-    data_dir = get_data_dir()
     try:
-        fd, tmp_path = tempfile.mkstemp(dir=data_dir, suffix=".tmp")
-        try:
-            with os.fdopen(fd, "w") as f:
-                json.dump(data, f, indent=2)
-            os.replace(tmp_path, get_json_path(filename))
-        except Exception:
-            os.unlink(tmp_path)
-            raise
+        commit_json([{"file": filename, "op": "write", "data": data}])
+    except Exception as e:
+        st.error(f"Failed to write {filename}: {e}")
+
+
+def append_json(filename: str, op: str, data: list) -> None:
+    """
+    Append a mutation to the journal of a record store.
+
+    This costs O(size of the mutation) rather than a rewrite of the partition:
+    deletes are recorded as tombstones, which readers skip by id. Once the
+    journal grows past JOURNAL_COMPACT_BYTES, or its tombstones reach
+    TOMBSTONE_COMPACT_RATIO of the records, it is compacted back into the
+    partitions on a background thread.
+
+    Args:
+        filename (str): One of JOURNALED_FILES.
+        op (str): "insert" or "update" (data is a list of complete records,
+            updates replace the stored record with the same id) or "delete"
+            (data is a list of ids).
+        data (list): Payload of the operation.
+    """
+    if filename not in JOURNALED_FILES:
+        raise ValueError(f"{filename} is not a journaled data file")
+
+    try:
+        commit_json([{"file": filename, "op": op, "data": data}])
     except Exception as e:
         st.error(f"Failed to write {filename}: {e}")
 
 
+def query_json(
+    filename: str,
+    date_prefix: str | None = None,
+    category: str | None = None,
+    ids: list[int] | None = None,
+) -> list[dict]:
+    """
+    Get the records of a record store matching the given filters.
+
+    The SQLite backend evaluates the filters on its indexes. The JSON backend
+    looks ids up in the id index of the cached records when it can; otherwise
+    it only reads the year partition the date prefix falls in, and streams it
+    through the other filters, so that only the matching records are
+    materialized.
+
+    Args:
+        filename (str): One of JOURNALED_FILES.
+        date_prefix (str | None): Keep dates starting with this prefix
+            (e.g. "2025" or "2025-03").
+        category (str | None): Keep only this expense category.
+        ids (list[int] | None): Keep only the records with these ids.
+
+    Returns:
+        list[dict]: Matching records.
+    """
+    try:
+        return get_backend().query_store(filename, date_prefix, category, ids)
+    except (json.JSONDecodeError, OSError) as e:
+        st.error(f"Failed to read {filename}: {e}")
+        return []
+
+
+def query_frame(
+    filename: str, date_prefix: str | None = None, category: str | None = None
+) -> pd.DataFrame:
+    """
+    Get the records of a record store as a DataFrame with parsed dates.
+
+    Whole years are read as year partition frames; with the JSON backend and
+    COLUMNAR_SNAPSHOTS enabled, the columns of partitions untouched by the
+    journal are memory-mapped rather than parsed. Narrower filters are pushed
+    down to the reads (see query_json), so that only the matching records are
+    materialized.
+
+    Args:
+        filename (str): One of JOURNALED_FILES.
+        date_prefix (str | None): Keep dates starting with this prefix
+            (e.g. "2025" or "2025-03").
+        category (str | None): Keep only this expense category.
+
+    Returns:
+        pd.DataFrame: One column per field of the store, "date" as datetime64.
+    """
+    try:
+        return get_backend().query_frame(filename, date_prefix, category)
+    except (json.JSONDecodeError, OSError, ValueError) as e:
+        st.error(f"Failed to read {filename}: {e}")
+        return typed_frame(filename, [])
+
+
+def query_cube(filename: str, year: str | None = None) -> pd.DataFrame:
+    """
+    Get the year x month aggregates of a record store.
+
+    Expenses are broken down by category and incomes by source. The cube is
+    maintained incrementally on every write (by triggers with the SQLite
+    backend), so reading it never scans the records; it is only rebuilt if it
+    is missing or stale, e.g. after another process wrote to the store.
+
+    Args:
+        filename (str): One of JOURNALED_FILES.
+        year (str | None): Keep only this year. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Columns year, month, category/source, amount (sum) and
+        count, one row per non-empty cell.
+    """
+    key = cube_utils.CUBE_KEYS[filename]
+    try:
+        cells = get_backend().query_cube(filename)
+    except (json.JSONDecodeError, OSError) as e:
+        st.error(f"Failed to read {filename}: {e}")
+        cells = []
+
+    df = cube_utils.cube_frame(cells, key)
+    if year is not None:
+        df = df[df["year"] == int(year)]
+    return df
+
+
+def query_summary(filename: str) -> dict:
+    """
+    Get the years, date range and per-year totals of a record store.
+
+    Derived from the aggregate cube (and its per-day record counts) rather
+    than the records; the SQLite backend reads the first and last dates off
+    its date index.
+
+    Args:
+        filename (str): One of JOURNALED_FILES.
+
+    Returns:
+        dict: "years" (sorted year strings), "min_date"/"max_date" (ISO dates,
+        None without records) and "by_year", mapping each year to its record
+        "count" and amount "total".
+    """
+    try:
+        return get_backend().query_summary(filename)
+    except (json.JSONDecodeError, OSError) as e:
+        st.error(f"Failed to read {filename}: {e}")
+        return cube_utils.summarize_cube({"cells": {}, "days": {}})
+
+
+def query_key_ids(filename: str, value: str) -> list[int]:
+    """
+    Get the ids of the records of a record store with a given category
+    (expenses) or source (incomes).
+
+    The JSON backend keeps an index of the ids per value, built from the
+    records on first use and then moved along by every write like the cube;
+    the SQLite backend reads them off its category index.
+
+    Args:
+        filename (str): One of JOURNALED_FILES.
+        value (str): Category or source ("" for incomes without one).
+
+    Returns:
+        list[int]: Sorted record ids.
+    """
+    try:
+        return get_backend().query_key_ids(filename, value)
+    except (json.JSONDecodeError, OSError) as e:
+        st.error(f"Failed to read {filename}: {e}")
+        return []
+
+
+def count_key(filename: str, value: str) -> int:
+    """
+    Count the records of a record store with a given category (expenses) or
+    source (incomes), from the index of query_key_ids.
+
+    Args:
+        filename (str): One of JOURNALED_FILES.
+        value (str): Category or source ("" for incomes without one).
+
+    Returns:
+        int: Number of records.
+    """
+    try:
+        return get_backend().count_key(filename, value)
+    except (json.JSONDecodeError, OSError) as e:
+        st.error(f"Failed to read {filename}: {e}")
+        return 0
+
+
 def get_data_schema(data_name: str) -> str:
     """
     Get a human-readable schema description for the AI agent.
 
     Args:
-        data_name: One of "expenses", "incomes", or "categories"
+        data_name: One of "expenses", "incomes", "recurring" or "categories"
 
     Returns:
         str: Schema description string
@@ -91,9 +286,9 @@ def get_data_schema(data_name: str) -> str:
         "expenses": (
             "DataFrame Schema for expenses:\n"
             "  - id: int\n"
-            "  - amount: float\n"
+            "  - amount: int (cents)\n"
             "  - category: str\n"
-            "  - date: str (YYYY-MM-DD)\n"
+            "  - date: datetime64\n"
             "  - notes: str (nullable)\n"
             "  - frequency: str (nullable)\n"
             "  - recurring_id: str (nullable)"
@@ -101,10 +296,21 @@ def get_data_schema(data_name: str) -> str:
         "incomes": (
             "DataFrame Schema for incomes:\n"
             "  - id: int\n"
-            "  - amount: float\n"
-            "  - date: str (YYYY-MM-DD)\n"
+            "  - amount: int (cents)\n"
+            "  - date: datetime64\n"
             "  - source: str"
         ),
+        "recurring": (
+            "Recurring expense rules (occurrences are included in the expenses):\n"
+            "  - recurring_id: str\n"
+            "  - amount: int (cents, per occurrence)\n"
+            "  - category: str\n"
+            "  - notes: str (nullable)\n"
+            "  - frequency: str (Weekly, Biweekly, Monthly, Quarterly, Yearly)\n"
+            "  - start_date: str (YYYY-MM-DD)\n"
+            "  - end_date: str (YYYY-MM-DD)\n"
+            "  - skipped: list[str] (dates of deleted occurrences)"
+        ),
         "categories": "Categories: a list of category name strings",
     }
     return schemas.get(data_name, f"Unknown data: {data_name}")
@@ -114,13 +320,36 @@ def init_data_files():
     """
     Initialize JSON data files, creating defaults if they don't exist.
 
-    Seeds default categories if categories.json is empty or missing.
+    Seeds default categories if categories.json is empty or missing, and
+    splits record stores still kept as a single file into year partitions.
+    Record stores holding float dollar amounts are converted to integer
+    cents, and recurring series stored expanded are folded into rules. With
+    the SQLite backend, a new database is seeded from the JSON files.
+
+    Only the first call in a process does anything, so that reruns of the app
+    don't repeat the checks.
     """
-    for filename, default in DEFAULTS.items():
-        path = get_json_path(filename)
-        if not os.path.exists(path):
-            write_json(filename, default)
-        elif filename == "categories.json":
-            categories = read_json(filename)
-            if not categories:
-                write_json(filename, DEFAULT_CATEGORIES)
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+
+        migrated = False
+        for filename in JOURNALED_FILES:
+            migrated |= migration_utils.migrate_single_file_store(filename)
+            migrated |= migration_utils.migrate_amounts_to_cents(filename)
+        migrated |= migration_utils.migrate_recurring_series()
+        if migrated:
+            # Drop the views of the files the migrations rewrote
+            clear_json_cache()
+
+        try:
+            ops = get_backend().init_ops()
+            if ops:
+                commit_json(ops)
+        except Exception as e:
+            st.error(f"Failed to initialize the data files: {e}")
+
+        if not read_json("categories.json"):
+            write_json("categories.json", DEFAULT_CATEGORIES)
+        _initialized = True
@@ -0,0 +1,534 @@
+import copy
+import json
+import os
+import threading
+
+import pandas as pd
+import streamlit as st
+
+from utils import cache_utils, codec_utils, cube_utils, partition_utils, stream_utils
+from utils.journal_utils import (
+    append_journal,
+    apply_journal,
+    apply_journal_entry,
+    read_journal,
+    touched_ids,
+    truncate_torn_tail,
+)
+from utils.storage_utils import (
+    DEFAULTS,
+    JOURNALED_FILES,
+    file_stamp,
+    get_cube_path,
+    get_journal_path,
+    get_json_path,
+    get_manifest_path,
+    get_redo_log_path,
+    remove_durably,
+    store_lock,
+    typed_frame,
+    write_file,
+)
+
+# Journal size (bytes) past which the journal is folded back into the snapshot
+JOURNAL_COMPACT_BYTES = 256 * 1024
+
+# Share of the stored records deleted by journaled tombstones past which the
+# journal is compacted, however small it still is
+TOMBSTONE_COMPACT_RATIO = 0.2
+
+# Record stores being compacted on a background thread
+_compacting: set[str] = set()
+
+# Ids deleted by the journal of each record store: filename -> (version, count)
+_tombstone_counts: dict[str, tuple[tuple, int]] = {}
+
+# Aggregate cubes of the JSON record stores: filename -> (version, cube)
+_cube_cache: dict[str, tuple[tuple, dict]] = {}
+
+
+def get_store_version(filename: str) -> tuple:
+    """
+    Get a stamp identifying the on-disk state of a JSON data file: that of
+    the file or, for record stores, of the manifest and journal (partitions
+    are only rewritten together with the manifest).
+    """
+    if filename in JOURNALED_FILES:
+        return (
+            file_stamp(get_manifest_path(filename)),
+            file_stamp(get_journal_path(filename)),
+        )
+    return (file_stamp(get_json_path(filename)),)
+
+
+def clear_store_cache() -> None:
+    """Drop the parsed partitions, tombstone counts and cubes."""
+    partition_utils.clear_partition_cache()
+    _tombstone_counts.clear()
+    _cube_cache.clear()
+
+
+def _cached_read(filename: str) -> dict | list:
+    """Read a whole JSON data file through the cache."""
+    return cache_utils.cached_read(
+        filename, None, get_store_version(filename), lambda: read_store(filename)
+    )
+
+
+def read_store(filename: str, year: str | None = None) -> dict | list:
+    """
+    Read a JSON data file, raising on failure.
+
+    Record stores are assembled from their year partitions with the journal
+    replayed on top. With a year, only that partition is read and its records
+    are returned as a list.
+    """
+    if filename not in JOURNALED_FILES:
+        path = get_json_path(filename)
+        if not os.path.exists(path):
+            return copy.deepcopy(DEFAULTS.get(filename, {}))
+        return codec_utils.load(path)
+
+    manifest = partition_utils.read_manifest(filename)
+    if year is not None:
+        if year in manifest["years"]:
+            records = partition_utils.read_partition(filename, year)
+        else:
+            records = []
+        data = {"next_id": manifest["next_id"], "records": records}
+        return apply_journal(data, read_journal(filename), year)["records"]
+
+    records = [
+        r
+        for y in manifest["years"]
+        for r in partition_utils.read_partition(filename, y)
+    ]
+    data = {"next_id": manifest["next_id"], "records": records}
+    return apply_journal(data, read_journal(filename))
+
+
+def get_next_id(filename: str) -> int:
+    """Get the id the next record inserted into a record store will get."""
+    return _cached_read(filename)["next_id"]
+
+
+def read_frame(filename: str, year: str | None = None) -> pd.DataFrame:
+    """
+    Read a record store, or one year of it, as a typed DataFrame.
+
+    Partition frames are used as they are; records touched by the journal,
+    including those it deletes (tombstones), are dropped from them and their
+    journaled state appended instead.
+    """
+    manifest = partition_utils.read_manifest(filename)
+    years = [y for y in manifest["years"] if year is None or y == year]
+    frames = [partition_utils.read_partition_frame(filename, y) for y in years]
+
+    entries = read_journal(filename)
+    if entries:
+        touched = {}
+        for entry in entries:
+            apply_journal_entry(touched, 0, entry, year)
+        ids = touched_ids(entries)
+        frames = [df[~df["id"].isin(ids)] for df in frames]
+        frames.append(typed_frame(filename, list(touched.values())))
+
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return typed_frame(filename, [])
+    if len(frames) == 1:
+        return frames[0]
+    return partition_utils.concat_frames(frames)
+
+
+def scan_store(
+    filename: str,
+    date_prefix: str | None = None,
+    category: str | None = None,
+    ids: list[int] | None = None,
+) -> list[dict]:
+    """
+    Get the records of a record store matching the given filters, raising on
+    failure.
+
+    The filters are pushed down to the partition reads (see
+    partition_utils.scan_partition), and the date prefix selects the
+    partition to read. Records touched by the journal are taken in their
+    journaled state instead.
+    """
+    predicate = stream_utils.record_filter(date_prefix, category, ids)
+    manifest = partition_utils.read_manifest(filename)
+    years = [y for y in manifest["years"] if not date_prefix or y == date_prefix[:4]]
+
+    entries = read_journal(filename)
+    touched = {}
+    for entry in entries:
+        apply_journal_entry(touched, 0, entry)
+    journaled = touched_ids(entries)
+
+    def keep(record: dict) -> bool:
+        return record["id"] not in journaled and predicate(record)
+
+    records = [
+        r for y in years for r in partition_utils.scan_partition(filename, y, keep)
+    ]
+    return records + [r for r in touched.values() if predicate(r)]
+
+
+def query_store(
+    filename: str,
+    date_prefix: str | None = None,
+    category: str | None = None,
+    ids: list[int] | None = None,
+) -> list[dict]:
+    """
+    Get the records of a record store matching the given filters, raising on
+    failure.
+
+    Ids are looked up in the id index of the cached records when they are
+    cached; otherwise the records are scanned (see scan_store).
+    """
+    if not (date_prefix or category or ids is not None):
+        return _cached_read(filename)["records"]
+    version = get_store_version(filename)
+    cached = cache_utils.get_cached(filename, None, version)
+    if ids is not None and cached is not None:
+        index = cache_utils.record_index(filename, None, version, cached["records"])
+        predicate = stream_utils.record_filter(date_prefix, category)
+        return sorted(
+            (index[i] for i in ids if i in index and predicate(index[i])),
+            key=lambda r: r["id"],
+        )
+    return scan_store(filename, date_prefix, category, ids)
+
+
+def query_frame(
+    filename: str, date_prefix: str | None = None, category: str | None = None
+) -> pd.DataFrame:
+    """
+    Get the records of a record store matching the given filters as a typed
+    DataFrame, raising on failure. Whole years are read as partition frames
+    (see read_frame), narrower filters are pushed down to a scan.
+    """
+    if category or (date_prefix and len(date_prefix) > 4):
+        return typed_frame(filename, scan_store(filename, date_prefix, category))
+    return read_frame(filename, date_prefix)
+
+
+def write_store(filename: str, data: dict | list) -> None:
+    """Replace the content of a JSON data file, raising on failure."""
+    cache_utils.drop_cached(filename)
+    if filename in JOURNALED_FILES:
+        partition_utils.write_partitions(filename, data)
+        if os.path.exists(get_journal_path(filename)):
+            remove_durably(get_journal_path(filename))
+        key = cube_utils.CUBE_KEYS[filename]
+        _save_cube(filename, cube_utils.build_cube(data["records"], key))
+    else:
+        write_file(get_json_path(filename), data)
+    cache_utils.put_cached(filename, None, get_store_version(filename), data)
+
+
+def _tombstone_count(filename: str) -> int:
+    """Get the number of ids deleted by the journal of a record store."""
+    version = get_store_version(filename)
+    cached = _tombstone_counts.get(filename)
+    if cached is None or cached[0] != version:
+        entries = read_journal(filename)
+        count = sum(len(e["data"]) for e in entries if e["op"] == "delete")
+        cached = (version, count)
+        _tombstone_counts[filename] = cached
+    return cached[1]
+
+
+def _needs_compaction(filename: str, journal_size: int) -> bool:
+    """
+    Whether the journal of a record store is due to be folded back into its
+    partitions: once it grows past JOURNAL_COMPACT_BYTES, or once its
+    tombstones delete TOMBSTONE_COMPACT_RATIO of the records it was applied to.
+    """
+    if journal_size > JOURNAL_COMPACT_BYTES:
+        return True
+    tombstones = _tombstone_count(filename)
+    if not tombstones:
+        return False
+    live = len(_cached_read(filename)["records"])
+    return tombstones >= TOMBSTONE_COMPACT_RATIO * (live + tombstones)
+
+
+def append_entries(filename: str, entries: list[dict]) -> int:
+    """
+    Append entries to the journal of a record store in a single write,
+    raising on failure. The cached views and the cube are moved along in
+    memory.
+
+    Returns:
+        int: Size of the journal after the append.
+    """
+    version = get_store_version(filename)
+    cube = _load_cube(filename)
+    keys = cache_utils.pop_key_index(filename, version)
+    before = {}
+    if cube is not None or keys is not None:
+        ids = {
+            r if entry["op"] == "delete" else r["id"]
+            for entry in entries
+            if entry["op"] != "insert"
+            for r in entry["data"]
+        }
+        if ids:
+            records = _cached_read(filename)["records"]
+            index = cache_utils.record_index(filename, None, version, records)
+            before = {i: index[i] for i in ids if i in index}
+
+    appended = append_journal(filename, entries)
+    new_version = get_store_version(filename)
+    journal_size = new_version[1][1]
+    previous_size = version[1][1] if version[1] else 0
+    in_sequence = (
+        new_version[0] == version[0] and journal_size == previous_size + appended
+    )
+
+    # Move the cube and key index along by the records the entries replaced
+    # and added
+    after = dict(before)
+    for entry in entries:
+        apply_journal_entry(after, 0, entry)
+    key = cube_utils.CUBE_KEYS[filename]
+    _cube_cache.pop(filename, None)
+    if cube is not None and in_sequence:
+        cube_utils.apply_to_cube(cube, list(before.values()), list(after.values()), key)
+        _save_cube(filename, cube)
+    if keys is not None and in_sequence:
+        # New sets for the values touched, since readers may hold the old ones
+        removed, added = {}, {}
+        for record in before.values():
+            removed.setdefault(record.get(key) or "", set()).add(record["id"])
+        for record in after.values():
+            added.setdefault(record.get(key) or "", set()).add(record["id"])
+        keys = {
+            **keys,
+            **{
+                value: (keys.get(value, set()) - removed.get(value, set()))
+                | added.get(value, set())
+                for value in removed.keys() | added.keys()
+            },
+        }
+        cache_utils.put_key_index(filename, new_version, keys)
+
+    # Count the new tombstones on top of the journal's, if they are known
+    counted = (version, 0) if version[1] is None else _tombstone_counts.get(filename)
+    _tombstone_counts.pop(filename, None)
+    if in_sequence and counted is not None and counted[0] == version:
+        deleted = sum(len(e["data"]) for e in entries if e["op"] == "delete")
+        _tombstone_counts[filename] = (new_version, counted[1] + deleted)
+
+    cache_utils.refresh_cached(
+        filename, version, new_version if in_sequence else None, entries
+    )
+    return journal_size
+
+
+def apply_ops(ops: list[dict]) -> None:
+    """
+    Apply committed operations to the JSON data files, raising on failure.
+
+    The mutations of each record store are appended to its journal in one
+    write, deletes as tombstones. Once a journal grows past
+    JOURNAL_COMPACT_BYTES, or its tombstones reach TOMBSTONE_COMPACT_RATIO of
+    the records, it is compacted back into the partitions on a background
+    thread.
+    """
+    by_file: dict[str, list] = {}
+    for op in ops:
+        by_file.setdefault(op["file"], []).append(op)
+
+    for filename, file_ops in by_file.items():
+        entries = []
+        for op in file_ops:
+            if op["op"] == "write":
+                # The complete new state supersedes earlier mutations
+                entries = []
+                write_store(filename, op["data"])
+            else:
+                entries.append({"op": op["op"], "data": op["data"]})
+        if not entries:
+            continue
+        journal_size = append_entries(filename, entries)
+        if filename not in _compacting and _needs_compaction(filename, journal_size):
+            _compacting.add(filename)
+            threading.Thread(
+                target=compact_store, args=(filename,), daemon=True
+            ).start()
+
+
+def recover_store() -> None:
+    """
+    Complete a multi-file commit interrupted by a crash by replaying its redo
+    log, after cutting any torn final line off the journals. Must be called
+    with the store lock held.
+    """
+    for filename in JOURNALED_FILES:
+        truncate_torn_tail(filename)
+
+    path = get_redo_log_path()
+    if not os.path.exists(path):
+        return
+    ops = codec_utils.load(path)["ops"]
+
+    # Replaying is idempotent for the files, but the cubes can't tell which
+    # entries they already hold: have them rebuilt
+    for filename in {op["file"] for op in ops} & set(JOURNALED_FILES):
+        _cube_cache.pop(filename, None)
+        if os.path.exists(get_cube_path(filename)):
+            os.remove(get_cube_path(filename))
+    apply_ops(ops)
+    remove_durably(path)
+
+
+def commit_batch(ops: list[dict]) -> None:
+    """
+    Apply committed operations to the JSON data files, raising on failure.
+    Must be called with the store lock held.
+
+    Operations spanning several files are recorded in the redo log first:
+    once it is written they are committed, and if applying them fails midway
+    they are completed by the next commit or at startup.
+    """
+    if len({op["file"] for op in ops}) == 1:
+        apply_ops(ops)
+    else:
+        write_file(get_redo_log_path(), {"ops": ops})
+        apply_ops(ops)
+        remove_durably(get_redo_log_path())
+
+
+def compact_store(filename: str) -> None:
+    """
+    Fold the journal of a record store into its year partitions.
+
+    Only the partitions touched by the journal are rewritten. They are
+    replaced before the journal is removed; a crash in between leaves a
+    journal whose replay is a no-op.
+    """
+    try:
+        with store_lock():
+            if not os.path.exists(get_journal_path(filename)):
+                return
+            data = read_store(filename)
+            # Cache the records in the order a fresh read of the partitions
+            # yields them: grouped by year
+            records = sorted(data["records"], key=lambda r: r["date"][:4])
+            data = {"next_id": data["next_id"], "records": records}
+            cube = _load_cube(filename)
+            keys = cache_utils.pop_key_index(filename, get_store_version(filename))
+            partition_utils.write_partitions(filename, data)
+            remove_durably(get_journal_path(filename))
+            cache_utils.drop_cached(filename)
+            version = get_store_version(filename)
+            cache_utils.put_cached(filename, None, version, data)
+            # Same records, new version: restamp the cube and key index rather
+            # than rebuild them
+            if cube is not None:
+                _save_cube(filename, cube)
+            if keys is not None:
+                cache_utils.put_key_index(filename, version, keys)
+    except Exception as e:
+        cache_utils.drop_cached(filename)
+        st.error(f"Failed to compact {filename}: {e}")
+    finally:
+        _compacting.discard(filename)
+
+
+def _load_cube(filename: str) -> dict | None:
+    """
+    Get the aggregate cube of a JSON record store, from memory or cube.json.
+
+    Returns:
+        dict | None: The cube, or None if it doesn't reflect the store's
+        current data version.
+    """
+    version = get_store_version(filename)
+    cached = _cube_cache.get(filename)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    stored = cube_utils.read_cube(get_cube_path(filename))
+    if stored is None or stored[0] != json.dumps(version):
+        return None
+    _cube_cache[filename] = (version, stored[1])
+    return stored[1]
+
+
+def _save_cube(filename: str, cube: dict) -> None:
+    """Persist the aggregate cube of a JSON record store for its current version."""
+    version = get_store_version(filename)
+    cube_utils.write_cube(get_cube_path(filename), json.dumps(version), cube)
+    _cube_cache[filename] = (version, cube)
+
+
+def current_cube(filename: str) -> dict:
+    """Get the aggregate cube of a JSON record store, rebuilding it if stale."""
+    cube = _load_cube(filename)
+    if cube is not None:
+        return cube
+    with store_lock():
+        cube = _load_cube(filename)
+        if cube is None:
+            records = _cached_read(filename)["records"]
+            cube = cube_utils.build_cube(records, cube_utils.CUBE_KEYS[filename])
+            _save_cube(filename, cube)
+        return cube
+
+
+def current_key_index(filename: str) -> dict[str, set]:
+    """Get the key index of a JSON record store, building it if stale."""
+    version = get_store_version(filename)
+    keys = cache_utils.get_key_index(filename, version)
+    if keys is not None:
+        return keys
+    key = cube_utils.CUBE_KEYS[filename]
+    keys = {}
+    for record in _cached_read(filename)["records"]:
+        keys.setdefault(record.get(key) or "", set()).add(record["id"])
+    cache_utils.put_key_index(filename, version, keys)
+    return keys
+
+
+def query_cube(filename: str) -> list[tuple]:
+    """
+    Get the aggregate cube of a record store.
+
+    Returns:
+        list[tuple]: Rows of (year, month, key value, amount sum, count).
+    """
+    cells = current_cube(filename)["cells"]
+    return sorted((*coords, amount, count) for coords, (amount, count) in cells.items())
+
+
+def query_summary(filename: str) -> dict:
+    """Summarize a record store per year off its cube (see summarize_cube)."""
+    return cube_utils.summarize_cube(current_cube(filename))
+
+
+def query_key_ids(filename: str, value: str) -> list[int]:
+    """Get the sorted ids of the records with a given category or source."""
+    return sorted(current_key_index(filename).get(value, ()))
+
+
+def count_key(filename: str, value: str) -> int:
+    """Count the records with a given category or source."""
+    return len(current_key_index(filename).get(value, ()))
+
+
+def init_ops() -> list[dict]:
+    """Operations creating the missing data files with their defaults."""
+    ops = []
+    for filename, default in DEFAULTS.items():
+        if filename in JOURNALED_FILES:
+            path = get_manifest_path(filename)
+        else:
+            path = get_json_path(filename)
+        if not os.path.exists(path):
+            ops.append({"file": filename, "op": "write", "data": default})
+    return ops
@@ -0,0 +1,322 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from utils import recurring_utils
+from utils.backend_utils import get_data_version
+from utils.cube_utils import CUBE_KEYS
+from utils.json_utils import query_cube, query_frame, query_summary, read_json
+from utils.storage_utils import RULE_FILES
+
+# Memoized typed ledgers: (filename, date prefix, category) -> (data version, DataFrame)
+_ledger_cache: dict[tuple[str, str | None, str | None], tuple[tuple, pd.DataFrame]] = {}
+
+# Memoized aggregate cubes: (filename, year) -> (data version, DataFrame)
+_cube_cache: dict[tuple[str, str | None], tuple[tuple, pd.DataFrame]] = {}
+
+# Memoized store summaries: filename -> (data version, summary)
+_summary_cache: dict[str, tuple[tuple, dict]] = {}
+
+# Memoized prefix-sum date indexes: filename -> (data version, index)
+_date_index_cache: dict[str, tuple[tuple, dict]] = {}
+
+# Granularity of bucket_sums -> days per bucket (None for calendar months)
+GRANULARITIES = {"Daily": 1, "Weekly": 7, "Monthly": None}
+
+
+def get_ledger_version(filename: str) -> tuple:
+    """Data version of a record store together with its recurring rules, if any."""
+    version = get_data_version(filename)
+    if filename in RULE_FILES:
+        version += get_data_version(RULE_FILES[filename])
+    return version
+
+
+def _occurrences(
+    filename: str, date_prefix: str | None = None, category: str | None = None
+) -> pd.DataFrame | None:
+    """
+    Materialize the recurring occurrences of a record store matching the
+    filters, or None if there are none.
+    """
+    if filename not in RULE_FILES:
+        return None
+    occurrences = recurring_utils.materialize(
+        read_json(RULE_FILES[filename]), date_prefix, category
+    )
+    return None if occurrences.empty else occurrences
+
+
+def _add_to_cube(cube: pd.DataFrame, occurrences: pd.DataFrame) -> pd.DataFrame:
+    """Add materialized occurrences to the cells of a cube frame."""
+    key = cube.columns[2]
+    cells = occurrences.assign(
+        year=occurrences["date"].dt.year, month=occurrences["date"].dt.month, count=1
+    )[cube.columns]
+    df = pd.concat([cube, cells]).groupby(["year", "month", key], as_index=False).sum()
+    return df.astype({"year": "int32", "month": "int32", "amount": "int64"})
+
+
+def _add_to_summary(summary: dict, occurrences: pd.DataFrame) -> dict:
+    """Add materialized occurrences to a store summary."""
+    by_year = {year: dict(totals) for year, totals in summary["by_year"].items()}
+    years = occurrences["date"].dt.year.astype(str)
+    grouped = occurrences.groupby(years)["amount"].agg(["count", "sum"])
+    for year, count, total in grouped.itertuples():
+        totals = by_year.setdefault(year, {"count": 0, "total": 0})
+        totals["count"] += int(count)
+        totals["total"] += int(total)
+    dates = occurrences["date"]
+    first, last = dates.min().strftime("%Y-%m-%d"), dates.max().strftime("%Y-%m-%d")
+    return {
+        "years": sorted(by_year),
+        "min_date": min(filter(None, (summary["min_date"], first))),
+        "max_date": max(filter(None, (summary["max_date"], last))),
+        "by_year": dict(sorted(by_year.items())),
+    }
+
+
+def _type_ledger(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give a record store DataFrame its typed ledger columns.
+
+    Existing columns are reused without copying; "year" and "month" are added
+    as int columns and "category"/"source" become Categoricals.
+    """
+    columns = {column: df[column] for column in df.columns}
+    columns["amount"] = columns["amount"].astype("int64", copy=False)
+    for column in ("category", "source"):
+        if column in columns:
+            columns[column] = columns[column].astype("category")
+    columns["year"] = df["date"].dt.year.astype("int32")
+    columns["month"] = df["date"].dt.month.astype("int32")
+    # copy=False keeps one block per column: consolidating the columns of a
+    # dtype into a 2D block (as DataFrame._from_arrays does) would copy them
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_ledger(
+    filename: str, date_prefix: str | int | None = None, category: str | None = None
+) -> pd.DataFrame:
+    """
+    Load a record store as a typed DataFrame, parsed once per data version.
+
+    Every caller asking for the same store and filters while the data is
+    unchanged gets the same DataFrame object, so it must not be modified in
+    place (filtering or copying it is fine). The filters are applied while
+    reading (see query_frame), so only the matching records are loaded.
+    Expenses include the occurrences of the recurring rules in the range,
+    generated for the query (see recurring_utils.materialize).
+
+    Args:
+        filename (str): "expenses.json" or "incomes.json".
+        date_prefix (str | int | None, optional): Only load dates starting with
+            this prefix (e.g. 2025 or "2025-03"). Defaults to None.
+        category (str | None, optional): Only load this expense category.
+            Defaults to None.
+
+    Returns:
+        pd.DataFrame: The store's fields with "date" as datetime64, "amount"
+        as int64 cents, "category"/"source" as Categorical, plus int "year" and
+        "month" columns.
+    """
+    date_prefix = str(date_prefix) if date_prefix else None
+    version = get_ledger_version(filename)
+    cached = _ledger_cache.get((filename, date_prefix, category))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    df = query_frame(filename, date_prefix, category)
+    occurrences = _occurrences(filename, date_prefix, category)
+    if occurrences is not None:
+        df = pd.concat([df, occurrences], ignore_index=True)
+    df = _type_ledger(df)
+    _ledger_cache[(filename, date_prefix, category)] = (version, df)
+    return df
+
+
+def load_cube(filename: str, year: str | int | None = None) -> pd.DataFrame:
+    """
+    Load the year x month aggregates of a record store, once per data version.
+
+    Like load_ledger, the returned DataFrame is shared and must not be
+    modified in place. It includes the occurrences of recurring expenses.
+
+    Args:
+        filename (str): "expenses.json" or "incomes.json".
+        year (str | int | None, optional): Only load this year. Defaults to None.
+
+    Returns:
+        pd.DataFrame: Columns year, month, "category" (expenses) or "source"
+        (incomes, "" when unset), amount (sum in cents) and count.
+    """
+    year = str(year) if year else None
+    version = get_ledger_version(filename)
+    cached = _cube_cache.get((filename, year))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    df = query_cube(filename, year)
+    occurrences = _occurrences(filename, year)
+    if occurrences is not None:
+        df = _add_to_cube(df, occurrences)
+    _cube_cache[(filename, year)] = (version, df)
+    return df
+
+
+def load_summary(filename: str) -> dict:
+    """
+    Load the years, date range and per-year totals of a record store.
+
+    Computed from the aggregate cube once per data version, so this never
+    touches the records, plus the occurrences of recurring expenses. The
+    returned dict is shared and must not be modified.
+
+    Args:
+        filename (str): "expenses.json" or "incomes.json".
+
+    Returns:
+        dict: "years" (sorted year strings), "min_date"/"max_date" (ISO dates,
+        None without records) and "by_year", mapping each year to its record
+        "count" and amount "total" in cents.
+    """
+    version = get_ledger_version(filename)
+    cached = _summary_cache.get(filename)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    summary = query_summary(filename)
+    occurrences = _occurrences(filename)
+    if occurrences is not None:
+        summary = _add_to_summary(summary, occurrences)
+    _summary_cache[filename] = (version, summary)
+    return summary
+
+
+def _prefix_sums(days: np.ndarray, amounts: np.ndarray) -> tuple:
+    """Sort amounts by day and prefix them with their running total."""
+    order = np.argsort(days, kind="stable")
+    return days[order], np.concatenate(([0], np.cumsum(amounts[order])))
+
+
+def load_date_index(filename: str) -> dict:
+    """
+    Load a date-sorted prefix-sum index of a record store, once per data version.
+
+    Args:
+        filename (str): "expenses.json" or "incomes.json".
+
+    Returns:
+        dict: None -> (days, sums) over every record, plus the same pair per
+        category (expenses) or source (incomes). days holds the sorted record
+        dates as days since the epoch and sums[i] the total of the first i
+        amounts (cents).
+    """
+    version = get_ledger_version(filename)
+    cached = _date_index_cache.get(filename)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    df = load_ledger(filename)
+    days = df["date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+    amounts = df["amount"].to_numpy()
+    index = {None: _prefix_sums(days, amounts)}
+    for value, rows in df.groupby(CUBE_KEYS[filename], observed=True).indices.items():
+        index[value] = _prefix_sums(days[rows], amounts[rows])
+
+    _date_index_cache[filename] = (version, index)
+    return index
+
+
+def sum_between(
+    filename: str, start: date, end: date, key: str | None = None
+) -> tuple[int, int]:
+    """
+    Total and count the records dated from start to end (inclusive).
+
+    Two binary searches into the date index, whatever the size of the ledger
+    or the range.
+
+    Args:
+        filename (str): "expenses.json" or "incomes.json".
+        start (date): First day of the range.
+        end (date): Last day of the range.
+        key (str | None, optional): Only count this category (expenses) or
+            source (incomes). Defaults to None.
+
+    Returns:
+        tuple[int, int]: The total amount in cents and number of records.
+    """
+    index = load_date_index(filename)
+    if key not in index:
+        return 0, 0
+    days, sums = index[key]
+    lo = np.searchsorted(days, np.datetime64(start, "D").astype(np.int64), "left")
+    hi = np.searchsorted(days, np.datetime64(end, "D").astype(np.int64), "right")
+    if hi <= lo:
+        return 0, 0
+    return int(sums[hi] - sums[lo]), int(hi - lo)
+
+
+def bucket_sums(
+    filename: str,
+    start: date,
+    end: date,
+    granularity: str = "Monthly",
+    key: str | None = None,
+    max_points: int | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Total the records dated from start to end (inclusive) per day, week
+    (starting on Monday) or calendar month.
+
+    The records in the range are located by two binary searches into the date
+    index, and their amounts summed into the buckets by a single np.bincount
+    over their day offsets, so the result has one value per bucket however
+    many records and years there are. With max_points, buckets are widened to
+    several days, weeks or months so that there are at most that many.
+
+    Args:
+        filename (str): "expenses.json" or "incomes.json".
+        start (date): First day of the range.
+        end (date): Last day of the range.
+        granularity (str, optional): One of GRANULARITIES. Defaults to "Monthly".
+        key (str | None, optional): Only total this category (expenses) or
+            source (incomes). Defaults to None.
+        max_points (int | None, optional): Maximum number of buckets. Defaults
+            to None (no limit).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The first day of each bucket
+        (datetime64[D]; the first and last buckets may extend past the range)
+        and the total of each in cents, 0 for empty ones.
+    """
+    first = np.datetime64(start, "D")
+    last = np.datetime64(end, "D")
+    empty = (np.empty(0, np.int64), np.zeros(1, np.int64))
+    days, sums = load_date_index(filename).get(key, empty)
+    lo = np.searchsorted(days, first.astype(np.int64), "left")
+    hi = max(lo, np.searchsorted(days, last.astype(np.int64), "right"))
+    amounts = np.diff(sums[lo : hi + 1])
+    days = days[lo:hi].astype("datetime64[D]")
+
+    step = GRANULARITIES[granularity]
+    if step is None:
+        origin = first.astype("datetime64[M]")
+        units = (days.astype("datetime64[M]") - origin).astype(np.int64)
+        count = int((last.astype("datetime64[M]") - origin).astype(np.int64)) + 1
+    else:
+        # 1970-01-01, day 0, was a Thursday
+        origin = first - (first.astype(np.int64) + 3) % 7 if step == 7 else first
+        units = (days - origin).astype(np.int64) // step
+        count = int((last - origin).astype(np.int64)) // step + 1
+
+    width = -(-count // max_points) if max_points else 1
+    totals = np.bincount(units // width, weights=amounts, minlength=-(-count // width))
+    offsets = np.arange(0, count, width)
+    if step is None:
+        starts = (origin + offsets).astype("datetime64[D]")
+    else:
+        starts = origin + offsets * step
+    return starts, np.rint(totals).astype(np.int64)
@@ -0,0 +1,107 @@
+import os
+
+from utils import codec_utils, money_utils, partition_utils, recurring_utils
+from utils.journal_utils import apply_journal
+from utils.jsonstore_utils import read_store, recover_store
+from utils.storage_utils import (
+    get_json_path,
+    get_manifest_path,
+    get_redo_log_path,
+    store_lock,
+    write_file,
+)
+
+
+def migrate_single_file_store(filename: str) -> bool:
+    """
+    Split a record store kept as a single JSON file (plus its journal) into
+    year partitions, converting its dollar amounts to cents. The original file
+    is kept with a .bak suffix.
+
+    Returns:
+        bool: Whether the store was split.
+    """
+    legacy_path = get_json_path(filename)
+    if not os.path.exists(legacy_path) or os.path.exists(get_manifest_path(filename)):
+        return False
+
+    data = codec_utils.load(legacy_path)
+    legacy_journal_path = os.path.splitext(legacy_path)[0] + ".journal"
+    if os.path.exists(legacy_journal_path):
+        with open(legacy_journal_path, "rb") as f:
+            entries = [codec_utils.loads(line) for line in f if line.strip()]
+        data = apply_journal(data, entries)
+    data = {"next_id": data["next_id"], "records": _to_cents(data["records"])}
+
+    with store_lock():
+        partition_utils.write_partitions(filename, data)
+    os.replace(legacy_path, legacy_path + ".bak")
+    if os.path.exists(legacy_journal_path):
+        os.remove(legacy_journal_path)
+    return True
+
+
+def _to_cents(records: list[dict]) -> list[dict]:
+    """Copy records with their dollar amounts converted to cents."""
+    return [{**r, "amount": money_utils.to_cents(r["amount"])} for r in records]
+
+
+def migrate_amounts_to_cents(filename: str) -> bool:
+    """
+    Convert a record store whose amounts are still float dollars to integer
+    cents. The conversion is committed through the redo log, so a crash
+    midway is completed on the next start rather than converting twice.
+
+    Returns:
+        bool: Whether the store was converted.
+    """
+    with store_lock():
+        recover_store()
+        path = get_manifest_path(filename)
+        if not os.path.exists(path) or partition_utils.read_manifest(filename).get(
+            "amounts"
+        ):
+            return False
+        data = read_store(filename)
+        data = {"next_id": data["next_id"], "records": _to_cents(data["records"])}
+        write_file(
+            get_redo_log_path(),
+            {"ops": [{"file": filename, "op": "write", "data": data}]},
+        )
+        recover_store()
+    return True
+
+
+def fold_recurring_ops(data: dict) -> list[dict]:
+    """
+    Operations folding the recurring series of the expenses stored as one
+    record per occurrence into rules of the recurring.json registry (see
+    recurring_utils.fold_series).
+    """
+    rules, folded = recurring_utils.fold_series(data["records"])
+    ops = [{"file": "recurring.json", "op": "write", "data": rules}]
+    if folded:
+        records = [r for r in data["records"] if r["id"] not in folded]
+        data = {"next_id": data["next_id"], "records": records}
+        ops.append({"file": "expenses.json", "op": "write", "data": data})
+    return ops
+
+
+def migrate_recurring_series() -> bool:
+    """
+    Fold the expanded recurring series of the JSON expenses into rules. Runs
+    once, before recurring.json exists, and is committed through the redo log.
+
+    Returns:
+        bool: Whether the series were folded.
+    """
+    with store_lock():
+        recover_store()
+        if os.path.exists(get_json_path("recurring.json")) or not os.path.exists(
+            get_manifest_path("expenses.json")
+        ):
+            return False
+        ops = fold_recurring_ops(read_store("expenses.json"))
+        write_file(get_redo_log_path(), {"ops": ops})
+        recover_store()
+    return True
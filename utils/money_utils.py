@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+
+def to_cents(amount: float) -> int:
+    """
+    Convert a dollar amount to integer cents.
+
+    Amounts are stored and summed as whole cents, so totals are exact instead
+    of accumulating binary floating-point error.
+
+    Args:
+        amount (float): Amount in dollars, e.g. as entered in a form.
+
+    Returns:
+        int: The amount in cents, rounded to the nearest cent.
+    """
+    return round(float(amount) * 100)
+
+
+def to_dollars(cents: int | np.ndarray | pd.Series) -> float | np.ndarray | pd.Series:
+    """
+    Convert integer cents to dollars, for display only.
+
+    Args:
+        cents (int | np.ndarray | pd.Series): Amount(s) in cents.
+
+    Returns:
+        float | np.ndarray | pd.Series: The amount(s) in dollars.
+    """
+    if isinstance(cents, (int, np.integer)):
+        return int(cents) / 100
+    return cents / 100
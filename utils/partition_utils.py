@@ -0,0 +1,181 @@
+import os
+import shutil
+from collections.abc import Callable
+
+import pandas as pd
+
+from utils import codec_utils, columnar_utils, stream_utils
+from utils.storage_utils import (
+    AMOUNT_UNIT,
+    CATEGORICAL_FIELDS,
+    DICTIONARY_FIELDS,
+    RECORD_FIELDS,
+    file_stamp,
+    get_columns_path,
+    get_manifest_path,
+    get_partition_path,
+    typed_frame,
+    write_file,
+)
+
+# Keep a memory-mapped columnar copy of each year partition for DataFrame reads
+COLUMNAR_SNAPSHOTS = os.getenv("FINANCE_COLUMNAR_SNAPSHOTS", "0") == "1"
+
+# Parsed year partitions: path -> ((mtime, size, inode), records)
+_partition_cache: dict[str, tuple[tuple, list]] = {}
+
+# Year partitions as typed DataFrames: path -> ((mtime, size, inode), DataFrame)
+_partition_frame_cache: dict[str, tuple[tuple, pd.DataFrame]] = {}
+
+
+def clear_partition_cache() -> None:
+    """Drop every parsed year partition."""
+    _partition_cache.clear()
+    _partition_frame_cache.clear()
+
+
+def read_manifest(filename: str) -> dict:
+    """
+    Read the manifest of a record store: its next id, partition years and
+    amount unit.
+    """
+    path = get_manifest_path(filename)
+    if not os.path.exists(path):
+        return {"next_id": 1, "years": [], "amounts": AMOUNT_UNIT}
+    return codec_utils.load(path)
+
+
+def read_partition(filename: str, year: str) -> list[dict]:
+    """Read the records of one year partition, reusing the parse if unchanged."""
+    path = get_partition_path(filename, year)
+    stamp = file_stamp(path)
+    if stamp is None:
+        return []
+    cached = _partition_cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    records = codec_utils.decode_records(codec_utils.load(path))
+    _partition_cache[path] = (stamp, records)
+    return records
+
+
+def concat_frames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate typed frames. Their Categoricals are first given the union of
+    their categories, which only remaps codes, since concatenating
+    Categoricals with different categories would decode them to strings.
+    """
+    for field in CATEGORICAL_FIELDS:
+        if field in frames[0]:
+            categories = list(
+                dict.fromkeys(c for df in frames for c in df[field].cat.categories)
+            )
+            frames = [
+                df.assign(**{field: df[field].cat.set_categories(categories)})
+                for df in frames
+            ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _write_partition_columns(filename: str, year: str, records: list[dict]) -> None:
+    """Build the columnar snapshot of a year partition, dropping stale ones."""
+    stamp = file_stamp(get_partition_path(filename, year))
+    path = get_columns_path(filename, year, stamp)
+    columnar_utils.write_columns(path, records, RECORD_FIELDS[filename])
+
+    columns_dir = os.path.dirname(path)
+    for name in os.listdir(columns_dir):
+        if name.startswith(f"{year}-") and name != os.path.basename(path):
+            shutil.rmtree(os.path.join(columns_dir, name), ignore_errors=True)
+
+
+def read_partition_frame(filename: str, year: str) -> pd.DataFrame:
+    """
+    Read one year partition as a typed DataFrame.
+
+    The frame is reused while the partition file is unchanged. With
+    COLUMNAR_SNAPSHOTS, the memory-mapped snapshot matching the partition is
+    used instead, and built first if it doesn't exist yet.
+    """
+    path = get_partition_path(filename, year)
+    stamp = file_stamp(path)
+    if stamp is None:
+        return typed_frame(filename, [])
+    if not COLUMNAR_SNAPSHOTS:
+        cached = _partition_frame_cache.get(path)
+        if cached is None or cached[0] != stamp:
+            parsed = _partition_cache.get(path)
+            if parsed is not None and parsed[0] == stamp:
+                df = typed_frame(filename, parsed[1])
+            else:
+                # Straight from the stored rows, without making records of
+                # them, and Categoricals straight from the dictionary codes
+                data = codec_utils.load(path)
+                rows = codec_utils.decode_frame(
+                    data, CATEGORICAL_FIELDS, columnar_utils.NUMERIC_FIELDS
+                )
+                df = typed_frame(filename, rows)
+            cached = (stamp, df)
+            _partition_frame_cache[path] = cached
+        return cached[1]
+
+    path = get_columns_path(filename, year, stamp)
+    fields = RECORD_FIELDS[filename]
+    df = columnar_utils.read_columns(path, fields, CATEGORICAL_FIELDS)
+    if df is None:
+        _write_partition_columns(filename, year, read_partition(filename, year))
+        df = columnar_utils.read_columns(path, fields, CATEGORICAL_FIELDS)
+    return df
+
+
+def scan_partition(
+    filename: str, year: str, predicate: Callable[[dict], bool]
+) -> list[dict]:
+    """
+    Get the records of one year partition that match a predicate.
+
+    A partition already parsed is filtered in memory; otherwise the file is
+    streamed, so only the matching records are materialized.
+    """
+    path = get_partition_path(filename, year)
+    stamp = file_stamp(path)
+    if stamp is None:
+        return []
+    cached = _partition_cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return [r for r in cached[1] if predicate(r)]
+    return list(stream_utils.iter_records(path, predicate))
+
+
+def write_partitions(filename: str, data: dict) -> None:
+    """
+    Write the full state of a record store to its year partitions.
+
+    Only partitions whose records changed are rewritten, as compact rows of
+    RECORD_FIELDS values with the DICTIONARY_FIELDS dictionary-encoded (see
+    codec_utils.encode_records). The manifest is
+    written last, so readers never see a manifest listing partitions that
+    don't hold the state it describes yet.
+    """
+    by_year: dict[str, list] = {}
+    for record in data["records"]:
+        by_year.setdefault(record["date"][:4], []).append(record)
+
+    manifest = read_manifest(filename)
+    for year, records in by_year.items():
+        if year not in manifest["years"] or read_partition(filename, year) != records:
+            write_file(
+                get_partition_path(filename, year),
+                codec_utils.encode_records(
+                    records, RECORD_FIELDS[filename], DICTIONARY_FIELDS[filename]
+                ),
+            )
+            if COLUMNAR_SNAPSHOTS:
+                _write_partition_columns(filename, year, records)
+    for year in set(manifest["years"]) - set(by_year):
+        os.remove(get_partition_path(filename, year))
+
+    write_file(
+        get_manifest_path(filename),
+        {"next_id": data["next_id"], "years": sorted(by_year), "amounts": AMOUNT_UNIT},
+    )
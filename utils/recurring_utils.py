@@ -0,0 +1,212 @@
+import numpy as np
+import pandas as pd
+
+# Frequency -> (step, unit) between occurrences: a number of days or months
+FREQUENCIES = {
+    "Weekly": (7, "D"),
+    "Biweekly": (14, "D"),
+    "Monthly": (1, "M"),
+    "Quarterly": (3, "M"),
+    "Yearly": (12, "M"),
+}
+
+# Id of materialized occurrences, which have no stored record
+OCCURRENCE_ID = -1
+
+
+def prefix_range(date_prefix: str | None) -> tuple[np.datetime64, np.datetime64] | None:
+    """
+    Get the first and last day covered by a date prefix.
+
+    Args:
+        date_prefix (str | None): "YYYY", "YYYY-MM" or "YYYY-MM-DD".
+
+    Returns:
+        tuple[np.datetime64, np.datetime64] | None: The days, or None without
+        a prefix.
+    """
+    if not date_prefix:
+        return None
+    period = np.datetime64(date_prefix)
+    return period.astype("datetime64[D]"), (period + 1).astype("datetime64[D]") - 1
+
+
+def schedule(
+    rules: list[dict],
+    start: np.datetime64 | None = None,
+    end: np.datetime64 | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Generate the occurrences of recurring expense rules from start to end
+    (inclusive), all rules at once.
+
+    The occurrence numbers falling in the range are computed from each rule's
+    frequency and laid out as a single array, then turned into dates in one
+    pass: days are added to weekly and biweekly rules, months to the others,
+    with their day clamped to the end of shorter months (a rule starting on
+    January 31 falls on February 28 or 29, then on March 31). No occurrence
+    outside the range is generated, whatever the length of the series.
+
+    Args:
+        rules (list[dict]): Recurring expense rules.
+        start (np.datetime64 | None, optional): First day. Defaults to None.
+        end (np.datetime64 | None, optional): Last day. Defaults to None.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The index in rules of each occurrence
+        and its datetime64[D] date, sorted by rule then date, without the
+        skipped dates.
+    """
+    first = np.array([r["start_date"] for r in rules], dtype="datetime64[D]")
+    last = np.array([r["end_date"] for r in rules], dtype="datetime64[D]")
+    lo = first if start is None else np.maximum(first, start)
+    hi = last if end is None else np.minimum(last, end)
+    step = np.array([FREQUENCIES[r["frequency"]][0] for r in rules], dtype=np.int64)
+    monthly = np.array([FREQUENCIES[r["frequency"]][1] == "M" for r in rules], bool)
+
+    # Range of occurrence numbers k per rule. Clamped month days may fall
+    # before the range, so monthly rules start a step early.
+    first_month = first.astype("datetime64[M]")
+    k_lo = np.where(
+        monthly,
+        np.maximum(
+            (lo.astype("datetime64[M]") - first_month).astype(np.int64) // step - 1, 0
+        ),
+        -((first - lo).astype(np.int64) // step),
+    )
+    k_hi = np.where(
+        monthly,
+        (hi.astype("datetime64[M]") - first_month).astype(np.int64) // step,
+        (hi - first).astype(np.int64) // step,
+    )
+    counts = np.where(hi >= lo, np.maximum(k_hi - k_lo + 1, 0), 0)
+
+    # k_lo[i], k_lo[i] + 1, ..., k_hi[i] for every rule i, as one array
+    index = np.repeat(np.arange(len(rules)), counts)
+    offsets = np.cumsum(counts) - counts
+    k = np.arange(counts.sum()) - np.repeat(offsets - k_lo, counts)
+
+    steps = k * step[index]
+    months = first_month[index] + steps
+    month_starts = months.astype("datetime64[D]")
+    month_lengths = ((months + 1).astype("datetime64[D]") - month_starts).astype(
+        np.int64
+    )
+    day = (first - first_month.astype("datetime64[D]")).astype(np.int64)[index]
+    dates = np.where(
+        monthly[index],
+        month_starts + np.minimum(day, month_lengths - 1),
+        first[index] + steps,
+    )
+
+    keep = (dates >= lo[index]) & (dates <= hi[index])
+    skipped = [(i, d) for i, r in enumerate(rules) for d in r.get("skipped") or ()]
+    if skipped:
+        # (rule, day) pairs as single integers, to test them all at once
+        span = np.int64(1 << 32)
+        skipped_index, skipped_dates = zip(*skipped)
+        skipped_keys = np.array(skipped_index) * span + np.array(
+            skipped_dates, dtype="datetime64[D]"
+        ).astype(np.int64)
+        keys = index * span + dates.astype(np.int64)
+        keep &= ~np.isin(keys, skipped_keys)
+    return index[keep], dates[keep]
+
+
+def occurrence_dates(
+    rule: dict, start: np.datetime64 | None = None, end: np.datetime64 | None = None
+) -> np.ndarray:
+    """
+    Generate the dates of a rule's occurrences from start to end (inclusive).
+
+    Args:
+        rule (dict): Recurring expense rule.
+        start (np.datetime64 | None, optional): First day. Defaults to None.
+        end (np.datetime64 | None, optional): Last day. Defaults to None.
+
+    Returns:
+        np.ndarray: Sorted datetime64[D] dates, without the skipped ones.
+    """
+    return schedule([rule], start, end)[1]
+
+
+def materialize(
+    rules: list[dict],
+    date_prefix: str | None = None,
+    category: str | None = None,
+) -> pd.DataFrame:
+    """
+    Generate the occurrences of recurring expense rules as expense records.
+
+    Args:
+        rules (list[dict]): Rules of the recurring.json registry.
+        date_prefix (str | None, optional): Only generate dates starting with
+            this prefix (e.g. "2025" or "2025-03"). Defaults to None.
+        category (str | None, optional): Only generate this category.
+            Defaults to None.
+
+    Returns:
+        pd.DataFrame: The expense fields, "date" as datetime64, with id
+        OCCURRENCE_ID since occurrences have no stored record.
+    """
+    rules = [r for r in rules if category is None or r["category"] == category]
+    index, dates = schedule(rules, *(prefix_range(date_prefix) or (None, None)))
+    columns = {
+        "id": np.full(len(index), OCCURRENCE_ID, dtype=np.int64),
+        "amount": np.array([r["amount"] for r in rules], dtype=np.int64)[index],
+    }
+    for field in ("category", "notes", "frequency", "recurring_id"):
+        columns[field] = np.array([r[field] for r in rules], dtype=object)[index]
+    columns["date"] = dates.astype("datetime64[s]")
+    return pd.DataFrame(columns)[
+        ["id", "amount", "category", "date", "notes", "frequency", "recurring_id"]
+    ]
+
+
+def fold_series(records: list[dict]) -> tuple[list[dict], set[int]]:
+    """
+    Turn recurring series stored as one expense per occurrence into rules.
+
+    A series is folded when its expenses share their amount, category and
+    notes and their dates follow the schedule of its frequency from the first
+    to the last one; missing occurrences are recorded as skipped. Other series
+    are left as they are.
+
+    Args:
+        records (list[dict]): Expense records.
+
+    Returns:
+        tuple[list[dict], set[int]]: The rules, and the ids of the expenses
+        they replace.
+    """
+    series: dict[str, list[dict]] = {}
+    for record in records:
+        if record.get("recurring_id"):
+            series.setdefault(record["recurring_id"], []).append(record)
+
+    rules, folded = [], set()
+    for recurring_id, group in series.items():
+        first = group[0]
+        shared = (first["amount"], first["category"], first.get("notes"))
+        if first.get("frequency") not in FREQUENCIES or any(
+            (r["amount"], r["category"], r.get("notes")) != shared for r in group
+        ):
+            continue
+        dates = np.array(sorted(r["date"] for r in group), dtype="datetime64[D]")
+        rule = {
+            "recurring_id": recurring_id,
+            "amount": first["amount"],
+            "category": first["category"],
+            "notes": first.get("notes"),
+            "frequency": first["frequency"],
+            "start_date": str(dates[0]),
+            "end_date": str(dates[-1]),
+            "skipped": [],
+        }
+        schedule = occurrence_dates(rule)
+        if len(np.unique(dates)) != len(dates) or not np.isin(dates, schedule).all():
+            continue
+        rule["skipped"] = [str(d) for d in np.setdiff1d(schedule, dates)]
+        rules.append(rule)
+        folded.update(r["id"] for r in group)
+    return rules, folded
@@ -0,0 +1,222 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from resources.constants import CATEGORY_COLORS
+
+# Name of the node small flows are collapsed into
+OTHER = "Other"
+
+# Colors of the flows, and of the categories without one in CATEGORY_COLORS
+INCOME_COLOR = "#2E7D32"
+TOTAL_INCOME_COLOR = "#1B5E20"
+INCOME_LINK_COLOR = "#4CAF50"
+EXPENSES_COLOR = "#808080"
+SAVINGS_COLOR = "#1976D2"
+OTHER_COLOR = "#888888"
+PALETTE = px.colors.qualitative.Plotly
+
+HOVER_TEMPLATE = (
+    "<b>%{customdata[0]}</b><br>"
+    "Amount: $%{customdata[1]:,.2f}<br>"
+    "% of Total: %{customdata[2]:.1f}%"
+    "<extra></extra>"
+)
+
+
+def category_color(category: str) -> str:
+    """
+    Get the color of a category: its CATEGORY_COLORS entry, or one picked
+    from PALETTE by a stable hash of its name for user-added categories.
+    """
+    if category in CATEGORY_COLORS:
+        return CATEGORY_COLORS[category]
+    if category == OTHER:
+        return OTHER_COLOR
+    return PALETTE[zlib.crc32(category.encode()) % len(PALETTE)]
+
+
+def hex_to_rgba(hex_colors: np.ndarray, alpha: float = 0.6) -> np.ndarray:
+    """Convert "#rrggbb" colors to translucent "rgba(r, g, b, alpha)" ones."""
+    unique, inverse = np.unique(hex_colors, return_inverse=True)
+    rgba = [
+        f"rgba({int(c[1:3], 16)}, {int(c[3:5], 16)}, {int(c[5:7], 16)}, {alpha})"
+        for c in unique
+    ]
+    return np.array(rgba, dtype=object)[inverse]
+
+
+def collapse_small(amounts: pd.Series, other_share: float) -> pd.Series:
+    """
+    Sum the flows below other_share of the total into a single OTHER flow,
+    when there are at least two of them.
+
+    Args:
+        amounts (pd.Series): Amounts indexed by category or source.
+        other_share (float): Share of the total (e.g. 0.02 for 2%).
+
+    Returns:
+        pd.Series: The amounts, with OTHER last if any flow was collapsed.
+    """
+    small = amounts.to_numpy() < other_share * amounts.sum()
+    if small.sum() < 2:
+        return amounts
+    collapsed = pd.concat(
+        [amounts[~small], pd.Series([amounts[small].sum()], index=[OTHER])]
+    )
+    # A category may already be called OTHER
+    return collapsed.groupby(level=0, sort=False).sum()
+
+
+def build_sankey(
+    income_by_source: pd.Series,
+    expense_by_category: pd.Series,
+    other_share: float = 0.0,
+) -> go.Figure:
+    """
+    Build the Sankey diagram of the financial flow: income sources → total
+    income → expenses and savings → expense categories.
+
+    The nodes are laid out as arrays, one block per tier, each node with the
+    index of its parent; the links are then the nodes that have one, so no
+    link is built or looked up one by one. With other_share, sources and
+    categories below that share of their total are collapsed into an OTHER
+    node, which keeps the figure small with many of them.
+
+    Args:
+        income_by_source (pd.Series): Income in dollars per source; without
+            income, the diagram starts at the expenses.
+        expense_by_category (pd.Series): Expense in dollars per category,
+            in display order.
+        other_share (float, optional): Share of the total below which flows
+            are collapsed. Defaults to 0.0 (never).
+
+    Returns:
+        go.Figure: The Sankey diagram.
+    """
+    if other_share > 0:
+        income_by_source = collapse_small(income_by_source, other_share)
+        expense_by_category = collapse_small(expense_by_category, other_share)
+    total_expense = expense_by_category.sum()
+    total_income = income_by_source.sum()
+    has_income = len(income_by_source) > 0 and total_income > 0
+
+    # One row per node: name (in the hover), label, amount, % of its total,
+    # label suffix, parent node, name of the link from it, and color
+    categories = pd.DataFrame(
+        {
+            "name": expense_by_category.index.astype(str),
+            "amount": expense_by_category.to_numpy(dtype=float),
+            "pct": (
+                expense_by_category.to_numpy(dtype=float) / total_expense * 100
+            ).round(2),
+            "color": [category_color(c) for c in expense_by_category.index],
+        }
+    )
+    categories["label"] = categories["link"] = categories["name"]
+    categories["suffix"] = categories["pct"].map(" ({:.1f}%)".format)
+    categories["link_color"] = categories["color"]
+    categories["parent"] = len(income_by_source) + 1 if has_income else 0
+    if has_income:
+        total_savings = total_income - total_expense
+        sources = pd.DataFrame(
+            {
+                "name": income_by_source.index.astype(str),
+                "amount": income_by_source.to_numpy(dtype=float),
+                "pct": income_by_source.to_numpy(dtype=float) / total_income * 100,
+                "color": INCOME_COLOR,
+                "link_color": INCOME_LINK_COLOR,
+                "parent": len(income_by_source),
+            }
+        )
+        sources["label"] = sources["link"] = sources["name"]
+        flows = [
+            {
+                "name": "Total Income",
+                "amount": total_income,
+                "pct": 100.0,
+                "color": TOTAL_INCOME_COLOR,
+                "parent": -1,
+            },
+            {
+                "name": "Total Expenses",
+                "label": "Expenses",
+                "link": "Expenses",
+                "amount": total_expense,
+                "pct": total_expense / total_income * 100,
+                "color": EXPENSES_COLOR,
+                "parent": len(sources),
+            },
+        ]
+        if total_savings > 0:
+            savings_pct = total_savings / total_income * 100
+            flows.append(
+                {
+                    "name": "Savings",
+                    "amount": total_savings,
+                    "pct": savings_pct,
+                    "suffix": f" ({savings_pct:.1f}%)",
+                    "color": SAVINGS_COLOR,
+                    "parent": len(sources),
+                }
+            )
+    else:
+        sources = None
+        flows = [
+            {
+                "name": "Total Expenses",
+                "label": "Expenses",
+                "amount": total_expense,
+                "pct": 100.0,
+                "color": EXPENSES_COLOR,
+                "parent": -1,
+            }
+        ]
+    nodes = pd.concat([sources, pd.DataFrame(flows), categories], ignore_index=True)
+    # The flow nodes only set the columns that differ from their name/color
+    nodes["label"] = nodes["label"].fillna(nodes["name"])
+    nodes["link"] = nodes["link"].fillna(nodes["name"])
+    nodes["link_color"] = nodes["link_color"].fillna(nodes["color"])
+    nodes["suffix"] = nodes["suffix"].fillna("")
+    labels = (
+        nodes["label"]
+        + "<br>$"
+        + nodes["amount"].map("{:,.2f}".format)
+        + nodes["suffix"]
+    )
+
+    # One link into every node with a parent, i.e. all but the first flow node
+    links = nodes[nodes["parent"] >= 0]
+
+    figure = go.Figure(
+        data=[
+            go.Sankey(
+                node={
+                    "pad": 20,
+                    "thickness": 30,
+                    "line": {"color": "white", "width": 1},
+                    "label": labels.to_numpy(),
+                    "color": nodes["color"].to_numpy(),
+                    "customdata": nodes[["name", "amount", "pct"]].to_numpy(),
+                    "hovertemplate": HOVER_TEMPLATE,
+                },
+                link={
+                    "source": links["parent"].to_numpy(),
+                    "target": links.index.to_numpy(),
+                    "value": links["amount"].to_numpy(),
+                    "color": hex_to_rgba(links["link_color"].to_numpy()),
+                    "customdata": links[["link", "amount", "pct"]].to_numpy(),
+                    "hovertemplate": HOVER_TEMPLATE,
+                },
+            )
+        ]
+    )
+    figure.update_layout(
+        title="Financial Flow: Income → Expenses → Categories",
+        font={"size": 12},
+        height=500,
+    )
+    return figure
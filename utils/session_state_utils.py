@@ -11,7 +11,7 @@ def init_expense_session_state():
     if "expenses" not in st.session_state:
         st.session_state.expenses = []
     if "categories" not in st.session_state:
-        st.session_state.categories = read_json("categories.json")
+        st.session_state.categories = list(read_json("categories.json"))
 
 
 def init_income_session_state():
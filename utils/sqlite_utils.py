@@ -0,0 +1,541 @@
+import json
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from utils import cache_utils, jsonstore_utils, storage_utils
+from utils.cube_utils import CUBE_KEYS
+from utils.migration_utils import fold_recurring_ops
+from utils.storage_utils import DEFAULTS, get_data_dir, typed_frame
+
+DB_FILENAME = "finance_tracker.db"
+
+# Data file name -> (table, columns). The first column is the primary key.
+TABLES = {
+    "expenses.json": (
+        "expenses",
+        ["id", "amount", "category", "date", "notes", "frequency", "recurring_id"],
+    ),
+    "incomes.json": ("incomes", ["id", "amount", "date", "source"]),
+    "categories.json": ("categories", ["position", "name"]),
+    "recurring.json": (
+        "recurring",
+        [
+            "recurring_id",
+            "amount",
+            "category",
+            "notes",
+            "frequency",
+            "start_date",
+            "end_date",
+            "skipped",
+        ],
+    ),
+}
+
+# Amounts are stored as integer cents (see money_utils)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS expenses (
+    id INTEGER PRIMARY KEY,
+    amount INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    date TEXT NOT NULL,
+    notes TEXT,
+    frequency TEXT,
+    recurring_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (date);
+CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses (category, date);
+CREATE INDEX IF NOT EXISTS idx_expenses_recurring_id ON expenses (recurring_id);
+
+CREATE TABLE IF NOT EXISTS incomes (
+    id INTEGER PRIMARY KEY,
+    amount INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_incomes_date ON incomes (date);
+
+CREATE TABLE IF NOT EXISTS categories (
+    position INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+
+-- skipped: JSON list of the dates of deleted occurrences
+CREATE TABLE IF NOT EXISTS recurring (
+    recurring_id TEXT PRIMARY KEY,
+    amount INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    notes TEXT,
+    frequency TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    skipped TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Year x month x key aggregate tables, kept current by triggers: each row
+# change adjusts a single cell instead of rescanning the table
+CUBE_TABLES = {"expenses.json": "expenses_cube", "incomes.json": "incomes_cube"}
+
+CUBE_SCHEMA_TEMPLATE = """
+CREATE TABLE IF NOT EXISTS {cube} (
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    {key} TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (year, month, {key})
+);
+CREATE TRIGGER IF NOT EXISTS {cube}_insert AFTER INSERT ON {table} BEGIN
+    INSERT INTO {cube} VALUES (
+        CAST(substr(NEW.date, 1, 4) AS INTEGER),
+        CAST(substr(NEW.date, 6, 2) AS INTEGER),
+        COALESCE(NEW.{key}, ''), NEW.amount, 1
+    )
+    ON CONFLICT (year, month, {key}) DO UPDATE
+    SET amount = amount + excluded.amount, count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS {cube}_delete AFTER DELETE ON {table} BEGIN
+    UPDATE {cube} SET amount = amount - OLD.amount, count = count - 1
+    WHERE year = CAST(substr(OLD.date, 1, 4) AS INTEGER)
+    AND month = CAST(substr(OLD.date, 6, 2) AS INTEGER)
+    AND {key} = COALESCE(OLD.{key}, '');
+    DELETE FROM {cube} WHERE count <= 0;
+END;
+CREATE TRIGGER IF NOT EXISTS {cube}_update AFTER UPDATE ON {table} BEGIN
+    UPDATE {cube} SET amount = amount - OLD.amount, count = count - 1
+    WHERE year = CAST(substr(OLD.date, 1, 4) AS INTEGER)
+    AND month = CAST(substr(OLD.date, 6, 2) AS INTEGER)
+    AND {key} = COALESCE(OLD.{key}, '');
+    DELETE FROM {cube} WHERE count <= 0;
+    INSERT INTO {cube} VALUES (
+        CAST(substr(NEW.date, 1, 4) AS INTEGER),
+        CAST(substr(NEW.date, 6, 2) AS INTEGER),
+        COALESCE(NEW.{key}, ''), NEW.amount, 1
+    )
+    ON CONFLICT (year, month, {key}) DO UPDATE
+    SET amount = amount + excluded.amount, count = count + 1;
+END;
+"""
+
+
+def _create_cube(conn: sqlite3.Connection, filename: str, key: str) -> None:
+    """Create a cube table and its triggers, filling it from existing rows."""
+    table, _ = TABLES[filename]
+    cube = CUBE_TABLES[filename]
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (cube,)
+    ).fetchone()
+    with conn:
+        conn.executescript(CUBE_SCHEMA_TEMPLATE.format(cube=cube, table=table, key=key))
+        if not exists:
+            conn.execute(
+                f"INSERT INTO {cube} SELECT CAST(substr(date, 1, 4) AS INTEGER), "
+                f"CAST(substr(date, 6, 2) AS INTEGER), COALESCE({key}, ''), "
+                f"SUM(amount), COUNT(*) FROM {table} GROUP BY 1, 2, 3"
+            )
+
+
+def _migrate_amounts_to_cents(conn: sqlite3.Connection) -> None:
+    """
+    Rebuild the record tables of a database created when amounts were REAL
+    dollars, with INTEGER cents. Their cubes are dropped, to be recreated
+    from the converted rows.
+    """
+
+    def stores_in_dollars() -> list[str]:
+        return [
+            filename
+            for filename in CUBE_TABLES
+            if conn.execute(
+                "SELECT type FROM pragma_table_info(?) WHERE name = 'amount'",
+                (TABLES[filename][0],),
+            ).fetchone()[0]
+            == "REAL"
+        ]
+
+    if not stores_in_dollars():
+        return
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        # Another connection may have converted them meanwhile
+        for filename in stores_in_dollars():
+            table, columns = TABLES[filename]
+            cube = CUBE_TABLES[filename]
+            for trigger in ("insert", "delete", "update"):
+                conn.execute(f"DROP TRIGGER IF EXISTS {cube}_{trigger}")
+            conn.execute(f"DROP TABLE IF EXISTS {cube}")
+            # The indexes move along with the renamed table; drop them so
+            # that SCHEMA creates them on the new one
+            conn.execute(f"ALTER TABLE {table} RENAME TO {table}_dollars")
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' "
+                "AND tbl_name = ? AND sql IS NOT NULL",
+                (f"{table}_dollars",),
+            ).fetchall():
+                conn.execute(f"DROP INDEX {row['name']}")
+            # SCHEMA has no triggers, so it splits into statements on ";"
+            # (executescript would commit the transaction)
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            values = [
+                "CAST(ROUND(amount * 100) AS INTEGER)" if c == "amount" else c
+                for c in columns
+            ]
+            conn.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"SELECT {', '.join(values)} FROM {table}_dollars"
+            )
+            conn.execute(f"DROP TABLE {table}_dollars")
+            _bump_version(conn, table)
+
+
+# storage_utils.DURABILITY -> PRAGMA synchronous. In WAL mode NORMAL only syncs
+# at checkpoints, so a crash may roll back the latest commits.
+SYNCHRONOUS = {"none": "OFF", "commit": "FULL", "batch": "NORMAL"}
+
+_local = threading.local()
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Get this thread's connection to the SQLite database in the data
+    directory, creating the schema on first use.
+
+    Returns:
+        sqlite3.Connection: Connection in WAL mode with dict-like rows.
+    """
+    path = os.path.join(get_data_dir(), DB_FILENAME)
+    conn = getattr(_local, "connections", {}).get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=5.0)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        # INSERT OR REPLACE must fire the delete triggers of the row it replaces
+        conn.execute("PRAGMA recursive_triggers=ON")
+        conn.executescript(SCHEMA)
+        _migrate_amounts_to_cents(conn)
+        for filename, key in CUBE_KEYS.items():
+            _create_cube(conn, filename, key)
+        _local.connections = {**getattr(_local, "connections", {}), path: conn}
+    return conn
+
+
+def _get_meta(conn: sqlite3.Connection, key: str, default: int = 0) -> int:
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else default
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value: int) -> None:
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, ?) "
+        "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+        (key, value),
+    )
+
+
+def _bump_version(conn: sqlite3.Connection, table: str) -> None:
+    _set_meta(conn, f"version:{table}", _get_meta(conn, f"version:{table}") + 1)
+
+
+def get_store_version(filename: str) -> tuple:
+    """
+    Get a stamp identifying the state of a table: its write counter, bumped
+    by every committed change.
+    """
+    table, _ = TABLES[filename]
+    return ("sqlite", _get_meta(get_connection(), f"version:{table}"))
+
+
+def _insert_records(conn: sqlite3.Connection, filename: str, records: list) -> None:
+    table, columns = TABLES[filename]
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)})",
+        [tuple(r.get(c) for c in columns) for r in records],
+    )
+    if records:
+        next_id = max(
+            _get_meta(conn, f"next_id:{table}", 1),
+            max(r["id"] for r in records) + 1,
+        )
+        _set_meta(conn, f"next_id:{table}", next_id)
+
+
+def read_store(filename: str, year: str | None = None) -> dict | list:
+    """
+    Read a whole table in the shape of its JSON data file.
+
+    Returns:
+        dict | list: {"next_id", "records"} for record stores, the list of
+        category names, or the list of recurring expense rules. With a year,
+        the records of a record store dated in that year.
+    """
+    if year is not None:
+        return query_store(filename, year)
+    conn = get_connection()
+    table, columns = TABLES[filename]
+    if filename == "categories.json":
+        return [
+            row["name"]
+            for row in conn.execute(f"SELECT name FROM {table} ORDER BY position")
+        ]
+    if filename == "recurring.json":
+        rows = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid")
+        return [dict(row, skipped=json.loads(row["skipped"])) for row in rows]
+
+    records = [
+        dict(row)
+        for row in conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id")
+    ]
+    return {"next_id": _get_meta(conn, f"next_id:{table}", 1), "records": records}
+
+
+def get_next_id(filename: str) -> int:
+    """Get the id the next record inserted into a table will get."""
+    table, _ = TABLES[filename]
+    return _get_meta(get_connection(), f"next_id:{table}", 1)
+
+
+def _write(conn: sqlite3.Connection, filename: str, data: dict | list) -> None:
+    table, columns = TABLES[filename]
+    conn.execute(f"DELETE FROM {table}")
+    if filename == "categories.json":
+        conn.executemany(
+            f"INSERT INTO {table} (position, name) VALUES (?, ?)",
+            list(enumerate(data)),
+        )
+    elif filename == "recurring.json":
+        conn.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})",
+            [
+                tuple(
+                    json.dumps(rule.get(c) or []) if c == "skipped" else rule.get(c)
+                    for c in columns
+                )
+                for rule in data
+            ],
+        )
+    else:
+        _set_meta(conn, f"next_id:{table}", data["next_id"])
+        _insert_records(conn, filename, data["records"])
+
+
+def _append(conn: sqlite3.Connection, filename: str, op: str, data: list) -> None:
+    table, _ = TABLES[filename]
+    if op in ("insert", "update"):
+        # Updates replace the whole record, as in the JSON journal
+        _insert_records(conn, filename, data)
+    elif op == "delete":
+        conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(i,) for i in data])
+    else:
+        raise ValueError(f"Unknown journal operation: {op}")
+
+
+def recover_store() -> None:
+    """Nothing to recover: a transaction is either committed or rolled back."""
+
+
+def commit_batch(ops: list[dict]) -> None:
+    """
+    Apply operations to several tables in a single transaction, as
+    storage_utils.DURABILITY says, raising on failure. The cached views of
+    the tables are moved along in memory.
+
+    Args:
+        ops (list[dict]): Operations with a "file", an "op" ("write" to
+            replace a table's content, or "insert"/"update"/"delete") and its
+            "data", as committed by writer_utils.commit_json.
+    """
+    files = list(dict.fromkeys(op["file"] for op in ops))
+    versions = {filename: get_store_version(filename) for filename in files}
+    conn = get_connection()
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS[storage_utils.DURABILITY]}")
+    try:
+        with conn:
+            # Take the write lock up front, so that no other connection can
+            # write between the reads and writes of this transaction
+            conn.execute("BEGIN IMMEDIATE")
+            for op in ops:
+                if op["op"] == "write":
+                    _write(conn, op["file"], op["data"])
+                else:
+                    _append(conn, op["file"], op["op"], op["data"])
+            # One version bump per table and transaction
+            for table in dict.fromkeys(TABLES[filename][0] for filename in files):
+                _bump_version(conn, table)
+    except Exception:
+        for filename in files:
+            cache_utils.drop_cached(filename)
+        raise
+
+    for filename in files:
+        file_ops = [op for op in ops if op["file"] == filename]
+        new_version = get_store_version(filename)
+        if any(op["op"] == "write" for op in file_ops):
+            cache_utils.drop_cached(filename)
+        else:
+            in_sequence = new_version[1] == versions[filename][1] + 1
+            entries = [{"op": op["op"], "data": op["data"]} for op in file_ops]
+            cache_utils.refresh_cached(
+                filename,
+                versions[filename],
+                new_version if in_sequence else None,
+                entries,
+            )
+
+
+def query_store(
+    filename: str,
+    date_prefix: str | None = None,
+    category: str | None = None,
+    ids: list[int] | None = None,
+) -> list[dict]:
+    """
+    Select records of a table, pushing the filters down to its indexes.
+
+    Args:
+        filename (str): Record store to query.
+        date_prefix (str | None): Keep dates starting with this prefix
+            (e.g. "2025" or "2025-03"), evaluated as a range on the date index.
+        category (str | None): Keep only this expense category.
+        ids (list[int] | None): Keep only the records with these ids.
+
+    Returns:
+        list[dict]: Matching records ordered by id.
+    """
+    conn = get_connection()
+    table, columns = TABLES[filename]
+    clauses, params = [], []
+    if date_prefix:
+        # "~" sorts after every character of an ISO date
+        clauses.append("date >= ? AND date < ?")
+        params += [date_prefix, date_prefix + "~"]
+    if category:
+        clauses.append("category = ?")
+        params.append(category)
+    if ids is not None:
+        clauses.append("id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(ids)))
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return [
+        dict(row)
+        for row in conn.execute(
+            f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY id", params
+        )
+    ]
+
+
+def query_frame(
+    filename: str, date_prefix: str | None = None, category: str | None = None
+) -> pd.DataFrame:
+    """Select records of a table as in query_store, as a typed DataFrame."""
+    return typed_frame(filename, query_store(filename, date_prefix, category))
+
+
+def _key_clause(filename: str, value: str) -> tuple[str, list]:
+    """WHERE clause matching a category (expenses) or source (incomes)."""
+    key = CUBE_KEYS[filename]
+    if value:
+        return f"{key} = ?", [value]
+    return f"({key} IS NULL OR {key} = '')", []
+
+
+def query_key_ids(filename: str, value: str) -> list[int]:
+    """
+    Select the ids of the records with a given category or source, off the
+    category index for expenses.
+
+    Returns:
+        list[int]: Record ids in ascending order.
+    """
+    conn = get_connection()
+    table, _ = TABLES[filename]
+    where, params = _key_clause(filename, value)
+    return [
+        row[0]
+        for row in conn.execute(
+            f"SELECT id FROM {table} WHERE {where} ORDER BY id", params
+        )
+    ]
+
+
+def count_key(filename: str, value: str) -> int:
+    """Count the records with a given category or source."""
+    conn = get_connection()
+    table, _ = TABLES[filename]
+    where, params = _key_clause(filename, value)
+    return conn.execute(
+        f"SELECT COUNT(*) FROM {table} WHERE {where}", params
+    ).fetchone()[0]
+
+
+def query_cube(filename: str) -> list[tuple]:
+    """
+    Read the aggregate cube of a record table.
+
+    Returns:
+        list[tuple]: Rows of (year, month, key value, amount sum, count).
+    """
+    conn = get_connection()
+    return [
+        tuple(row)
+        for row in conn.execute(
+            f"SELECT * FROM {CUBE_TABLES[filename]} ORDER BY 1, 2, 3"
+        )
+    ]
+
+
+def query_summary(filename: str) -> dict:
+    """
+    Summarize a record table per year, in the shape of
+    cube_utils.summarize_cube.
+
+    Per-year counts and totals come from the cube table; the first and last
+    dates are read off the date index.
+    """
+    conn = get_connection()
+    table, _ = TABLES[filename]
+    by_year = {
+        str(row[0]): {"count": row[1], "total": row[2]}
+        for row in conn.execute(
+            f"SELECT year, SUM(count), SUM(amount) FROM {CUBE_TABLES[filename]} "
+            "GROUP BY year ORDER BY year"
+        )
+    }
+    min_date = conn.execute(f"SELECT MIN(date) FROM {table}").fetchone()[0]
+    max_date = conn.execute(f"SELECT MAX(date) FROM {table}").fetchone()[0]
+    return {
+        "years": list(by_year),
+        "min_date": min_date,
+        "max_date": max_date,
+        "by_year": by_year,
+    }
+
+
+def init_ops() -> list[dict]:
+    """
+    Operations initializing the database: a new database is seeded from the
+    JSON data files, and one created before the recurring expense registry
+    has the recurring series of its expenses folded into rules.
+    """
+    conn = get_connection()
+    if conn.execute("SELECT COUNT(*) FROM meta").fetchone()[0] == 0:
+        return [
+            {"file": f, "op": "write", "data": jsonstore_utils.read_store(f)}
+            for f in DEFAULTS
+        ]
+    if not get_store_version("recurring.json")[1]:
+        return fold_recurring_ops(read_store("expenses.json"))
+    return []
@@ -0,0 +1,284 @@
+import contextlib
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within a process
+    fcntl = None
+
+import pandas as pd
+import streamlit as st
+
+from utils import codec_utils
+
+DATA_DIR = "./data"
+
+# Storage backend for every data file: "json" (default) or "sqlite"
+STORAGE_BACKEND = os.getenv("FINANCE_STORAGE_BACKEND", "json")
+
+# Record stores, kept as one JSON partition per year plus a manifest, with
+# mutations appended to a journal until they are compacted into the partitions
+JOURNALED_FILES = ("expenses.json", "incomes.json")
+
+# Unit of the record amounts, as noted in the manifests: integer cents. Stores
+# whose manifest doesn't say so still hold float dollars and are converted
+AMOUNT_UNIT = "cents"
+
+# Fields of the records in each record store
+RECORD_FIELDS = {
+    "expenses.json": [
+        "id",
+        "amount",
+        "category",
+        "date",
+        "notes",
+        "frequency",
+        "recurring_id",
+    ],
+    "incomes.json": ["id", "amount", "date", "source"],
+}
+
+# String fields of each record store that repeat a few values, stored
+# dictionary-encoded in the partitions (see codec_utils.encode_records)
+DICTIONARY_FIELDS = {
+    "expenses.json": ["category", "notes", "frequency", "recurring_id"],
+    "incomes.json": ["source"],
+}
+
+# Fields loaded as pandas Categoricals
+CATEGORICAL_FIELDS = ("category", "source")
+
+# Record store -> registry of the recurring series whose occurrences are
+# generated at query time rather than stored (see recurring_utils)
+RULE_FILES = {"expenses.json": "recurring.json"}
+
+# Rule registry -> field identifying its rules. Registries are small lists,
+# rewritten whole by the inserts, updates and deletes committed to them
+RULE_KEYS = {"recurring.json": "recurring_id"}
+
+# When written data reaches the disk: "none" (left to the OS), "commit"
+# (fsync before each commit returns) or "batch" (fsync every FSYNC_INTERVAL)
+DURABILITY = os.getenv("FINANCE_DURABILITY", "commit")
+
+# Seconds between the fsyncs of the "batch" durability mode
+FSYNC_INTERVAL = 1.0
+
+DEFAULT_CATEGORIES = [
+    "Personal",
+    "Home",
+    "Health",
+    "Grocery",
+    "Food & Dining",
+    "Entertainment",
+    "Transportation",
+    "Travel",
+    "Miscellaneous",
+]
+
+DEFAULTS = {
+    "categories.json": DEFAULT_CATEGORIES,
+    "expenses.json": {"next_id": 1, "records": []},
+    "incomes.json": {"next_id": 1, "records": []},
+    "recurring.json": [],
+}
+
+
+def get_data_dir() -> str:
+    """Get the data directory path, creating it if it doesn't exist."""
+    try:
+        os.makedirs(DATA_DIR, exist_ok=True)
+    except Exception as e:
+        st.error(f"Failed to create data directory: {e}")
+    return DATA_DIR
+
+
+def get_json_path(filename: str) -> str:
+    """Get the full path to a JSON data file."""
+    return os.path.join(get_data_dir(), filename)
+
+
+def get_store_dir(filename: str) -> str:
+    """Get the directory of a record store (e.g. data/expenses for expenses.json)."""
+    store_dir = os.path.join(get_data_dir(), os.path.splitext(filename)[0])
+    os.makedirs(store_dir, exist_ok=True)
+    return store_dir
+
+
+def get_manifest_path(filename: str) -> str:
+    """Get the full path to the manifest of a record store."""
+    return os.path.join(get_store_dir(filename), "manifest.json")
+
+
+def get_partition_path(filename: str, year: str) -> str:
+    """Get the full path to the partition of a record store holding one year."""
+    return os.path.join(get_store_dir(filename), f"{year}.json")
+
+
+def get_columns_path(filename: str, year: str, stamp: tuple) -> str:
+    """
+    Get the full path to the columnar snapshot of a year partition.
+
+    The path embeds the partition file's stamp, so a snapshot is only ever
+    found for the exact partition content it was built from.
+    """
+    columns_dir = os.path.join(get_store_dir(filename), "columns")
+    os.makedirs(columns_dir, exist_ok=True)
+    return os.path.join(columns_dir, f"{year}-{'-'.join(map(str, stamp))}")
+
+
+def get_journal_path(filename: str) -> str:
+    """Get the full path to the journal of a record store."""
+    return os.path.join(get_store_dir(filename), "journal.jsonl")
+
+
+def get_lock_path() -> str:
+    """Get the full path to the lock file serializing writers across processes."""
+    return os.path.join(get_data_dir(), ".lock")
+
+
+def get_redo_log_path() -> str:
+    """Get the full path to the redo log of commits spanning several files."""
+    return os.path.join(get_data_dir(), "redo.json")
+
+
+def get_cube_path(filename: str) -> str:
+    """Get the full path to the aggregate cube of a record store."""
+    return os.path.join(get_store_dir(filename), "cube.json")
+
+
+def file_stamp(path: str) -> tuple | None:
+    """(mtime, size, inode) of a file, or None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+# Guards journal appends against a concurrent partition rewrite (compaction)
+_journal_lock = threading.RLock()
+
+# Nesting depth of store_lock within the thread holding _journal_lock
+_store_lock_depth = 0
+
+# Files and directories written but not fsynced yet ("batch" durability)
+_unsynced: set[str] = set()
+_sync_lock = threading.Lock()
+_sync_timer: threading.Timer | None = None
+
+
+@contextlib.contextmanager
+def store_lock():
+    """
+    Hold the write lock of the data directory: _journal_lock within this
+    process, plus an exclusive flock on the lock file against other processes.
+    """
+    global _store_lock_depth
+    with _journal_lock:
+        _store_lock_depth += 1
+        try:
+            if _store_lock_depth > 1 or fcntl is None:
+                yield
+            else:
+                with open(get_lock_path(), "a") as lock_file:
+                    # Released when the file is closed
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    yield
+        finally:
+            _store_lock_depth -= 1
+
+
+def _fsync_path(path: str) -> None:
+    """fsync a file or directory by path."""
+    if os.name == "nt" and os.path.isdir(path):
+        # Directories can't be opened, nor need syncing, on Windows
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def flush_unsynced() -> None:
+    """fsync everything written since the last flush ("batch" durability)."""
+    global _sync_timer
+    with _sync_lock:
+        paths = list(_unsynced)
+        _unsynced.clear()
+        _sync_timer = None
+    # Files before their directories, so that renames land on synced content
+    for path in sorted(paths, key=os.path.isdir):
+        if os.path.exists(path):
+            _fsync_path(path)
+
+
+def make_durable(path: str, synced: bool = False) -> None:
+    """
+    Get a written file, and its directory entry, to disk as DURABILITY says.
+
+    Args:
+        path (str): File that was just written, created or renamed into place.
+        synced (bool): Whether the file's own content was already fsynced.
+    """
+    global _sync_timer
+    if DURABILITY == "commit":
+        if not synced:
+            _fsync_path(path)
+        _fsync_path(os.path.dirname(path))
+    elif DURABILITY == "batch":
+        with _sync_lock:
+            _unsynced.update((path, os.path.dirname(path)))
+            if _sync_timer is None:
+                _sync_timer = threading.Timer(FSYNC_INTERVAL, flush_unsynced)
+                _sync_timer.daemon = True
+                _sync_timer.start()
+
+
+def remove_durably(path: str) -> None:
+    """
+    Remove a file that was superseded by files written before it (e.g. a
+    journal folded into partitions), flushing those first so that a crash
+    can't lose both.
+    """
+    if DURABILITY == "batch":
+        flush_unsynced()
+    os.remove(path)
+    if DURABILITY != "none":
+        _fsync_path(os.path.dirname(path))
+
+
+def write_file(path: str, data: dict | list) -> None:
+    """
+    Atomically write data to a JSON file, raising on failure.
+
+    Writes compact JSON (see codec_utils) to a temp file first, then uses
+    os.replace for atomic swap.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(codec_utils.dumps(data))
+            if DURABILITY == "commit":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    make_durable(path, synced=DURABILITY == "commit")
+
+
+def typed_frame(filename: str, records: list[dict] | pd.DataFrame) -> pd.DataFrame:
+    """
+    Build a DataFrame with every field of a record store, parsed dates and
+    CATEGORICAL_FIELDS as Categoricals.
+    """
+    df = pd.DataFrame(records, columns=RECORD_FIELDS[filename])
+    df["date"] = pd.to_datetime(df["date"]).astype("datetime64[s]")
+    for field in CATEGORICAL_FIELDS:
+        if field in df and not isinstance(df[field].dtype, pd.CategoricalDtype):
+            df[field] = df[field].astype("category")
+    return df
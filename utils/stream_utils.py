@@ -0,0 +1,200 @@
+import json
+from collections.abc import Callable, Iterable, Iterator
+from typing import TextIO
+
+from utils import codec_utils
+
+# Characters read from a file at a time
+CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+class _Scanner:
+    """Buffered reader over a JSON text that decodes one value at a time."""
+
+    def __init__(self, f: TextIO, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Read the next chunk, dropping the consumed text. False at the end."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self.buf, self.pos)
+
+    def peek(self) -> str:
+        """Skip whitespace and get the next character, or "" at the end."""
+        while True:
+            self.pos = json.decoder.WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        """Consume the next character, which must be char."""
+        if self.peek() != char:
+            raise self._error(f"Expecting {char!r}")
+        self.pos += 1
+
+    def separator(self, closing: str) -> bool:
+        """Consume a "," (True) or the closing character (False)."""
+        char = self.peek()
+        if char not in (",", closing):
+            raise self._error(f"Expecting ',' or {closing!r}")
+        self.pos += 1
+        return char == ","
+
+    def items(self) -> Iterator[object]:
+        """
+        Decode the items of the array starting at the current position, up to
+        and including its closing "]".
+
+        Items are decoded back to back from the buffer, which is only refilled
+        when the next item isn't complete in it.
+        """
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        decode = _decoder.raw_decode
+        skip = json.decoder.WHITESPACE.match
+        while True:
+            buf, pos = self.buf, self.pos
+            try:
+                while True:
+                    item, end = decode(buf, skip(buf, pos).end())
+                    end = skip(buf, end).end()
+                    separator = buf[end]
+                    if separator not in ",]":
+                        break
+                    # Consumed up to and including the separator
+                    pos = self.pos = end + 1
+                    yield item
+                    if separator == "]":
+                        return
+            except (json.JSONDecodeError, IndexError):
+                # Incomplete item at the end of the buffer
+                if not self._fill():
+                    raise self._error("Unterminated array") from None
+                continue
+            self.pos = end
+            raise self._error("Expecting ',' or ']'")
+
+    def value(self) -> object:
+        """Decode the next value, reading more of the file until it's complete."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number ending the buffer may go on in the next chunk
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def record_filter(
+    date_prefix: str | None = None,
+    category: str | None = None,
+    ids: Iterable[int] | None = None,
+) -> Callable[[dict], bool]:
+    """
+    Build a predicate keeping the records that match every given filter.
+
+    Args:
+        date_prefix (str | None): Keep dates starting with this prefix
+            (e.g. "2025" or "2025-03").
+        category (str | None): Keep only this expense category.
+        ids (Iterable[int] | None): Keep only these ids.
+
+    Returns:
+        Callable[[dict], bool]: The predicate.
+    """
+    ids = None if ids is None else set(ids)
+
+    def predicate(record: dict) -> bool:
+        return (
+            (not date_prefix or record["date"].startswith(date_prefix))
+            and (category is None or record.get("category") == category)
+            and (ids is None or record["id"] in ids)
+        )
+
+    return predicate
+
+
+def iter_records(
+    path: str,
+    predicate: Callable[[dict], bool] | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[dict]:
+    """
+    Yield the records of a JSON record file one at a time.
+
+    The file is read in chunks and its record array decoded record by record,
+    so only the records kept by the predicate stay in memory, never the whole
+    file. Other top-level keys (e.g. "next_id") are skipped.
+
+    Args:
+        path (str): File holding a JSON object with either a "records" list or
+            the "fields", "dictionaries" and "rows" written by
+            codec_utils.encode_records.
+        predicate (Callable[[dict], bool] | None): Only yield the records it
+            returns True for. Defaults to None (every record).
+        chunk_size (int): Characters read at a time. Defaults to CHUNK_SIZE.
+
+    Yields:
+        dict: The matching records, in file order.
+
+    Raises:
+        json.JSONDecodeError: If the file is not a valid JSON object.
+    """
+    with open(path, encoding="utf-8") as f:
+        scanner = _Scanner(f, chunk_size)
+        scanner.expect("{")
+        if scanner.peek() == "}":
+            return
+        fields, lookups = None, []
+        while True:
+            key = scanner.value()
+            scanner.expect(":")
+            if key == "fields":
+                fields = scanner.value()
+            elif key == "dictionaries" and fields is not None:
+                lookups = codec_utils.dictionary_lookups(
+                    {"fields": fields, "dictionaries": scanner.value()}
+                )
+            elif key in ("rows", "dictionaries") and fields is None:
+                raise scanner._error(f'Expecting "fields" before "{key}"')
+            elif key == "records":
+                for record in scanner.items():
+                    if predicate is None or predicate(record):
+                        yield record
+            elif key == "rows":
+                for row in scanner.items():
+                    for i, lookup in lookups:
+                        row[i] = lookup[row[i]]
+                    record = dict(zip(fields, row))
+                    if predicate is None or predicate(record):
+                        yield record
+            else:
+                scanner.value()
+            if not scanner.separator("}"):
+                return
@@ -0,0 +1,300 @@
+import queue
+import threading
+import time
+
+from utils import backend_utils, cache_utils
+from utils.backend_utils import cached_read, get_next_id
+from utils.cube_utils import CUBE_KEYS
+from utils.storage_utils import (
+    JOURNALED_FILES,
+    RECORD_FIELDS,
+    RULE_FILES,
+    RULE_KEYS,
+    store_lock,
+)
+
+# Seconds the writer waits after a transaction for more to commit with it,
+# when other callers of commit_json are about to queue theirs
+GROUP_COMMIT_WINDOW = 0.002
+
+# List file -> record store whose records (and rules) take their CUBE_KEYS
+# field from its values, renamed together by the "rename" operation
+RENAMED_FILES = {"categories.json": "expenses.json"}
+
+# Transactions waiting for the writer thread (see commit_json)
+_commit_queue: queue.Queue = queue.Queue()
+_writer: threading.Thread | None = None
+_writer_start_lock = threading.Lock()
+
+# Transactions passed to commit_json and not committed yet, queued or not
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+def _rename_ops(
+    filename: str, old: str, new: str, pending: list[dict], lists: dict
+) -> list[dict]:
+    """
+    Operations moving the records and rules that refer to a value of a list
+    file over to its new name.
+
+    The records are taken in their latest state: as stored, then as changed
+    by the operations committed before in the same batch.
+
+    Args:
+        filename (str): One of RENAMED_FILES.
+        old (str): Value being renamed.
+        new (str): Its new name.
+        pending (list[dict]): Operations resolved before in the commit group.
+        lists (dict): Current content per list file, as for _resolve_ops.
+
+    Returns:
+        list[dict]: An "update" of the records and a "write" of the rules
+        that refer to the old value, if any.
+    """
+    store = RENAMED_FILES[filename]
+    key = CUBE_KEYS[store]
+    backend = backend_utils.get_backend()
+    latest = {
+        r["id"]: r
+        for r in backend.query_store(store, ids=backend.query_key_ids(store, old))
+    }
+    for op in pending:
+        if op["file"] != store:
+            continue
+        if op["op"] == "write":
+            latest = {r["id"]: r for r in op["data"]["records"]}
+        elif op["op"] == "delete":
+            for record_id in op["data"]:
+                latest.pop(record_id, None)
+        else:
+            latest.update((r["id"], r) for r in op["data"])
+
+    renamed = []
+    records = [{**r, key: new} for r in latest.values() if r[key] == old]
+    if records:
+        renamed.append({"file": store, "op": "update", "data": records})
+    rule_file = RULE_FILES.get(store)
+    if rule_file is not None:
+        if rule_file not in lists:
+            lists[rule_file] = cached_read(rule_file)
+        if any(rule[key] == old for rule in lists[rule_file]):
+            lists[rule_file] = [
+                {**rule, key: new} if rule[key] == old else rule
+                for rule in lists[rule_file]
+            ]
+            renamed.append({"file": rule_file, "op": "write", "data": lists[rule_file]})
+    return renamed
+
+
+def _resolve_ops(
+    ops: list[dict], next_ids: dict, lists: dict, pending: list[dict]
+) -> list[dict]:
+    """
+    Turn the operations of a transaction into the ones to commit.
+
+    Inserted records without an id get the next free ones and None for their
+    missing fields, updated records must be complete, "extend" becomes a
+    "write" of the extended list (or is dropped if nothing is new), and
+    "rename" a "write" of the list plus the changes of the records and rules
+    that refer to the renamed value.
+
+    Args:
+        ops (list[dict]): Operations as passed to commit_json.
+        next_ids (dict): Next free id per record store, shared by the
+            transactions of a commit group and updated in place.
+        lists (dict): Current content per list file, likewise.
+        pending (list[dict]): Operations resolved before in the commit group.
+
+    Returns:
+        list[dict]: The operations to commit.
+    """
+    resolved = []
+    for op in ops:
+        filename, kind, data = op["file"], op["op"], op["data"]
+        if filename in RULE_KEYS and kind in ("insert", "update", "delete", "skip"):
+            if filename not in lists:
+                lists[filename] = cached_read(filename)
+            key = RULE_KEYS[filename]
+            if kind == "delete":
+                rules = [r for r in lists[filename] if r[key] not in data]
+            elif kind == "skip":
+                # Rules deleted since took their occurrences with them
+                skipped = {}
+                for rule in data:
+                    skipped.setdefault(rule[key], set()).update(rule["skipped"])
+                rules = [
+                    {**r, "skipped": sorted({*r["skipped"], *skipped[r[key]]})}
+                    if r[key] in skipped
+                    else r
+                    for r in lists[filename]
+                ]
+            else:
+                changes = {rule[key]: rule for rule in data}
+                rules = [
+                    {**r, **changes.pop(r[key])} if r[key] in changes else r
+                    for r in lists[filename]
+                ]
+                if kind == "insert":
+                    rules += changes.values()
+            kind, data = "write", rules
+            lists[filename] = data
+        elif kind in ("insert", "update", "delete"):
+            if filename not in JOURNALED_FILES:
+                raise ValueError(f"{filename} is not a journaled data file")
+            if kind == "insert":
+                if filename not in next_ids:
+                    next_ids[filename] = get_next_id(filename)
+                records = []
+                for record in data:
+                    if "id" not in record:
+                        record = {"id": next_ids[filename], **record}
+                    next_ids[filename] = max(next_ids[filename], record["id"] + 1)
+                    # Every field, as the partitions and the SQLite tables hold them
+                    records.append({f: record.get(f) for f in RECORD_FIELDS[filename]})
+                data = records
+            elif kind == "update":
+                for record in data:
+                    missing = [f for f in RECORD_FIELDS[filename] if f not in record]
+                    if missing:
+                        raise ValueError(
+                            f"Updated {filename} record lacks {', '.join(missing)}"
+                        )
+        elif kind == "extend":
+            if filename not in lists:
+                lists[filename] = cached_read(filename)
+            added = [v for v in dict.fromkeys(data) if v not in lists[filename]]
+            if not added:
+                continue
+            kind, data = "write", lists[filename] + added
+            lists[filename] = data
+        elif kind == "rename":
+            if filename not in RENAMED_FILES:
+                raise ValueError(f"{filename} has no values to rename")
+            old, new = data
+            if filename not in lists:
+                lists[filename] = cached_read(filename)
+            # Renaming onto an existing value merges the two
+            lists[filename] = list(
+                dict.fromkeys(new if v == old else v for v in lists[filename])
+            )
+            resolved.append({"file": filename, "op": "write", "data": lists[filename]})
+            resolved += _rename_ops(filename, old, new, pending + resolved, lists)
+            continue
+        elif kind == "write":
+            if filename in JOURNALED_FILES:
+                next_ids[filename] = data["next_id"]
+            else:
+                lists[filename] = data
+        else:
+            raise ValueError(f"Unknown commit operation: {kind}")
+        resolved.append({"file": filename, "op": kind, "data": data})
+    return resolved
+
+
+def _commit_group(group: list[dict]) -> None:
+    """
+    Commit a group of queued transactions under a single store lock.
+
+    A transaction whose operations are invalid fails on its own; a failure
+    to write fails the whole group.
+    """
+    ops = []
+    try:
+        with store_lock():
+            backend = backend_utils.get_backend()
+            backend.recover_store()
+
+            next_ids, lists = {}, {}
+            for txn in group:
+                try:
+                    txn["result"] = _resolve_ops(txn["ops"], next_ids, lists, ops)
+                    ops += txn["result"]
+                except (ValueError, KeyError, TypeError) as e:
+                    txn["error"] = e
+            if not ops:
+                return
+
+            backend.commit_batch(ops)
+    except Exception as e:
+        for filename in {op["file"] for op in ops}:
+            cache_utils.drop_cached(filename)
+        for txn in group:
+            if txn["error"] is None:
+                txn["error"] = e
+
+
+def _writer_loop() -> None:
+    """Commit queued transactions, grouping those that arrive together."""
+    global _in_flight
+    while True:
+        group = [_commit_queue.get()]
+        deadline = time.monotonic() + GROUP_COMMIT_WINDOW
+        # A lone transaction is committed right away
+        while len(group) < _in_flight and (timeout := deadline - time.monotonic()) > 0:
+            try:
+                group.append(_commit_queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        _commit_group(group)
+        with _in_flight_lock:
+            _in_flight -= len(group)
+        for txn in group:
+            txn["done"].set()
+
+
+def commit_json(ops: list[dict]) -> list[dict]:
+    """
+    Atomically apply mutations to one or more data files.
+
+    Every write goes through a single writer thread. It commits the
+    transactions queued within GROUP_COMMIT_WINDOW of each other together
+    (waiting only while other transactions are on their way to the queue),
+    under one lock on the data directory that is also held against other
+    processes, with one journal write per record store. A transaction that
+    touches several files is recorded in a redo log first, so that a crash
+    can't leave it half applied.
+
+    Args:
+        ops (list[dict]): Operations, each with a "file", an "op" and its "data":
+            - "insert", "update" or "delete" on a record store, as for
+              append_json. Inserted records without an "id" get the next free
+              ids, and None for their other missing fields. Updated records
+              replace the stored ones whole, so they must carry every field
+              of RECORD_FIELDS.
+            - "insert", "update" or "delete" on a rule registry (see
+              RULE_KEYS): add rules, merge changes into the rules with the
+              same key, or remove the rules with the given keys.
+            - "skip" on a rule registry: add the "skipped" dates of each
+              given rule to those of the stored rule with the same key, if
+              it still exists.
+            - "write": replace the whole content of a file, as for write_json.
+            - "extend": add the values a list file (e.g. categories.json)
+              doesn't hold yet.
+            - "rename": rename the value [old, new] of a list file in
+              RENAMED_FILES, along with the records and rules that refer to
+              it. They are read under the lock, so no concurrent write can
+              slip in between.
+
+    Returns:
+        list[dict]: The operations as committed, with the assigned ids filled
+        in, rule registry changes and "extend" turned into a "write" of the
+        new list ("extend" is left out if nothing was new), and "rename" into
+        a "write" of the list plus the changes to the records and rules.
+
+    Raises:
+        Exception: If the transaction could not be committed.
+    """
+    global _writer, _in_flight
+    txn = {"ops": ops, "done": threading.Event(), "result": None, "error": None}
+    with _writer_start_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_writer_loop, daemon=True)
+            _writer.start()
+    with _in_flight_lock:
+        _in_flight += 1
+    _commit_queue.put(txn)
+    txn["done"].wait()
+    if txn["error"] is not None:
+        raise txn["error"]
+    return txn["result"]